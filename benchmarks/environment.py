@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from cli._version import __version__
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+
+def make_home(directory, api, configuration="mock", **settings):
+    """
+    Creates a HOME in <directory> with a CLI configuration named <configuration> pointing to the MockAPI <api>.
+    <settings> are added to the configuration file (http_pool_size, cli_signature_ttl, ...)
+    """
+    config_dir = Path(directory) / ".didimo"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    config = {"host": api.url, "access_key": api.access_key, "secret_key": "mock-api-secret",
+              "output_display_type": "human-readable"}
+    config.update(settings)
+    with open(str(config_dir / ("%s.json" % configuration)), "w") as f:
+        json.dump(config, f, indent=2)
+    with open(str(config_dir / "cli.json"), "w") as f:
+        json.dump({"default": configuration}, f, indent=2)
+    return Path(directory)
+
+
+def copy_sources(directory):
+    """
+    Copies the cli package of this checkout, without compiled modules, to <directory> and returns <directory>
+    """
+    shutil.copytree(str(REPO_ROOT / "cli"), str(Path(directory) / "cli"), ignore=shutil.ignore_patterns("__pycache__"))
+    return Path(directory)
+
+
+def cli_environment(home, cache_dir, source_dir=REPO_ROOT, write_bytecode=True):
+    """
+    Environment running the CLI found in <source_dir> with <home> as the user home and <cache_dir> as the user
+    cache dir. Unless <write_bytecode> is unset, compiled modules are written so later runs can reuse them
+    """
+    env = dict(os.environ)
+    env["HOME"] = str(home)
+    env["USERPROFILE"] = str(home)
+    env["XDG_CACHE_HOME"] = str(cache_dir)
+    env["LOCALAPPDATA"] = str(cache_dir)
+    env["PYTHONPATH"] = os.pathsep.join([str(source_dir)] + [p for p in [env.get("PYTHONPATH")] if p])
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    if not write_bytecode:
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def cli_command(*args, interpreter_options=()):
+    """
+    Command line running `didimo <args>` with the sources found first on PYTHONPATH (see cli_environment).
+    Run it from another directory than the checkout, the current directory comes first in the module search path
+    """
+    return [sys.executable] + list(interpreter_options) + ["-c", "from cli.cli import cli; cli()"] + list(args)
+
+
+def run_metadata():
+    """
+    Describes the code and machine a benchmark ran on, stored along with its results
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(REPO_ROOT),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cli_version": __version__,
+            "git_commit": commit,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()}
+
+
+def store_results(name, results, directory=RESULTS_DIR):
+    """
+    Writes <results> to "<directory>/<name>-<timestamp>.json" and returns its path
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / ("%s-%s.json" % (name, time.strftime("%Y%m%d-%H%M%S")))
+    with open(str(path), "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    return path
+
+
+def previous_results(name, directory=RESULTS_DIR):
+    """
+    The most recent results stored under <name>, None when there are none
+    """
+    paths = sorted(Path(directory).glob("%s-*.json" % name))
+    if not paths:
+        return None
+    with open(str(paths[-1])) as f:
+        return json.load(f)
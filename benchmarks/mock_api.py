@@ -0,0 +1,639 @@
+import ast
+import io
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from email.parser import BytesParser
+from email.policy import HTTP
+from hashlib import sha256
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import click
+
+from cli._version import __version__
+
+DEFAULT_PACKAGE_SIZE = 256 * 1024
+# API requests faults are injected in by default: everything but the calls made when a command starts
+DEFAULT_FAULT_PATHS = r"/v3/(didimos|assets|didimo_generation_templates)"
+
+# Features announced by /v3/accounts/default/status?ui=cli, which the "dynamic" cli_signature validates requests with
+REQUEST_CONFIGURATION_OBJECTS = [
+    {"code": "input_type", "group": "input", "options": [{"label": "Photo", "match": "photo", "ui": {"is_input_type": True}},
+                                                         {"label": "RGBD", "match": "rgbd", "ui": {"is_input_type": True}}]},
+    {"code": "transfer_formats", "group": "targets", "options": [{"label": "glTF", "match": "gltf"},
+                                                                {"label": "FBX", "match": "fbx"},
+                                                                {"label": "USDZ", "match": "usdz"}]},
+    {"code": "max_texture_dimension", "group": "features", "options": [{"label": "512", "match": "512"},
+                                                                       {"label": "1024", "match": "1024"},
+                                                                       {"label": "2048", "match": "2048"}]},
+    {"code": "arkit", "group": "features", "options": [{"type": "boolean"}]},
+    {"code": "simple_poses", "group": "features", "options": [{"type": "boolean"}]},
+    {"code": "oculus_lipsync", "group": "features", "options": [{"type": "boolean"}]},
+    {"code": "aws_polly", "group": "features", "options": [{"type": "boolean"}]},
+]
+
+
+def parse_multipart(body, content_type):
+    """
+    Returns the fields ({name: [values]}) and files ({name: [(filename, content)]}) of a multipart/form-data body
+    """
+    message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    fields = {}
+    files = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        filename = part.get_filename()
+        content = part.get_payload(decode=True) or b""
+        if filename is None:
+            fields.setdefault(name, []).append(content.decode("utf-8"))
+        else:
+            files.setdefault(name, []).append((filename, content))
+    return fields, files
+
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """ Serves the endpoints of the Didimo API used by the CLI from the state of a MockAPI """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "DidimoMockAPI/1.0"
+    # headers and body are written separately, Nagle's algorithm would hold the body until the client acknowledges
+    disable_nagle_algorithm = True
+
+    # (method, path pattern, handler method, label in the statistics)
+    ROUTES = [
+        ("GET", r"/v3/platforms/cli", "get_cli_platform", "GET /v3/platforms/cli"),
+        ("GET", r"/v3/accounts/default/applications", "get_applications", "GET /v3/accounts/default/applications"),
+        ("GET", r"/v3/accounts/default/status", "get_account_status", "GET /v3/accounts/default/status"),
+        ("POST", r"/v3/didimos-cost", "post_didimo_cost", "POST /v3/didimos-cost"),
+        ("GET", r"/v3/didimos/demos", "get_demo_didimos", "GET /v3/didimos/demos"),
+        ("GET", r"/v3/didimos/bulks", "get_bulks", "GET /v3/didimos/bulks"),
+        ("POST", r"/v3/didimos/bulks", "post_bulk", "POST /v3/didimos/bulks"),
+        ("GET", r"/v3/didimos/bulks/([^/]+)", "get_bulk", "GET /v3/didimos/bulks/{uuid}"),
+        ("GET", r"/v3/didimos/?", "get_didimos", "GET /v3/didimos"),
+        ("POST", r"/v3/didimos", "post_didimo", "POST /v3/didimos"),
+        ("GET", r"/v3/didimos/([^/]+)", "get_didimo", "GET /v3/didimos/{key}"),
+        ("DELETE", r"/v3/didimos/([^/]+)", "delete_didimo", "DELETE /v3/didimos/{key}"),
+        ("POST", r"/v3/didimos/([^/]+)/meta_data", "post_meta_data", "POST /v3/didimos/{key}/meta_data"),
+        ("GET", r"/v3/didimos/([^/]+)/meta_data/([^/]+)", "get_meta_data", "GET /v3/didimos/{key}/meta_data/{name}"),
+        ("PUT", r"/v3/didimos/([^/]+)/meta_data/([^/]+)", "put_meta_data", "PUT /v3/didimos/{key}/meta_data/{name}"),
+        ("DELETE", r"/v3/didimos/([^/]+)/meta_data/([^/]+)", "delete_meta_data", "DELETE /v3/didimos/{key}/meta_data/{name}"),
+        ("POST", r"/v3/assets", "post_asset", "POST /v3/assets"),
+        ("GET", r"/v3/assets/([^/]+)", "get_asset", "GET /v3/assets/{key}"),
+        ("GET", r"/v3/didimo_generation_templates", "get_templates", "GET /v3/didimo_generation_templates"),
+        ("POST", r"/v3/didimo_generation_templates", "post_template", "POST /v3/didimo_generation_templates"),
+        ("GET", r"/v3/didimo_generation_templates/codename/([^/]+)", "get_template", "GET /v3/didimo_generation_templates/codename/{codename}"),
+        ("PUT", r"/v3/didimo_generation_templates/codename/([^/]+)", "put_template", "PUT /v3/didimo_generation_templates/codename/{codename}"),
+        ("DELETE", r"/v3/didimo_generation_templates/codename/([^/]+)", "delete_template", "DELETE /v3/didimo_generation_templates/codename/{codename}"),
+        ("GET", r"/files/([^/]+)", "get_file", "GET /files/{name}"),
+        ("GET", r"/mock/stats", "get_stats", "GET /mock/stats"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if size == 0:
+                    return b"".join(chunks)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def dispatch(self, method):
+        api = self.server.api
+        self.body = self.read_body()
+        parts = urlsplit(self.path)
+        self.query = parse_qs(parts.query)
+        api.record_connection(self.client_address, len(self.body))
+
+        for route_method, pattern, handler, label in self.ROUTES:
+            match = re.fullmatch(pattern, parts.path)
+            if match and route_method == method:
+                self.label = label
+                break
+        else:
+            self.label = "%s (unknown)" % method
+            return self.send_error_json(404, 404, "Not found: %s %s" % (method, parts.path))
+
+        api.wait_latency()
+        if parts.path.startswith("/v3/"):
+            if self.headers.get("didimo-api-key") != api.access_key:
+                return self.send_error_json(401, 10003, "Invalid API key")
+        if re.match(api.fault_paths, parts.path):
+            fault = api.draw_fault()
+            if fault == 429:
+                return self.send_error_json(429, 429, "Too many requests", {"Retry-After": str(api.retry_after)})
+            if fault is not None:
+                return self.send_error_json(fault, fault, "Simulated server error")
+        getattr(self, handler)(*match.groups())
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.api.record_response(self.label, status, len(body))
+
+    def send_error_json(self, status, code, description, headers=None):
+        self.send_json({"code": code, "description": description}, status, headers)
+
+    def send_empty(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self.server.api.record_response(self.label, status, 0)
+
+    def json_body(self):
+        # template requests are sent as the str() of a Python dict, not as JSON
+        text = self.body.decode("utf-8")
+        try:
+            return json.loads(text)
+        except ValueError:
+            return ast.literal_eval(text)
+
+    def form_body(self):
+        return parse_multipart(self.body, self.headers.get("Content-Type", ""))
+
+    def base_url(self):
+        return "http://%s" % self.headers.get("Host", "%s:%d" % self.server.server_address[:2])
+
+    def page(self, items, key, path):
+        page = int(self.query.get("page", ["1"])[0])
+        page_size = int(self.query.get("page_size", ["20"])[0])
+        response = {key: items[(page - 1) * page_size:page * page_size], "total_size": len(items), "page": page, "__links": {}}
+        if page * page_size < len(items):
+            order_by = "&order_by=%s" % self.query["order_by"][0] if "order_by" in self.query else ""
+            response["__links"]["next"] = "%s%s?page=%d&page_size=%d%s" % (self.base_url(), path, page + 1, page_size, order_by)
+        return response
+
+    # Platform and account
+
+    def get_cli_platform(self):
+        api = self.server.api
+        etag = '"%s"' % api.cli_signature
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_empty(304, {"ETag": etag})
+        self.send_json({"versions": [{"code": __version__,
+                                      "dgp_compatibility_rules": [{"pattern": ".*",
+                                                                   "settings": {"cli_signature": api.cli_signature}}]}]},
+                       headers={"ETag": etag})
+
+    def get_applications(self):
+        api = self.server.api
+        self.send_json({"applications": [{"dgp_version": api.dgp_version, "api_keys": [{"key": api.access_key}]}]})
+
+    def get_account_status(self):
+        api = self.server.api
+        self.send_json({"tier": {"name": "Mock"}, "balance": api.balance,
+                        "request_configuration_settings": {"objects": REQUEST_CONFIGURATION_OBJECTS}})
+
+    # Didimos
+
+    def post_didimo_cost(self):
+        self.send_json({"cost": 1}, 201)
+
+    def post_didimo(self):
+        fields, files = self.form_body()
+        if not files:
+            return self.send_error_json(400, 10010, "A photo is required")
+        didimo = self.server.api.create_didimo(fields.get("input_type", ["photo"])[0], fields.get("transfer_formats"))
+        self.send_json(self.server.api.didimo_details(didimo, self.base_url()), 201)
+
+    def get_didimos(self):
+        api = self.server.api
+        order_by = self.query.get("order_by", ["-created_at"])[0]
+        with api.lock:
+            didimos = sorted(api.didimos.values(), key=lambda didimo: didimo["created_ts"], reverse=not order_by.startswith("+"))
+            items = [api.didimo_details(didimo, self.base_url()) for didimo in didimos]
+        self.send_json(self.page(items, "didimos", "/v3/didimos"))
+
+    def get_demo_didimos(self):
+        self.send_json(self.page([], "didimos", "/v3/didimos/demos"))
+
+    def get_didimo(self, key):
+        api = self.server.api
+        didimo = api.didimos.get(key)
+        if didimo is None:
+            return self.send_error_json(404, 10001, "No didimo with the requested key was found")
+        self.send_json(api.didimo_details(didimo, self.base_url()))
+
+    def delete_didimo(self, key):
+        with self.server.api.lock:
+            didimo = self.server.api.didimos.pop(key, None)
+        if didimo is None:
+            return self.send_error_json(404, 10001, "No didimo with the requested key was found")
+        self.send_empty(204)
+
+    # Metadata
+
+    def meta_data_target(self, key, name=None):
+        didimo = self.server.api.didimos.get(key)
+        if didimo is None:
+            self.send_error_json(404, 10001, "No didimo with the requested key was found")
+        elif name is not None and name not in didimo["meta_data"]:
+            self.send_error_json(404, 10008, "Metadata attribute not found")
+            didimo = None
+        return didimo
+
+    def post_meta_data(self, key):
+        didimo = self.meta_data_target(key)
+        if didimo is not None:
+            data = self.json_body()
+            didimo["meta_data"][data["name"]] = data["value"]
+            self.send_json({"name": data["name"], "value": data["value"]}, 201)
+
+    def get_meta_data(self, key, name):
+        didimo = self.meta_data_target(key, name)
+        if didimo is not None:
+            self.send_json({"name": name, "value": didimo["meta_data"][name]})
+
+    def put_meta_data(self, key, name):
+        didimo = self.meta_data_target(key, name)
+        if didimo is not None:
+            didimo["meta_data"][name] = self.json_body()["value"]
+            self.send_json({"name": name, "value": didimo["meta_data"][name]})
+
+    def delete_meta_data(self, key, name):
+        didimo = self.meta_data_target(key, name)
+        if didimo is not None:
+            del didimo["meta_data"][name]
+            self.send_empty(204)
+
+    # Assets (hair and vertex deformation)
+
+    def post_asset(self):
+        fields, files = self.form_body()
+        if not files:
+            return self.send_error_json(400, 10010, "A deformation file is required")
+        asset = self.server.api.create_didimo(fields.get("input_type", ["asset"])[0], ["package"], kind="assets")
+        self.send_json(self.server.api.didimo_details(asset, self.base_url()), 201)
+
+    def get_asset(self, key):
+        api = self.server.api
+        asset = api.assets.get(key)
+        if asset is None:
+            return self.send_error_json(404, 10001, "No asset with the requested key was found")
+        self.send_json(api.didimo_details(asset, self.base_url()))
+
+    # Bulk requests
+
+    def post_bulk(self):
+        api = self.server.api
+        fields, files = self.form_body()
+        archives = files.get("photos")
+        try:
+            names = [info.filename for info in zipfile.ZipFile(io.BytesIO(archives[0][1])).infolist() if not info.is_dir()]
+        except (TypeError, zipfile.BadZipFile):
+            return self.send_error_json(400, 10011, "The photos must be a zip archive")
+        bulk = api.create_bulk(names, fields.get("input_type", ["photo"])[0], fields.get("transfer_formats"))
+        self.send_json(api.bulk_details(bulk), 201)
+
+    def get_bulks(self):
+        api = self.server.api
+        with api.lock:
+            items = [api.bulk_details(bulk) for bulk in api.bulks.values()]
+        self.send_json(self.page(items, "bulk_requests", "/v3/didimos/bulks"))
+
+    def get_bulk(self, bulk_uuid):
+        api = self.server.api
+        bulk = api.bulks.get(bulk_uuid)
+        if bulk is None:
+            return self.send_error_json(404, 10012, "No bulk request with the requested uuid was found")
+        self.send_json(api.bulk_details(bulk))
+
+    # Didimo generation templates
+
+    def get_templates(self):
+        with self.server.api.lock:
+            items = list(self.server.api.templates.values())
+        self.send_json(self.page(items, "didimo_generation_templates", "/v3/didimo_generation_templates"))
+
+    def post_template(self):
+        api = self.server.api
+        data = self.json_body()
+        codename = data.get("template_codename")
+        with api.lock:
+            if not codename or codename in api.templates:
+                return self.send_error_json(400, 10020, "Invalid or duplicated codename")
+            template = {"codename": codename, "template_name": data.get("template_name", ""),
+                        "description": data.get("description"), "settings": json.dumps(data.get("settings", {})),
+                        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "profile_id": 1, "account_id": 1}
+            api.templates[codename] = template
+        self.send_json(template, 201)
+
+    def get_template(self, codename):
+        template = self.server.api.templates.get(codename)
+        if template is None:
+            return self.send_error_json(404, 10021, "No template with the requested codename was found")
+        self.send_json(template)
+
+    def put_template(self, codename):
+        template = self.server.api.templates.get(codename)
+        if template is None:
+            return self.send_error_json(404, 10021, "No template with the requested codename was found")
+        if "profile_id" not in template:
+            return self.send_error_json(403, 10022, "System templates cannot be changed")
+        data = self.json_body()
+        template.update({"template_name": data.get("template_name", template["template_name"]),
+                         "description": data.get("description", template["description"]),
+                         "settings": json.dumps(data.get("settings", {}))})
+        self.send_json(template)
+
+    def delete_template(self, codename):
+        api = self.server.api
+        template = api.templates.get(codename)
+        if template is None:
+            return self.send_error_json(404, 10021, "No template with the requested codename was found")
+        if "profile_id" not in template:
+            return self.send_error_json(403, 10022, "System templates cannot be deleted")
+        with api.lock:
+            api.templates.pop(codename, None)
+        self.send_empty(204)
+
+    # Packages
+
+    def get_file(self, name):
+        api = self.server.api
+        content = api.package(name)
+        etag = '"%s"' % sha256(content).hexdigest()[:16]
+        start, end, status = 0, len(content), 200
+
+        requested_range = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if requested_range and self.headers.get("If-Range", etag) == etag:
+            start = int(requested_range.group(1))
+            end = min(len(content), int(requested_range.group(2)) + 1) if requested_range.group(2) else len(content)
+            if start >= len(content):
+                return self.send_empty(416, {"Content-Range": "bytes */%d" % len(content)})
+            status = 206
+
+        body = content[start:end]
+        self.send_response(status)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end - 1, len(content)))
+        self.end_headers()
+
+        if api.draw_truncation():
+            # close the connection halfway through the body
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            api.record_response(self.label, "truncated", len(body) // 2)
+            return
+        self.wfile.write(body)
+        api.record_response(self.label, status, len(body))
+
+    def get_stats(self):
+        self.send_json(self.server.api.statistics())
+
+
+class MockAPIServer(ThreadingHTTPServer):
+    # the listen backlog is set when binding, high enough for the concurrent connections of large batches
+    request_queue_size = 128
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients dropping their connections (a cancelled command, a cut download) are not errors of the mock
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockAPI(object):
+    """ A local stand-in for the Didimo API, served from a background thread.
+    Implements the endpoints used by the CLI: didimo creation (with cost
+    estimation), listing, details, deletion and metadata, assets (hair and
+    vertex deformation), bulk requests, didimo generation templates,
+    cli_signature and DGP version resolution, account status, and package
+    downloads (with byte ranges) from /files.
+    Didimos go from pending to processing to done in <processing_time>
+    seconds, a share of <error_rate> of them ending in error instead. Every
+    request waits <latency> seconds, plus up to <jitter> more. Faults are
+    drawn for each API request whose path matches <fault_paths>:
+    <throttle_rate> of them are answered with 429 and a Retry-After of
+    <retry_after> seconds, <server_error_rate> with a 500/502/503. A share of
+    <truncate_rate> of the package downloads stop halfway.
+    Point a CLI configuration to <url> and use <access_key> as its API key.
+    statistics() (also at GET /mock/stats) counts requests by endpoint and
+    status, connections and bytes.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, cli_signature="2_5_10", dgp_version="2.5.10", access_key="mock-api-key",
+                 latency=0.0, jitter=0.0, processing_time=3.0, error_rate=0.0, throttle_rate=0.0, server_error_rate=0.0,
+                 truncate_rate=0.0, retry_after=1, fault_paths=DEFAULT_FAULT_PATHS, package_size=DEFAULT_PACKAGE_SIZE, seed=None):
+        self.cli_signature = cli_signature
+        self.dgp_version = dgp_version
+        self.access_key = access_key
+        self.latency = latency
+        self.jitter = jitter
+        self.processing_time = processing_time
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.server_error_rate = server_error_rate
+        self.truncate_rate = truncate_rate
+        self.retry_after = retry_after
+        self.fault_paths = fault_paths
+        self.package_size = package_size
+        self.balance = 1000000
+
+        self.lock = threading.Lock()
+        self.didimos = {}
+        self.assets = {}
+        self.bulks = {}
+        self.templates = {"default": {"codename": "default", "template_name": "Default", "description": "System template",
+                                      "settings": json.dumps({"input_type": "photo"}), "created_at": "2022-01-01T00:00:00"}}
+        self._random = random.Random(seed)
+        self._counter = 0
+        self._requests = {}
+        self._connections = set()
+        self._bytes_received = 0
+        self._bytes_sent = 0
+
+        self._server = MockAPIServer((host, port), MockAPIHandler)
+        self._server.api = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def _draw(self):
+        with self.lock:
+            return self._random.random()
+
+    def wait_latency(self):
+        delay = self.latency + (self._draw() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def draw_fault(self):
+        """ 429, a 5xx status or None """
+        if not (self.throttle_rate or self.server_error_rate):
+            return None
+        draw = self._draw()
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.server_error_rate:
+            return (500, 502, 503)[int(draw * 1000) % 3]
+        return None
+
+    def draw_truncation(self):
+        return bool(self.truncate_rate) and self._draw() < self.truncate_rate
+
+    def create_didimo(self, input_type, transfer_formats=None, kind="didimos"):
+        with self.lock:
+            self._counter = self._counter + 1
+            prefix = "dm" if kind == "didimos" else "as"
+            item = {"key": "%s%08d" % (prefix, self._counter), "input_type": input_type,
+                    "transfer_formats": transfer_formats or ["gltf", "fbx"],
+                    "fails": self._random.random() < self.error_rate,
+                    "created_ts": time.time(), "created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "meta_data": {}}
+            getattr(self, kind)[item["key"]] = item
+        return item
+
+    def progress(self, item):
+        """ (status, percent, status message) of a didimo or asset at this time """
+        elapsed = time.time() - item["created_ts"]
+        if self.processing_time <= 0 or elapsed >= self.processing_time:
+            if item["fails"]:
+                return "error", 100, "Simulated processing error"
+            return "done", 100, ""
+        if elapsed < self.processing_time * 0.1:
+            return "pending", 0, ""
+        return "processing", int(elapsed / self.processing_time * 100), ""
+
+    def didimo_details(self, item, base_url):
+        status, percent, status_message = self.progress(item)
+        return {"key": item["key"], "status": status, "percent": percent, "status_message": status_message,
+                "input_type": item["input_type"], "cost": 1, "created_at": item["created_at"],
+                "expires_at": "2032-01-01 00:00:00", "is_favorite": False,
+                "meta_data": [{"name": name, "value": value, "definer": "user"} for name, value in item["meta_data"].items()],
+                "transfer_formats": [{"name": name, "__links": {"self": "%s/files/%s_%s.zip" % (base_url, item["key"], name)}}
+                                     for name in item["transfer_formats"]]}
+
+    def create_bulk(self, names, input_type, transfer_formats=None):
+        items = []
+        for name in names:
+            didimo = self.create_didimo(input_type, transfer_formats)
+            items.append({"uuid": str(uuid.uuid4()), "request_key": didimo["key"], "file": name})
+        bulk = {"uuid": str(uuid.uuid4()), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "items": items}
+        with self.lock:
+            self.bulks[bulk["uuid"]] = bulk
+        return bulk
+
+    def bulk_details(self, bulk):
+        items = []
+        for item in bulk["items"]:
+            didimo = self.didimos.get(item["request_key"])
+            status = "error" if didimo is None else self.progress(didimo)[0]
+            items.append(dict(item, status={"done": "completed"}.get(status, status)))
+        statuses = set(item["status"] for item in items)
+        if statuses <= {"completed"}:
+            status = "completed"
+        elif statuses <= {"completed", "error"}:
+            status = "error"
+        else:
+            status = "processing"
+        return {"uuid": bulk["uuid"], "created_at": bulk["created_at"], "status": status, "items": items}
+
+    def package(self, name):
+        """ Content of the package file <name>, the same on every request """
+        block = sha256(name.encode("utf-8")).digest()
+        return (b"PK\x03\x04" + block * (self.package_size // len(block) + 1))[:self.package_size]
+
+    def record_connection(self, client_address, size):
+        with self.lock:
+            self._connections.add(client_address)
+            self._bytes_received = self._bytes_received + size
+
+    def record_response(self, label, status, size):
+        with self.lock:
+            counts = self._requests.setdefault(label, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+            self._bytes_sent = self._bytes_sent + size
+
+    def statistics(self):
+        with self.lock:
+            return {"requests": {label: dict(counts) for label, counts in self._requests.items()},
+                    "connections": len(self._connections),
+                    "bytes_received": self._bytes_received,
+                    "bytes_sent": self._bytes_sent,
+                    "didimos": len(self.didimos)}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on.")
+@click.option("--port", type=int, default=8765, show_default=True, help="Port to listen on.")
+@click.option("--cli-signature", default="2_5_10", show_default=True, help="cli_signature announced to the CLI.")
+@click.option("--latency", type=float, default=0.0, show_default=True, help="Seconds every request waits.")
+@click.option("--jitter", type=float, default=0.0, show_default=True, help="Up to this many seconds are added to the latency.")
+@click.option("--processing-time", type=float, default=3.0, show_default=True, help="Seconds a didimo takes to be done.")
+@click.option("--error-rate", type=float, default=0.0, show_default=True, help="Share of the didimos ending in error.")
+@click.option("--throttle-rate", type=float, default=0.0, show_default=True, help="Share of the API requests answered with 429.")
+@click.option("--server-error-rate", type=float, default=0.0, show_default=True, help="Share of the API requests answered with a 5xx.")
+@click.option("--truncate-rate", type=float, default=0.0, show_default=True, help="Share of the downloads cut halfway.")
+@click.option("--retry-after", type=int, default=1, show_default=True, help="Retry-After of the 429 responses, in seconds.")
+@click.option("--fault-paths", default=DEFAULT_FAULT_PATHS, show_default=True, help="Regular expression of the paths answered with faults.")
+@click.option("--package-size", type=int, default=DEFAULT_PACKAGE_SIZE, show_default=True, help="Size of the packages, in bytes.")
+@click.option("--seed", type=int, default=None, help="Seed of the fault and error draws.")
+def main(host, port, cli_signature, **settings):
+    """
+    Serve a local stand-in of the Didimo API until interrupted
+    """
+    with MockAPI(host, port, cli_signature, **settings) as api:
+        click.echo("Mock Didimo API listening on %s (API key: %s)" % (api.url, api.access_key))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
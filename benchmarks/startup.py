@@ -0,0 +1,150 @@
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from .environment import RESULTS_DIR, make_home, copy_sources, cli_environment, cli_command, run_metadata, store_results, previous_results
+from .mock_api import MockAPI
+
+# Commands measured, as (label, arguments). "new --help" and "bulk list --help" go through the versioned dispatch of
+# MultiVersionCommandGroup (cli_signature resolution and the import of the matching command module)
+STARTUP_COMMANDS = [
+    ("version", ["version"]),
+    ("status", ["status", "{didimo}"]),
+    ("new --help", ["new", "--help"]),
+    ("bulk list --help", ["bulk", "list", "--help"]),
+]
+
+
+def run_cli(args, env, interpreter_options=()):
+    """
+    Runs `didimo <args>` from the home of <env> and returns (seconds, stderr)
+    """
+    started = time.perf_counter()
+    p = subprocess.run(cli_command(*args, interpreter_options=interpreter_options), env=env, cwd=env["HOME"],
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - started
+    if p.returncode != 0:
+        raise click.ClickException("`didimo %s` exited with %d:\n%s" % (" ".join(args), p.returncode, p.stderr.decode(errors="replace")))
+    return elapsed, p.stderr.decode(errors="replace")
+
+
+def summarize(timings):
+    """
+    min/median/mean/max of <timings> (seconds) in milliseconds
+    """
+    return {"min_ms": round(min(timings) * 1000, 2),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "mean_ms": round(statistics.mean(timings) * 1000, 2),
+            "max_ms": round(max(timings) * 1000, 2)}
+
+
+def parse_importtime(stderr, top):
+    """
+    Breakdown of a `python -X importtime` report: total import time, the time spent in each top-level package
+    and the <top> slowest modules, all by self time in microseconds
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue # the header line
+        modules.append({"module": fields[2].strip(), "self_us": self_us, "cumulative_us": cumulative_us})
+
+    packages = {}
+    for module in modules:
+        package = module["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + module["self_us"]
+    return {"total_us": sum(module["self_us"] for module in modules),
+            "packages": dict(sorted(packages.items(), key=lambda item: -item[1])[:top]),
+            "modules": sorted(modules, key=lambda module: -module["self_us"])[:top]}
+
+
+def measure_command(args, home, scratch, runs, top):
+    """
+    Cold runs start from a fresh copy of the sources (nothing compiled yet) and empty CLI caches, as the first
+    command after an install. Warm runs share the copy and the caches of a first unmeasured run
+    """
+    cold = []
+    for index in range(runs):
+        run_dir = Path(tempfile.mkdtemp(prefix="cold-%d-" % index, dir=str(scratch)))
+        env = cli_environment(home, run_dir / "cache", copy_sources(run_dir / "src"), write_bytecode=False)
+        cold.append(run_cli(args, env)[0])
+
+    warm_dir = Path(tempfile.mkdtemp(prefix="warm-", dir=str(scratch)))
+    env = cli_environment(home, warm_dir / "cache", copy_sources(warm_dir / "src"))
+    run_cli(args, env)
+    warm = [run_cli(args, env)[0] for _ in range(runs)]
+
+    _, stderr = run_cli(args, env, interpreter_options=["-X", "importtime"])
+    return {"arguments": args, "cold": summarize(cold), "warm": summarize(warm), "importtime": parse_importtime(stderr, top)}
+
+
+def compare(results, previous, threshold):
+    """
+    Prints the change of the warm and cold medians against <previous> results.
+    Returns the labels of the commands that got slower by more than <threshold> percent
+    """
+    regressions = []
+    click.echo("\nCompared with %s (%s):" % (previous.get("git_commit") or "unknown commit", previous.get("created_at")))
+    for label, measures in results["commands"].items():
+        before = previous.get("commands", {}).get(label)
+        if before is None:
+            continue
+        for kind in ("cold", "warm"):
+            old, new = before[kind]["median_ms"], measures[kind]["median_ms"]
+            change = (new - old) / old * 100 if old else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append(label)
+            click.echo("  %-20s %-4s %8.1f ms -> %8.1f ms (%+.1f%%)%s" % (label, kind, old, new, change, flag))
+    return sorted(set(regressions))
+
+
+@click.command()
+@click.option("--runs", type=click.IntRange(1, 1000), default=10, show_default=True, help="Runs of each command, cold and warm.")
+@click.option("--top", type=click.IntRange(1, 100), default=10, show_default=True, help="Packages and modules listed in the import time breakdown.")
+@click.option("--results-dir", type=click.Path(file_okay=False), default=str(RESULTS_DIR), show_default=True, help="Where results are stored.")
+@click.option("--store/--no-store", default=True, show_default=True, help="Store the results for later comparisons.")
+@click.option("--threshold", type=float, default=10.0, show_default=True, help="Slowdown, in percent, reported as a regression.")
+@click.option("--fail-on-regression", is_flag=True, default=False, help="Exit with 1 when a command got slower than the threshold.")
+def main(runs, top, results_dir, store, threshold, fail_on_regression):
+    """
+    Measures the start-up time of representative CLI commands against a local mock API
+    """
+    results = run_metadata()
+    results.update({"benchmark": "startup", "runs": runs, "commands": {}})
+    previous = previous_results("startup", results_dir)
+
+    with MockAPI(processing_time=0) as api, tempfile.TemporaryDirectory(prefix="didimo-startup-") as scratch:
+        home = make_home(Path(scratch) / "home", api)
+        didimo = api.create_didimo("photo")
+        for label, args in STARTUP_COMMANDS:
+            args = [arg.format(didimo=didimo["key"]) for arg in args]
+            measures = measure_command(args, home, Path(scratch), runs, top)
+            results["commands"][label] = measures
+
+            importtime = measures["importtime"]
+            click.echo("%-20s cold %8.1f ms | warm %8.1f ms | imports %7.1f ms" % (label, measures["cold"]["median_ms"],
+                                                                                  measures["warm"]["median_ms"],
+                                                                                  importtime["total_us"] / 1000.0))
+            click.echo("    " + ", ".join("%s %.1f ms" % (package, us / 1000.0) for package, us in importtime["packages"].items()))
+
+    if store:
+        click.echo("\nResults stored in %s" % store_results("startup", results, results_dir))
+
+    regressions = compare(results, previous, threshold) if previous is not None else []
+    if regressions and fail_on_regression:
+        raise click.ClickException("Start-up regressions: %s" % ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import click
+
+from cli.polling import POLL_MODES
+
+from .environment import REPO_ROOT, RESULTS_DIR, make_home, cli_environment, run_metadata, store_results, previous_results
+from .mock_api import MockAPI
+
+# Stages whose latencies are reported, in seconds:
+#   upload        the upload request of a photo
+#   processing    from the end of the upload to the status poll that finds the didimo done (includes --processing-time)
+#   download_wait from the didimo being found done to a download worker picking it up
+#   download      the download of all the packages of the didimo
+#   end_to_end    from the start of the upload to the end of the download
+STAGES = ("upload", "processing", "download_wait", "download", "end_to_end")
+
+
+def int_list(ctx, param, value):
+    """
+    Parses a comma separated list of positive integers
+    """
+    try:
+        values = [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise click.BadParameter("expected comma separated integers, got %r" % value)
+    if not values or min(values) < 1:
+        raise click.BadParameter("expected positive integers, got %r" % value)
+    return values
+
+
+def make_photos(directory, count, size):
+    """
+    Writes <count> synthetic photos of <size> bytes to <directory> and returns it. Only their JPEG markers are
+    real, the mock API never decodes them
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        with open(str(directory / ("photo-%05d.jpg" % index)), "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0" + os.urandom(max(0, size - 6)) + b"\xff\xd9")
+    return directory
+
+
+def percentiles(values):
+    """
+    p50/p95/p99 (nearest rank) and max of <values> (seconds) in milliseconds, None when there are no values
+    """
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(percent):
+        return values[max(0, int(round(percent / 100.0 * len(values))) - 1)]
+
+    return {"count": len(values),
+            "p50_ms": round(rank(50) * 1000, 2),
+            "p95_ms": round(rank(95) * 1000, 2),
+            "p99_ms": round(rank(99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2)}
+
+
+def peak_rss_bytes():
+    """
+    Peak resident set size of this process, None when the platform does not tell
+    """
+    try:
+        import resource
+    except ImportError: # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def directory_size(directory):
+    total = 0
+    for root, _, files in os.walk(str(directory)):
+        for name in files:
+            total = total + os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class StageTimer(object):
+    """ Records when every didimo of a batch enters and leaves each stage.
+    install() wraps the upload worker, the status poller and the download pool
+    used by new_aux_shared_pipeline, so the batch goes through the code of the
+    CLI unchanged; the wrappers only take timestamps. The stages run on
+    different threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.upload_started = {}
+        self.uploaded = {}
+        self.processed = {}
+        self.download_started = {}
+        self.downloaded = {}
+        self.upload_errors = 0
+        self.processing_errors = 0
+        self.download_errors = 0
+
+    def install(self):
+        from cli import shared_processing, polling, download_pool
+
+        upload_worker = shared_processing.new_aux_shared_upload_worker
+        poller_update = polling.StatusPoller.update
+        pool_download = download_pool.DownloadPool._download
+        timer = self
+
+        def timed_upload_worker(*args, **kwargs):
+            started = time.monotonic()
+            result = upload_worker(*args, **kwargs)
+            with timer.lock:
+                if result["error"] == 1:
+                    timer.upload_errors = timer.upload_errors + 1
+                else:
+                    timer.upload_started[result["didimo_id"]] = started
+                    timer.uploaded[result["didimo_id"]] = time.monotonic()
+            return result
+
+        def timed_update(poller, didimo_id, response):
+            result = poller_update(poller, didimo_id, response)
+            if result is not None:
+                with timer.lock:
+                    timer.processed[didimo_id] = time.monotonic()
+                    if result["error"] == 1:
+                        timer.processing_errors = timer.processing_errors + 1
+            return result
+
+        def timed_download(pool, didimo_id):
+            started = time.monotonic()
+            results = pool_download(pool, didimo_id)
+            with timer.lock:
+                timer.download_started[didimo_id] = started
+                if any(result["download_error"] for result in results):
+                    timer.download_errors = timer.download_errors + 1
+                else:
+                    timer.downloaded[didimo_id] = time.monotonic()
+            return results
+
+        shared_processing.new_aux_shared_upload_worker = timed_upload_worker
+        polling.StatusPoller.update = timed_update
+        download_pool.DownloadPool._download = timed_download
+
+    def latencies(self):
+        def between(starts, ends):
+            return [ends[key] - starts[key] for key in ends if key in starts]
+
+        return {"upload": between(self.upload_started, self.uploaded),
+                "processing": between(self.uploaded, self.processed),
+                "download_wait": between(self.processed, self.download_started),
+                "download": between(self.download_started, self.downloaded),
+                "end_to_end": between(self.upload_started, self.downloaded)}
+
+
+def run_cell(spec):
+    """
+    Runs one batch described by <spec> with the CLI configuration found in HOME and returns its measures.
+    Meant to run in a process of its own (see measure_cell), so the peak RSS is the one of that batch alone
+    """
+    from cli.config import Config
+    from cli.shared_processing import new_aux_shared_preprocess_batch_files, new_aux_shared_upload_processing_and_download
+
+    config = Config()
+    config.load()
+    config.load_configuration(config.configuration, False)
+
+    timer = StageTimer()
+    timer.install()
+
+    batch_files = new_aux_shared_preprocess_batch_files(spec["photos"], "photo", True)
+    started = time.monotonic()
+    new_aux_shared_upload_processing_and_download(config, config.api_host + "/v3/didimos", batch_files, None, {"input_type": "photo"},
+                                                  False, False, spec["output"], True, True,
+                                                  spec["upload_concurrency"], spec["poll_concurrency"], spec["download_concurrency"],
+                                                  None, spec["poll_mode"])
+    elapsed = time.monotonic() - started
+
+    downloaded_bytes = directory_size(spec["output"])
+    return {"seconds": round(elapsed, 3),
+            "didimos": len(timer.downloaded),
+            "didimos_per_minute": round(len(timer.downloaded) / elapsed * 60, 2),
+            "downloaded_bytes": downloaded_bytes,
+            "download_bytes_per_second": round(downloaded_bytes / elapsed, 1),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "errors": {"upload": timer.upload_errors, "processing": timer.processing_errors, "download": timer.download_errors},
+            "latencies": {stage: percentiles(values) for stage, values in timer.latencies().items()}}
+
+
+def run_cell_main():
+    """
+    Entry point of the batch process: runs the spec given as a JSON argument and writes the measures to spec["results"]
+    """
+    spec = json.loads(sys.argv[1])
+    with open(spec["results"], "w") as f:
+        json.dump(run_cell(spec), f)
+
+
+def measure_cell(count, photos, upload_concurrency, poll_concurrency, download_concurrency, poll_mode, mock_settings, scratch):
+    """
+    Runs a batch of the <count> photos in <photos> through a fresh MockAPI, in a new process.
+    Returns its measures, along with the statistics of the mock and the upload throughput
+    """
+    cell_dir = Path(tempfile.mkdtemp(prefix="cell-", dir=str(scratch)))
+    spec = {"photos": str(photos), "output": str(cell_dir / "output"), "results": str(cell_dir / "results.json"),
+            "upload_concurrency": upload_concurrency, "poll_concurrency": poll_concurrency,
+            "download_concurrency": download_concurrency, "poll_mode": poll_mode}
+    Path(spec["output"]).mkdir()
+
+    with MockAPI(**mock_settings) as api:
+        home = make_home(cell_dir / "home", api, output_display_type="json")
+        env = cli_environment(home, cell_dir / "cache")
+        p = subprocess.run([sys.executable, "-c", "from benchmarks.throughput import run_cell_main; run_cell_main()", json.dumps(spec)],
+                           env=env, cwd=str(REPO_ROOT), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if p.returncode != 0:
+            raise click.ClickException("The batch of %d photos exited with %d:\n%s" % (count, p.returncode, p.stderr.decode(errors="replace")))
+        statistics = api.statistics()
+
+    with open(spec["results"]) as f:
+        measures = json.load(f)
+    shutil.rmtree(spec["output"]) # large batches download gigabytes
+    measures.update({"photos": count, "upload_concurrency": upload_concurrency, "poll_concurrency": poll_concurrency,
+                     "download_concurrency": download_concurrency, "poll_mode": poll_mode,
+                     "upload_bytes_per_second": round(statistics["bytes_received"] / measures["seconds"], 1),
+                     "mock": statistics})
+    return measures
+
+
+def cell_label(count, upload_concurrency, poll_concurrency, download_concurrency, poll_mode):
+    return "n=%d upload=%d poll=%d download=%d mode=%s" % (count, upload_concurrency, poll_concurrency, download_concurrency, poll_mode)
+
+
+def print_cell(label, measures):
+    rss = measures["peak_rss_bytes"]
+    errors = measures["errors"]
+    requests = measures["mock"]["requests"]
+    click.echo("%-52s %9.1f didimos/min | %9.1f KiB/s down | %9.1f KiB/s up | peak RSS %s | errors %d/%d/%d"
+               % (label, measures["didimos_per_minute"], measures["download_bytes_per_second"] / 1024.0,
+                  measures["upload_bytes_per_second"] / 1024.0, "?" if rss is None else "%.1f MiB" % (rss / 1048576.0),
+                  errors["upload"], errors["processing"], errors["download"]))
+    # the details of each didimo are also requested once before its download
+    click.echo("    didimo requests: %d list pages, %d single didimos"
+               % (sum(requests.get("GET /v3/didimos", {}).values()), sum(requests.get("GET /v3/didimos/{key}", {}).values())))
+    for stage in STAGES:
+        latencies = measures["latencies"][stage]
+        if latencies is not None:
+            click.echo("    %-14s p50 %9.1f ms | p95 %9.1f ms | p99 %9.1f ms" % (stage, latencies["p50_ms"], latencies["p95_ms"], latencies["p99_ms"]))
+
+
+def compare(results, previous, threshold):
+    """
+    Prints the change of the throughput of every batch against <previous> results.
+    Returns the labels of the batches whose didimos per minute dropped by more than <threshold> percent
+    """
+    regressions = []
+    click.echo("\nCompared with %s (%s):" % (previous.get("git_commit") or "unknown commit", previous.get("created_at")))
+    for label, measures in results["cells"].items():
+        before = previous.get("cells", {}).get(label)
+        if before is None:
+            continue
+        old, new = before["didimos_per_minute"], measures["didimos_per_minute"]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(label)
+        click.echo("  %-52s %9.1f -> %9.1f didimos/min (%+.1f%%)%s" % (label, old, new, change, flag))
+    return regressions
+
+
+@click.command()
+@click.option("--sizes", default="10,100,1000,10000", show_default=True, callback=int_list, help="Photos per batch, comma separated.")
+@click.option("--upload-concurrency", default="1,4", show_default=True, callback=int_list, help="Upload concurrencies tried, comma separated.")
+@click.option("--poll-concurrency", default="1,4", show_default=True, callback=int_list, help="Poll concurrencies tried, comma separated.")
+@click.option("--download-concurrency", default="5", show_default=True, callback=int_list, help="Download concurrencies tried, comma separated.")
+@click.option("--poll-mode", "poll_modes", type=click.Choice(POLL_MODES), multiple=True, default=["auto"], show_default=True,
+              help="Status polling modes tried. This flag can be used multiple times.")
+@click.option("--processing-time", type=float, default=2.0, show_default=True, help="Seconds the mock takes to process a didimo.")
+@click.option("--latency", type=float, default=0.0, show_default=True, help="Seconds every mock API request waits.")
+@click.option("--photo-size", type=click.IntRange(16, None), default=32 * 1024, show_default=True, help="Size of the synthetic photos, in bytes.")
+@click.option("--package-size", type=click.IntRange(1, None), default=64 * 1024, show_default=True, help="Size of each downloaded package, in bytes.")
+@click.option("--results-dir", type=click.Path(file_okay=False), default=str(RESULTS_DIR), show_default=True, help="Where results are stored.")
+@click.option("--store/--no-store", default=True, show_default=True, help="Store the results for later comparisons.")
+@click.option("--threshold", type=float, default=10.0, show_default=True, help="Throughput drop, in percent, reported as a regression.")
+@click.option("--fail-on-regression", is_flag=True, default=False, help="Exit with 1 when a batch got slower than the threshold.")
+def main(sizes, upload_concurrency, poll_concurrency, download_concurrency, poll_modes, processing_time, latency, photo_size, package_size,
+         results_dir, store, threshold, fail_on_regression):
+    """
+    Measures the throughput of batches of synthetic photos going through upload, processing and download against a
+    local mock API, for every combination of batch size and upload, poll and download concurrency
+    """
+    mock_settings = {"processing_time": processing_time, "latency": latency, "package_size": package_size, "seed": 0}
+    results = run_metadata()
+    results.update({"benchmark": "throughput", "photo_size": photo_size, "mock_settings": mock_settings, "cells": {}})
+    previous = previous_results("throughput", results_dir)
+
+    with tempfile.TemporaryDirectory(prefix="didimo-throughput-") as scratch:
+        for count in sizes:
+            photos = make_photos(Path(scratch) / ("photos-%d" % count), count, photo_size)
+            for uploads in upload_concurrency:
+                for polls in poll_concurrency:
+                    for downloads in download_concurrency:
+                        for poll_mode in poll_modes:
+                            label = cell_label(count, uploads, polls, downloads, poll_mode)
+                            measures = measure_cell(count, photos, uploads, polls, downloads, poll_mode, mock_settings, scratch)
+                            results["cells"][label] = measures
+                            print_cell(label, measures)
+
+    if store:
+        click.echo("\nResults stored in %s" % store_results("throughput", results, results_dir))
+
+    regressions = compare(results, previous, threshold) if previous is not None else []
+    if regressions and fail_on_regression:
+        raise click.ClickException("Throughput regressions: %s" % ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import fnmatch
+import os
+import zipfile
+
+# Inputs accepted by the photo pipeline, by extension and by leading bytes
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png")
+PHOTO_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n")
+
+
+class ZipMember(object):
+    """ A batch input file stored inside a zip archive.
+    The member is only read when open() is called, straight from the archive,
+    so batch inputs never need to be extracted to disk. The archive is shared
+    by all its members: zipfile serializes the reads of concurrent members, so
+    several uploads can stream from the same archive.
+    str() gives "<archive path>/<member name>", which is how the member is
+    shown to the user and reported in the results.
+    """
+
+    def __init__(self, archive, archive_path, name):
+        self.archive = archive
+        self.archive_path = archive_path
+        self.name = name
+
+    def open(self):
+        """ Returns a binary file object with the content of the member """
+        return self.archive.open(self.name, 'r')
+
+    def __str__(self):
+        return os.path.join(self.archive_path, self.name)
+
+    def __repr__(self):
+        return "ZipMember(%r, %r)" % (self.archive_path, self.name)
+
+
+class BatchFiles(object):
+    """ The photos of a batch, discovered lazily from a directory or a zip archive.
+    Iterating walks the input again and yields the files one at a time
+    (paths for a directory, ZipMembers for an archive), so a batch of any size
+    is never held in memory or listed upfront. Directories are walked
+    recursively with os.scandir.
+    A file is part of the batch when its path relative to the input matches
+    one of the <include> globs (any file when there are none) and none of the
+    <exclude> globs, and when it looks like a photo: a .jpg/.jpeg/.png
+    extension, or for other extensions a JPEG/PNG signature in its first bytes.
+    Hidden entries (dot files, __MACOSX) are skipped.
+    <found> is the running count of files yielded by the current iteration.
+    The zip archive stays open for its members until close(), or the end of a
+    with block.
+    """
+
+    def __init__(self, input, include=(), exclude=()):
+        self.input = input
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.found = 0
+        self._count = None
+        self._archive = None
+
+    def _selected(self, relative_path):
+        if self.include and not any(fnmatch.fnmatch(relative_path, pattern) for pattern in self.include):
+            return False
+        return not any(fnmatch.fnmatch(relative_path, pattern) for pattern in self.exclude)
+
+    def _is_photo(self, name, input_file):
+        if os.path.splitext(name)[1].lower() in PHOTO_EXTENSIONS:
+            return True
+        try:
+            with open_batch_file(input_file) as f:
+                head = f.read(8)
+        except (OSError, zipfile.BadZipFile):
+            return False
+        return head.startswith(PHOTO_SIGNATURES)
+
+    def _walk_directory(self):
+        pending = [self.input]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name == "__MACOSX":
+                        continue
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                        continue
+                    relative_path = os.path.relpath(entry.path, self.input).replace(os.sep, "/")
+                    if self._selected(relative_path) and self._is_photo(entry.name, entry.path):
+                        yield entry.path
+
+    def _walk_archive(self):
+        if self._archive is None:
+            self._archive = zipfile.ZipFile(self.input, 'r')
+        for info in self._archive.infolist():
+            if info.is_dir():
+                continue
+            parts = info.filename.split("/")
+            if any(part.startswith(".") or part == "__MACOSX" for part in parts):
+                continue
+            member = ZipMember(self._archive, self.input, info.filename)
+            if self._selected(info.filename) and self._is_photo(parts[-1], member):
+                yield member
+
+    def __iter__(self):
+        self.found = 0
+        walk = self._walk_archive() if self.input.endswith('.zip') else self._walk_directory()
+        for input_file in walk:
+            self.found = self.found + 1
+            yield input_file
+        self._count = self.found
+
+    def __len__(self):
+        """ Number of files in the batch. Walks the whole input the first time """
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+
+    def first(self):
+        """ The first file of the batch, None when it is empty """
+        return next(iter(self), None)
+
+    def close(self):
+        """ Closes the zip archive, if one was opened. Iterating again opens it again """
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_batch_file(input_file):
+    """
+    Opens a batch input file for reading, either a path on disk or a ZipMember
+    """
+    if isinstance(input_file, ZipMember):
+        return input_file.open()
+    return open(input_file, 'rb')
@@ -0,0 +1,218 @@
+import calendar
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from hashlib import sha256
+from pathlib import Path
+
+# A didimo in one of these states no longer changes
+TERMINAL_STATUSES = ("done", "error")
+
+# Fields of the document of /v3/didimos/{key} that the commands read. Documents from elsewhere, e.g. the items of the
+# didimo list, may lack some of them and are only used in its place when they have them all
+DIDIMO_DOCUMENT_FIELDS = ("key", "status", "percent", "status_message", "input_type", "created_at", "transfer_formats")
+
+
+def is_didimo_document(document):
+    """
+    Whether <document> has every field of the document of /v3/didimos/{key} read by the commands
+    """
+    return isinstance(document, dict) and all(field in document for field in DIDIMO_DOCUMENT_FIELDS)
+
+
+def user_cache_dir():
+    """
+    Directory where the CLI keeps its caches, following the conventions of each platform
+    """
+    if platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+        path = Path(base) / "didimo" / "Cache"
+    elif platform.system() == "Darwin":
+        path = Path.home() / "Library" / "Caches" / "didimo"
+    else:
+        path = Path(os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")) / "didimo"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def account_cache_name(config):
+    """
+    Name of the caches of the account of <config>, the same for every configuration using its API host and access key
+    """
+    return sha256(("%s|%s" % (config.api_host, config.access_key)).encode('utf-8')).hexdigest()[:16]
+
+
+def write_json_atomic(path, data):
+    """
+    Writes <data> as JSON to <path> through a temporary file, so concurrent readers never see a partial file
+    """
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, str(path))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class TTLStore(object):
+    """ A small JSON file in the user cache dir mapping keys to values and the time they were stored.
+    Meant for a handful of entries shared by consecutive CLI invocations: the
+    whole file is read on every lookup and rewritten atomically on every store.
+    """
+
+    def __init__(self, name):
+        self.path = user_cache_dir() / ("%s.json" % name)
+
+    def _read(self):
+        try:
+            with open(str(self.path)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        """ Returns (value, age in seconds), or (None, None) when <key> is not stored """
+        entry = self._read().get(key)
+        if entry is None:
+            return None, None
+        return entry["value"], max(0.0, time.time() - entry["stored_at"])
+
+    def set(self, key, value):
+        entries = self._read()
+        entries[key] = {"value": value, "stored_at": time.time()}
+        write_json_atomic(self.path, entries)
+
+
+# Upper bound of the disk space used by the HTTP cache, the least recently used responses are evicted first
+HTTP_CACHE_MAX_SIZE = 8 * 1024 * 1024
+
+
+class HTTPCache(object):
+    """ Disk cache of GET responses in the user cache dir, one JSON file per request.
+    An entry holds the status code, headers and body of a response (never the
+    pickled response object), plus the time it was stored or last revalidated.
+    Files are replaced atomically, so concurrent CLI processes can share the
+    cache. The modification time of a file records its last use, and once the
+    cache grows past <max_size> bytes the least recently used files are removed.
+    """
+
+    def __init__(self, max_size=HTTP_CACHE_MAX_SIZE):
+        self.directory = user_cache_dir() / "http"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+    def _path(self, key):
+        return self.directory / ("%s.json" % key)
+
+    def load(self, key):
+        """ Returns the stored entry of <key>, None when there is none """
+        path = self._path(key)
+        try:
+            with open(str(path)) as f:
+                entry = json.load(f)
+            os.utime(str(path))
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def store(self, key, entry):
+        write_json_atomic(self._path(key), entry)
+        self.evict()
+
+    def evict(self):
+        files = []
+        total_size = 0
+        for entry in os.scandir(str(self.directory)):
+            if entry.is_file() and entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue # removed by another process
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size = total_size + stat.st_size
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size = total_size - size
+
+    def clear(self):
+        for entry in os.scandir(str(self.directory)):
+            if entry.is_file():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+def expiry_time(document):
+    """
+    The "expires_at" of an API document as a UNIX time (it is given in UTC), None when it has none or cannot be read
+    """
+    expires_at = document.get("expires_at")
+    if not expires_at:
+        return None
+    try:
+        return calendar.timegm(time.strptime(str(expires_at)[:19].replace("T", " "), "%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        return None
+
+
+class DidimoCache(object):
+    """ Disk cache of the documents of didimos that are done or in error, one
+    JSON file per didimo in a directory of the account in the user cache dir.
+    Those documents (transfer formats included) do not change anymore, so an
+    entry is kept until the didimo expires, or until it is invalidated because
+    the CLI changed its metadata, deleted it, or could not download its files.
+    Documents of didimos still pending or processing are never stored.
+    """
+
+    def __init__(self, config):
+        self.directory = user_cache_dir() / "didimos" / account_cache_name(config)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.directory / ("%s.json" % sha256(key.encode('utf-8')).hexdigest())
+
+    def load(self, key):
+        """ The stored document of <key>, None when there is none or it expired """
+        try:
+            with open(str(self._path(key))) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expires = expiry_time(document)
+        if expires is not None and expires <= time.time():
+            self.invalidate(key)
+            return None
+        return document
+
+    def store(self, key, document):
+        """ Stores the document of <key> when the didimo is done or in error. Returns whether it was stored """
+        if not isinstance(document, dict) or document.get("status") not in TERMINAL_STATUSES:
+            return False
+        write_json_atomic(self._path(key), document)
+        return True
+
+    def invalidate(self, key):
+        try:
+            os.remove(str(self._path(key)))
+        except OSError:
+            pass
+
+
+def clear_didimo_cache():
+    """
+    Removes the cached didimo documents of every account
+    """
+    shutil.rmtree(str(user_cache_dir() / "didimos"), ignore_errors=True)
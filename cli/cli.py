@@ -1,74 +1,144 @@
 import click
+import importlib
 import json
 import sys
-import time
-import requests
-import zipfile
 import os
 import re
-import shutil
-import fnmatch
-import psutil
-import platform
-import multiprocessing
-from multiprocessing import current_process 
-from multiprocessing import Process
-from .shared_queue import MyQueue, SharedCounter
-
-from .utils import print_key_value, print_status_header, print_status_row, create_set, print_didimo_generation_template_header, print_didimo_generation_template_row
-from .utils import print_bulk_requests_header, print_bulk_requests_row, print_bulk_request_item_header, print_bulk_request_item_row
-from .network import DidimoAuth, http_get, http_post, http_post_withphoto, http_post_no_break, http_put, http_delete, cache_this_call, clear_network_cache, http_request_json
+import threading
+from hashlib import sha256
+
+from .utils import print_key_value, print_status_header, print_status_row, print_didimo_details, create_set
+from .network import DidimoAuth, configure_session, http_get, http_post_no_break, http_put, http_delete, cache_this_call, clear_network_cache, http_request
+from .cache import TTLStore, DidimoCache, clear_didimo_cache, TERMINAL_STATUSES
 from .config import Config
-from .helpers import DidimoNotFoundException, get_didimo_status, download_didimo, URL, download_asset, get_asset_status, wait_for_dgp_completion
+from .helpers import DidimoNotFoundException, get_didimo_status, download_didimo, URL
 from .helpers import get_cli_version_compatibility_rules, get_output_display_type_json_flag, list_aux, list_features_aux
-from .shared_processing import new_aux_shared_preprocess_batch_files, new_aux_shared_upload_processing_and_download, deformation_aux_shared_processing_and_download
-from .shared_processing import get_didimo_generation_template_aux, delete_didimo_generation_template_aux, generation_template_shared_response_processing
-from .shared_processing import new_aux_shared_upload_core, bulk_list_aux, bulk_get_aux
+from .helpers import sync_index, open_index, list_index_aux
+from .fanout import FanOut, DEFAULT_FANOUT_CONCURRENCY, read_ids
+from .paginator import DEFAULT_PREFETCH_PAGES
 from ._version import __version__
 
 pass_api = click.make_pass_decorator(Config)
 
 HELP_OPTION_NAMES=['--help', '-h']
 
+# Past its TTL, a cli_signature younger than this is still used while it is refreshed in the background
+CLI_SIGNATURE_MAX_STALE = 7 * 24 * 3600
+
+
+def resolve_cli_signature(config):
+    """
+    Asks the API which command signature (cli_signature) matches its DGP version
+    """
+    api_version = get_api_version(config)
+    #print("Current API/DGP Version: "+api_version)
+
+    for rule in get_cli_version_compatibility_rules(config):
+        if re.match(rule["pattern"], api_version):
+            return rule["settings"]["cli_signature"]
+    print("Error - please update Didimo CLI")
+    sys.exit(0)
+
+
+def fetch_cli_signature(config):
+    """
+    Same as resolve_cli_signature, without printing or exiting: returns None when no rule matches the API version,
+    and raises when it could not be requested. Used to revalidate the cached cli_signature in the background
+    """
+    responses = []
+    for api_path in ("/v3/accounts/default/applications", "/v3/platforms/cli"):
+        r = http_request("GET", config.api_host + api_path, auth=DidimoAuth(config, api_path))
+        r.raise_for_status()
+        responses.append(r.json())
+    applications, platform = responses
+
+    api_version = None
+    for app in applications["applications"]:
+        for app_key in app.get("api_keys", []):
+            if app_key["key"] == config.access_key:
+                api_version = app["dgp_version"]
+    rules = [rule for version in platform["versions"] if version["code"] == __version__
+             for rule in version["dgp_compatibility_rules"]]
+    for rule in rules:
+        if api_version is not None and re.match(rule["pattern"], api_version):
+            return rule["settings"]["cli_signature"]
+    return None
+
+
+def get_cli_signature(config):
+    """
+    cli_signature for the API host and access key of <config>, cached across invocations for config.cli_signature_ttl seconds.
+    An expired signature is refreshed in the background while it keeps being used, up to CLI_SIGNATURE_MAX_STALE.
+    """
+    if config.cli_signature_ttl <= 0:
+        return resolve_cli_signature(config)
+
+    store = TTLStore("cli_signature")
+    key = sha256(("%s|%s|%s" % (config.api_host, config.access_key, __version__)).encode('utf-8')).hexdigest()
+    cli_signature, age = store.get(key)
+
+    if cli_signature is None or age >= config.cli_signature_ttl + CLI_SIGNATURE_MAX_STALE:
+        cli_signature = resolve_cli_signature(config)
+        store.set(key, cli_signature)
+    elif age >= config.cli_signature_ttl:
+        # only writes the cache, without holding the exit of the command: when the API no longer matches this
+        # version, the value is dropped and the next invocation resolves it and reports the error
+        def revalidate():
+            try:
+                store.set(key, fetch_cli_signature(config))
+            except Exception:
+                pass # keep the previous value, it is retried on the next invocation
+        threading.Thread(target=revalidate, name="revalidate-cli-signature", daemon=True).start()
+    return cli_signature
+
+
+def get_versioned_command(cmd_name, cli_signature):
+    """
+    The <cmd_name> command of <cli_signature>, None when there is none. Each cli_signature has its own module of
+    commands (commands_2_5_7.py, ...), only the one in use is imported
+    """
+    module_name = "%s.commands_%s" % (__package__, cli_signature)
+    try:
+        module = importlib.import_module(module_name)
+    except ModuleNotFoundError as e:
+        if e.name != module_name:
+            raise
+        return None
+    return getattr(module, "%s_%s" % (cmd_name.replace("-", "_"), cli_signature), None)
+
+
 # https://click.palletsprojects.com/en/8.1.x/advanced/
 @click.help_option(*HELP_OPTION_NAMES)
 #@click.pass_context
 class MultiVersionCommandGroup(click.Group):
     def get_command(self, ctx, cmd_name):
 
+        # the hidden versioned names (new-2-5-7, bulk-2-5-10, generation-template-2-5-10, ...) run the commands
+        # of that cli_signature, whatever the API version
+        match = re.match(r"^(new|generation-template|bulk)-([a-z0-9-]+)$", cmd_name)
+        if match:
+            command = get_versioned_command(match.group(1), match.group(2).replace("-", "_"))
+            if command is not None:
+                command.name = cmd_name
+                return command
+
         if cmd_name == "new" or cmd_name == "generation-template" or cmd_name == "bulk":
             # We are only controlling "new" (to generate a new didimo) and "create" (to add a new didimo generation template)
 
-            Config.load(self)
-            Config.load_configuration(self, self.configuration, False)
-
-            api_version = get_api_version(self)
-            #print("Current API/DGP Version: "+api_version)
-
-            is_compatible = False
-            selected_rule = None
-            for rule in get_cli_version_compatibility_rules(self):
-                regex_expression = re.compile(rule["pattern"])
-                is_compatible = regex_expression.match(api_version)
-                if is_compatible:
-                    selected_rule = rule
-                    break
-            
+            # the group callback has not run yet, load the configuration selected with -c here
+            config = Config()
+            config.load()
+            config.load_configuration(ctx.params.get("config") or config.configuration, False)
+
+            cli_signature = get_cli_signature(config)
+
             #if not compatible, user is informed that CLI needs to be updated
             # TODO: This is not a boolean
             #if not is_compatible:
             #    print("Compatibility Error - please update Didimo CLI")
             #    sys.exit(0)
 
-            #api_version_compatibility_rule = get_cli_version_compatibility_rules(self)[0]
-            #print(">>>>Compatibility rule: "+str(api_version_compatibility_rule))
-
-            #regex_expression = re.compile(api_version_compatibility_rule)
-            #is_compatible = regex_expression.match(api_version)
-
-            method_name = cmd_name + "-" + selected_rule["settings"]["cli_signature"].replace("_", "-")
-
-            command = click.Group.get_command(self, ctx, method_name)
+            command = get_versioned_command(cmd_name, cli_signature)
 
             #if no match is found, user is informed that CLI needs to be updated
             if command is None:
@@ -163,16 +233,86 @@ def config(config, name):
               help="Sort by attribute name.")
 @click.option("-o", "--sort-order", required=False, default="descending", show_default=True,
               help="Sorting order of the content. Default is descending.")
+@click.option("-a", "--all", "all_pages", is_flag=True, default=False,
+              help="List every page from the page index on, without prompting. With the json output display type, each page is printed as a JSON document on its own line.")
+@click.option("--prefetch", type=click.IntRange(1, 32), default=DEFAULT_PREFETCH_PAGES, show_default=True,
+              help="Pages requested ahead of the one shown, and at the same time when the pages are numbered.")
+@click.option("--status", "status_filter", type=click.Choice(["pending", "processing", "done", "error"]),
+              help="Only list the didimos in this status. Needs the local index, see `didimo index sync`.")
+@click.option("--input-type", help="Only list the didimos of this input type. Needs the local index, see `didimo index sync`.")
+@click.option("-r", "--refresh", is_flag=True, default=False,
+              help="Sync the local index with the API before listing from it.")
 @click.option('--output-display-type', help="Console output type.", 
                                        type=click.Choice(["human-readable", "json"]), 
                                        show_default=False)
 @pass_api
-def list_didimos(config, page_size, index, navigate, sort_by, sort_order, output_display_type):
+def list_didimos(config, page_size, index, navigate, sort_by, sort_order, all_pages, prefetch, status_filter, input_type, refresh, output_display_type):
     """
     List didimos
+
+    Once the local index was synced (see `didimo index sync`), didimos are
+    listed from it, without requests to the API, and can be filtered by
+    --status and --input-type. --refresh syncs the index first.
     """
+    didimo_index = open_index(config, refresh, prefetch=prefetch)
+    if didimo_index is not None:
+        list_index_aux(config, didimo_index, page_size, index, navigate, sort_by, sort_order, status_filter, input_type, output_display_type, all_pages)
+        return
+
+    if status_filter is not None or input_type is not None:
+        click.secho("Filtering didimos needs the local index, run `didimo index sync` first.", err=True, fg='red')
+        sys.exit(1)
+
     api_path = "/v3/didimos/"
-    list_aux(config, api_path, page_size, index, navigate, sort_by, sort_order, output_display_type)
+    list_aux(config, api_path, page_size, index, navigate, sort_by, sort_order, output_display_type, all_pages, prefetch)
+
+
+@cli.group()
+@click.help_option(*HELP_OPTION_NAMES)
+@pass_api
+def index(config):
+    """
+    Manage the local index of didimos
+
+    The index is a copy, in the user cache directory, of the didimos of the
+    account, so that `didimo list` and `didimo status` can answer without
+    requests to the API.
+    """
+    pass
+
+
+@index.command(name='sync')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.option("--full", is_flag=True, default=False,
+              help="List every didimo again and drop the ones gone from the account.")
+@click.option("--concurrency", type=click.IntRange(1, 64), default=DEFAULT_FANOUT_CONCURRENCY, show_default=True,
+              help="Didimos not done yet that are requested at the same time.")
+@click.option("--prefetch", type=click.IntRange(1, 32), default=DEFAULT_PREFETCH_PAGES, show_default=True,
+              help="Pages of didimos requested at the same time.")
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def index_sync(config, full, concurrency, prefetch, output_display_type):
+    """
+    Sync the local index of didimos
+
+    The first sync lists every didimo of the account. The following ones only
+    list the didimos created since the newest one in the index, and request
+    again the ones that were still pending or processing.
+    """
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    configure_session(max(config.http_pool_size, concurrency, prefetch))
+
+    _, counts = sync_index(config, full, concurrency, prefetch)
+
+    if output_display_type_json_flag:
+        click.echo(json.dumps(counts, indent=4))
+    else:
+        click.secho("Index synced: %d didimos listed (%d new), %d refreshed, %d removed, %d in the index."
+                    % (counts["listed"], counts["added"], counts["refreshed"], counts["removed"], counts["total_size"]),
+                    fg='blue')
 
 @cli.command()
 @click.help_option(*HELP_OPTION_NAMES)
@@ -296,601 +436,6 @@ def new(config):
     """
     pass #this is a dummy function just to show up on the main menu
 
-@cli.command(short_help="Create a didimo")
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("input", type=click.Path(exists=True), required=True)
-@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=False, metavar="TYPE")
-@click.option('--depth', '-d',
-              type=click.Path(), required=False,
-              help="Create didimo with depth.")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--max-texture-dimension', '-m', multiple=False,
-              type=click.Choice(
-                  ["512", "1024", "2048"]),
-              help="Create didimo with optional max texture dimension.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--no-download', '-n', is_flag=True, default=False,
-              help="Do not download didimo.")
-@click.option('--no-wait', '-w', is_flag=True, default=False,
-              help="Do not wait for didimo creation and do not download.")
-@click.option("--output", "-o", type=click.Path(), required=False,
-              help="Path to download the didimo. If multiple package types "
-              "are present or if the flags --no-wait or --no-download "
-              "are present, this option is ignored. [default: <ID>.zip]")
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--ignore-cost', is_flag=True,
-              default=False,
-              help="Do not prompt user to confirm operation cost.")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@click.option('--template', help="Didimo generation template codename.", required=False)
-@pass_api
-def new_2_5_7(config, input_type, input, depth, feature, avatar_structure, garment, gender, max_texture_dimension, no_download, no_wait, output, package_type, ignore_cost, output_display_type, template):
-    """
-    Create a didimo
-
-    TYPE is the type of input used to create the didimo. Accepted values are:
-
-    \b
-        - photo (input must be a .jpg/.jpeg/.png)
-        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
-
-        For more information on the input types, visit
-        https://developer.didimo.co/docs/cli\b
-
-    INPUT is the path to the input file (which must be a .jpg/.jpeg/.png/.zip or a directory containing photos)
-
-    TEMPLATE is the didimo generation template codename. The specified options and arguments will override the template values accordingly.\n
-
-    \b
-    Examples:
-        Create a didimo from a photo
-        $ didimo new /path/input.jpg photo
-    """
-    template_codename = template
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    if output_display_type_json_flag and ignore_cost == False:
-        click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
-        exit(1);
-
-    if template_codename != None:
-        #get didimo generation template so that we can override values as commanded
-        r = get_didimo_generation_template_aux(config, template_codename, output_display_type, True)
-        if r.status_code != 200:
-            if output_display_type_json_flag:
-                click.echo( {
-                                "error": 1,
-                                "template_codename":template_codename,
-                                "message":"There was an error accessing the didimo generation template with the provided codename: "+template_codename
-                           })
-            else:
-                click.echo("There was an error accessing the didimo generation template with the provided codename: %s" % template_codename, err=True) 
-            exit(1);
-        else:   
-            payload = json.loads(r.json()["settings"])
-            if "input_type" not in payload and input_type == None:
-                click.echo( {
-                                "error": 1,
-                                "input_type":input_type,
-                                "message":"The command configuration is invalid! Input type is missing. Aborting..."
-                           })
-                exit(1);
-            elif input_type == None and "input_type" in payload:
-                input_type = payload["input_type"]
-    elif input_type == None:
-        click.echo( {
-                        "error": 1,
-                        "input_type":input_type,
-                        "message":"The command configuration is invalid! Input type is not defined. Aborting..."
-                   })
-        exit(1);
-    else:
-        payload = {} 
-
-    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag)
-
-    if batch_files is not None and len(batch_files) == 0:
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input is invalid! No valid files found. Aborting..."
-                        })
-        else:
-            click.secho('\nError: The input is invalid! No valid files found. Aborting...', err=True, fg='red')
-        exit(1);
-
-    api_path = "/v3/didimos"
-    url = config.api_host + api_path
-
-    if input_type != None:
-        payload["input_type"] = input_type
-
-    if avatar_structure != None:
-        payload["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        payload["garment"] = garment
-
-    if gender != None:
-        payload["gender"] = gender
-
-    if len(package_type) > 0:
-        payload["transfer_formats"] = package_type
-
-    if max_texture_dimension != None:
-        payload["max_texture_dimension"] = max_texture_dimension
-
-    for feature_item in feature:
-        payload[feature_item] = 'true'
-
-    if not ignore_cost:    
-        # check how many points a generation will consume before they are consumed 
-        # and prompt user to confirm operation before proceeding with the didimo generation request
-        if batch_files != None:
-            r = http_post_withphoto(url+"-cost", config.access_key, payload, batch_files[0], depth)
-        else:
-            r = http_post_withphoto(url+"-cost", config.access_key, payload, input, depth)
-
-        json_response = r.json()
-        is_error = r.json()['is_error'] if 'is_error' in json_response else False
-        if is_error:
-            click.echo("The requested configuration is invalid! Aborting...")
-            exit(1);
-
-        estimated_cost = r.json()['cost']
-
-        if batch_files != None:
-            total_estimated_cost = estimated_cost * len(batch_files)
-            click.echo("The cost of each didimo generation is: "+str(estimated_cost))
-            click.echo("The total cost of this batch operation is: "+str(total_estimated_cost))
-        else:
-            click.echo("The cost of this operation is: "+str(estimated_cost))
-        
-        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
-        click.echo("Proceeding...")
-
-    batch_flag = True
-    if batch_files == None:
-        batch_files = [input]
-        batch_flag = False
-
-    new_aux_shared_upload_processing_and_download(config, url, batch_files, depth, payload, no_wait, no_download, output, batch_flag, output_display_type_json_flag)
-
-
-@cli.command(short_help="Create a didimo")
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("input", type=click.Path(exists=True), required=True)
-@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=False, metavar="TYPE")
-@click.option('--depth', '-d',
-              type=click.Path(), required=False,
-              help="Create didimo with depth.")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty", "business"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--hair', multiple=False,
-              type=click.Choice(
-                  ["baseball_cap", 
-                  "hair_001",  
-                  "hair_002", 
-                  "hair_003", 
-                  "hair_004", 
-                  "hair_005", 
-                  "hair_006", 
-                  "hair_007", 
-                  "hair_008", 
-                  "hair_009", 
-                  "hair_010", 
-                  "hair_011"]),
-              help="Create didimo with hair option.")
-@click.option('--body-pose', '-bp',
-              type=click.Choice(["A", "T"]),
-              help="Specify body pose for this didimo. This option is only available for full-body didimos.", show_default=False)
-@click.option('--profile', 
-              type=click.Choice(["standard", "optimized", "minimal"]),
-              help="Specify a profile to drive this didimo generation.", show_default=False)
-@click.option('--no-download', '-n', is_flag=True, default=False,
-              help="Do not download didimo.")
-@click.option('--no-wait', '-w', is_flag=True, default=False,
-              help="Do not wait for didimo creation and do not download.")
-@click.option("--output", "-o", type=click.Path(), required=False,
-              help="Path to download the didimo. If multiple package types "
-              "are present or if the flags --no-wait or --no-download "
-              "are present, this option is ignored. [default: <ID>.zip]")
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--ignore-cost', is_flag=True,
-              default=False,
-              help="Do not prompt user to confirm operation cost.")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@click.option('--template', help="Didimo generation template codename.", required=False)
-@pass_api
-def new_2_5_10(config, input_type, input, depth, feature, avatar_structure, garment, gender, hair, body_pose, profile, no_download, no_wait, output, package_type, ignore_cost, output_display_type, template):
-    """
-    Create a didimo
-
-    TYPE is the type of input used to create the didimo. Accepted values are:
-
-    \b
-        - photo (input must be a .jpg/.jpeg/.png)
-        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
-
-        For more information on the input types, visit
-        https://developer.didimo.co/docs/cli\b
-
-    INPUT is the path to the input file (which must be a .jpg/.jpeg/.png/.zip or a directory containing photos)
-
-    TEMPLATE is the didimo generation template codename. The specified options and arguments will override the template values accordingly.\n
-
-    \b
-    Examples:
-        Create a didimo from a photo
-        $ didimo new /path/input.jpg photo
-    """
-    template_codename = template
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    if output_display_type_json_flag and ignore_cost == False:
-        #click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
-        click.echo( {
-                                "error": 1,
-                                "input":input,
-                                "message":"The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting..."
-                           })
-        exit(1);
-
-    if template_codename != None:
-        #get didimo generation template so that we can override values as commanded
-        r = get_didimo_generation_template_aux(config, template_codename, output_display_type, True)
-        if r.status_code != 200:
-            if output_display_type_json_flag:
-                click.echo( {
-                                "error": 1,
-                                "template_codename":template_codename,
-                                "message":"There was an error accessing the didimo generation template with the provided codename: "+template_codename
-                           })
-            else:
-                click.echo("There was an error accessing the didimo generation template with the provided codename: %s" % template_codename, err=True) 
-            exit(1);
-        else:   
-            payload = json.loads(r.json()["settings"])
-            if "input_type" not in payload and input_type == None:
-                click.echo( {
-                                "error": 1,
-                                "input_type":input_type,
-                                "message":"The command configuration is invalid! Input type is missing. Aborting..."
-                           })
-                exit(1);
-            elif input_type == None and "input_type" in payload:
-                input_type = payload["input_type"]
-    elif input_type == None:
-        click.echo( {
-                        "error": 1,
-                        "input_type":input_type,
-                        "message":"The command configuration is invalid! Input type is not defined. Aborting..."
-                   })
-        exit(1);
-    else:
-        payload = {}
-
-    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag)
-
-    if batch_files is not None and len(batch_files) == 0:
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input is invalid! No valid files found. Aborting..."
-                        })
-        else:
-            click.secho('\nError: The input is invalid! No valid files found. Aborting...', err=True, fg='red')
-        exit(1);
-
-    api_path = "/v3/didimos"
-    url = config.api_host + api_path
-
-    if input_type != None:
-        payload["input_type"] = input_type
-
-    if avatar_structure != None:
-        payload["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        payload["garment"] = garment
-
-    if gender != None:
-        payload["gender"] = gender
-
-    if hair != None:
-        payload["hair"] = hair
-
-    if body_pose != None:
-        if avatar_structure == "full-body":
-            payload["body_pose"] = body_pose
-        else:
-            click.echo("The body pose feature is only available for full body didimos.", err=True)
-            exit(1);
-    
-    if profile != None:
-        payload["profile"] = profile
-
-    if len(package_type) > 0:
-        payload["transfer_formats"] = package_type
-
-    for feature_item in feature:
-        payload[feature_item] = 'true'
-
-    if not ignore_cost:    
-        # check how many points a generation will consume before they are consumed 
-        # and prompt user to confirm operation before proceeding with the didimo generation request
-        if batch_files != None:
-            r = http_post_withphoto(url+"-cost", config.access_key, payload, batch_files[0], depth)
-        else:
-            r = http_post_withphoto(url+"-cost", config.access_key, payload, input, depth)
-
-        json_response = r.json()
-        is_error = r.json()['is_error'] if 'is_error' in json_response else False
-        if is_error:
-            click.echo("The requested configuration is invalid! Aborting...")
-            exit(1);
-
-        estimated_cost = r.json()['cost']
-
-        if batch_files != None:
-            total_estimated_cost = estimated_cost * len(batch_files)
-            click.echo("The cost of each didimo generation is: "+str(estimated_cost))
-            click.echo("The total cost of this batch operation is: "+str(total_estimated_cost))
-        else:
-            click.echo("The cost of this operation is: "+str(estimated_cost))
-        
-        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
-        click.echo("Proceeding...")
-
-    batch_flag = True
-    if batch_files == None:
-        batch_files = [input]
-        batch_flag = False
-
-    new_aux_shared_upload_processing_and_download(config, url, batch_files, depth, payload, no_wait, no_download, output, batch_flag, output_display_type_json_flag)
-
-
-
-@cli.command(short_help="Create a didimo")
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("type", 
-            #type=click.Choice(["photo"]), 
-            required=True, metavar="TYPE")
-@click.argument("input", type=click.Path(exists=True), required=True)
-#@click.option('--depth', '-d',
-#              type=click.Path(), required=False,
-#              help="Create didimo with depth")
-@click.option('--feature', '-f', multiple=True,
-              #type=click.Choice(
-              #    ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--no-download', '-n', is_flag=True, default=False,
-              help="Do not download didimo")
-@click.option('--no-wait', '-w', is_flag=True, default=False,
-              help="Do not wait for didimo creation and do not download")
-@click.option("--output", "-o", type=click.Path(), required=False,
-              help="Path to download the didimo. If multiple package types "
-              "are present or if the flags --no-wait or --no-download "
-              "are present, this option is ignored. [default: <ID>.zip]")
-@click.option('--package-type', '-p', multiple=True,
-#              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--ignore-cost', is_flag=True,
-              default=False,
-              help="Do not prompt user to confirm operation cost")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def new_dynamic(config, type, input, feature, no_download, no_wait, output, package_type, ignore_cost, output_display_type):
-    """
-    Create a didimo
-
-    TYPE is the type of input used to create the didimo. 
-
-    INPUT is the path to the input file (which must be a .jpg/.jpeg/.png/.zip or a directory containing photos).
-
-    \b
-    Use `didimo list-features` to see the accepted values.
-
-    For more information on the input types, visit
-    https://developer.didimo.co/docs/cli\b
-
-    \b
-    Examples:
-
-        List available features, accepted input types, and output formats \b
-
-            $ didimo list-features
-
-        Create a didimo from a photo without any extra features\b
-
-            $ didimo new photo /path/input.jpg
-
-        Create a didimo with arkit feature from a photo \b
-
-            $ didimo new photo -f arkit /path/input.jpg
-
-        Create a didimo with max_texture_dimension feature from a photo \b
-
-            $ didimo new photo -f max_texture_dimension=2048 /path/input.jpg
-    """
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    if output_display_type_json_flag and ignore_cost == False:
-        click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
-        exit(1);
-
-    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag)
-
-    if not output_display_type_json_flag:
-        click.echo("")
-        click.echo("Obtaining params list...")
-    feature_param = []
-    feature_param_value = []
-    invalid_param_request = []
-    accepted_input_types = []
-    accepted_targets = []
-
-    if True: #feature :
-        for param in feature:
-            param_array = param.split("=", param.count(param))
-            feature_param.append(param_array[0])
-            if len(param_array) == 1:
-                feature_param_value.append("true")
-            else:
-                feature_param_value.append(param_array[1])
-        #click.echo("feature_param: "+str(feature_param))
-        #click.echo("feature_param_value: "+str(feature_param_value))
-
-        if not output_display_type_json_flag:
-            click.echo("Obtaining feature list...")
-        featureList = list_features_aux(config)
-
-        if not output_display_type_json_flag:
-            click.echo("Obtaining input types...")
-        for item in featureList:
-            if "group" in featureList[item]:
-                if featureList[item]["is_input_type"] == True: 
-                    if len(featureList[item]["options"]) > 0:
-                        for sub_item in featureList[item]["options"]:
-                            accepted_input_types.append(sub_item.lower())
-                    else:
-                        accepted_input_types.append(featureList[item]["options"].lower())
-                elif str(featureList[item]["group"]) == "targets":
-                    if len(featureList[item]["options"]) > 0:
-                        for sub_item in featureList[item]["options"]:
-                            accepted_targets.append(sub_item.lower())
-                    else:
-                        accepted_targets.append(featureList[item]["options"].lower())
-        #click.echo(accepted_input_types)
-        #click.echo(accepted_targets)
-
-        if not output_display_type_json_flag:
-            click.echo("Crosschecking requested features...")
-
-        for name in feature_param:
-            if name not in featureList:
-                invalid_param_request.append(name)
-
-        try:
-            index = accepted_input_types.index(type.lower())
-        except ValueError:
-            invalid_param_request.append(type)
-            click.echo("Error - input type not supported: "+type)
-
-        if package_type:
-            if len(package_type) > 0:
-                for item in package_type:
-                    try:
-                        index = accepted_targets.index(item.lower())
-                    except ValueError:
-                        invalid_param_request.append(item)
-                        click.echo("Error - package type not supported: "+item)
-            else:
-                try:
-                    index = accepted_targets.index(package_type.lower())
-                except ValueError:
-                    invalid_param_request.append(package_type)
-                    click.echo("Error - package type not supported: "+package_type)
-
-        if len(invalid_param_request) > 0:
-            click.echo("Error - invalid features requested: "+str(invalid_param_request))
-            return
-
-    if not output_display_type_json_flag:
-        click.echo("Proceeding...")
-
-    api_path = "/v3/didimos"
-    url = config.api_host + api_path
-
-    payload = {
-        'input_type': type.lower()
-    }
-
-    i = 0
-    for name in feature_param:
-        payload[name] = feature_param_value[i]
-        i = i + 1
-
-    if len(package_type) > 0:           
-        payload["transfer_formats"] = package_type
-    else:
-        package_type = "default" #how to get this default value?? glft
-
-    depth = None
-
-    if not ignore_cost:    
-        # check how many points a generation will consume before they are consumed 
-        # and prompt user to confirm operation before proceeding with the didimo generation request
-        if batch_files != None:
-            r = http_post_withphoto(url+"-cost", config.access_key, payload, batch_files[0], depth, None, False)
-        else:
-            r = http_post_withphoto(url+"-cost", config.access_key, payload, input, depth, None, False)
-
-        is_error = ('status' in r.json() and r.json()['status'] != 201) or ('is_error' in r.json() and r.json()['is_error'])
-        if is_error:
-            click.echo("ERROR: "+ str(r.json()))
-            click.echo("The requested configuration is invalid! Aborting...")
-            exit(1);
-
-        estimated_cost = r.json()['cost']
-
-        if batch_files != None:
-            total_estimated_cost = estimated_cost * len(batch_files)
-            click.echo("The cost of each didimo generation is: "+str(estimated_cost))
-            click.echo("The total cost of this batch operation is: "+str(total_estimated_cost))
-        else:
-            click.echo("The cost of this operation is: "+str(estimated_cost))
-        
-        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
-        click.echo("Proceeding...")
-
-    batch_flag = True
-    if batch_files == None:
-        batch_files = [input]
-        batch_flag = False
-
-    new_aux_shared_upload_processing_and_download(config, url, batch_files, depth, payload, no_wait, no_download, output, batch_flag, output_display_type_json_flag)
-
 #####################################
 #
 # BULK REQUESTS
@@ -906,521 +451,6 @@ def bulk(config):
     """
     pass
 
-@cli.group()
-@click.help_option(*HELP_OPTION_NAMES)
-@pass_api
-def bulk_2_5_7(config):
-    """
-    Perform bulk requests related operations on DGP compatible version 2.5.7
-    """
-    pass
-
-@cli.group()
-@click.help_option(*HELP_OPTION_NAMES)
-@pass_api
-def bulk_2_5_10(config):
-    """
-    Perform bulk requests related operations on DGP compatible version 2.5.10
-    """
-    pass
-
-#### LIST ########################
-
-@bulk_2_5_7.command(short_help='List bulk requests', name='list')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
-@click.option("--filter","-f", multiple=False, help="Filter by status.")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def list_bulk_requests(config, group_type, filter, output_display_type):
-    """
-    List bulk requests on DGP compatible version 2.5.7
-    """
-    bulk_list_aux(config, group_type, filter, output_display_type)
-
-@bulk_2_5_10.command(short_help='List bulk requests', name='list')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
-@click.option("--filter","-f", multiple=False, help="Filter by status.")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def list_bulk_requests(config, group_type, filter, output_display_type):
-    """
-    List bulk requests on DGP compatible version 2.5.10
-    """
-    bulk_list_aux(config, group_type, filter, output_display_type)
-
-##### GET ###########################
-
-@bulk_2_5_7.command(short_help='Get bulk request details')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
-@click.argument("uuid", required=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def get(config, group_type, uuid, output_display_type):
-    """
-    Get bulk request details on DGP compatible version 2.5.7
-
-    UUID is the bulk request UUID.
-    """
-    bulk_get_aux(config, group_type, uuid, output_display_type)
-
-@bulk_2_5_10.command(short_help='Get bulk request details')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
-@click.argument("uuid", required=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def get(config, group_type, uuid, output_display_type):
-    """
-    Get bulk request details on DGP compatible version 2.5.10
-
-    UUID is the bulk request UUID.
-    """
-    bulk_get_aux(config, group_type, uuid, output_display_type)
-
-#### CREATE NEW BULK REQUEST ########
-
-@bulk_2_5_7.command(short_help="Create a bulk request")
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
-@click.argument("input", type=click.Path(exists=True), required=True)
-@click.argument("input_type", type=click.Choice(["photo"]), required=False, metavar="TYPE")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--max-texture-dimension', '-m', multiple=False,
-              type=click.Choice(
-                  ["512", "1024", "2048"]),
-              help="Create didimo with optional max texture dimension.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty", "business"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--ignore-cost', is_flag=True,
-              default=False,
-              help="Do not prompt user to confirm operation cost.")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@click.option('--template', help="Didimo generation template codename.", required=False)
-@pass_api
-def new(config, group_type, input, input_type, feature, avatar_structure, garment, gender, max_texture_dimension, package_type, ignore_cost, output_display_type, template):
-    """
-    Create a bulk request on DGP compatible version 2.5.7
-
-    GROUP is the type of object produced. Accepted values are:
-
-    \b
-        - didimos (input must be an archive containing image files: .jpg/.jpeg/.png)
-
-    INPUT is the path to the input file (which must be a .zip containing photos, according to the didimos group type)
-
-    INPUT TYPE is the type of the files used to produce didimos (which must be a image file: .jpg/.jpeg/.png). Accepted values are:
-
-    \b
-        - photo (input must be image files: .jpg/.jpeg/.png)
-
-        For more information on this operation, visit
-        https://developer.didimo.co/docs/cli\b
-
-    TEMPLATE is the didimo generation template codename. The specified options and arguments will override the template values accordingly.\n
-
-    \b
-    Examples:
-        Create a bulk request to generate didimos from a zip of photos
-        $ didimo bulk new didimos /path/input.zip photo
-    """
-    template_codename = template
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    if output_display_type_json_flag and ignore_cost == False:
-        #click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
-        click.echo( {
-                                "error": 1,
-                                "input":input,
-                                "message":"The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting..."
-                           })
-        exit(1);
-
-    if template_codename != None:
-        #pre-validate that the user can access the didimo generation template 
-        r = get_didimo_generation_template_aux(config, template_codename, output_display_type, True)
-        if r.status_code != 200:
-            if output_display_type_json_flag:
-                click.echo( {
-                                "error": 1,
-                                "template_codename":template_codename,
-                                "message":"There was an error accessing the didimo generation template with the provided codename: "+template_codename
-                           })
-            else:
-                click.echo("There was an error accessing the didimo generation template with the provided codename: %s" % template_codename, err=True) 
-            exit(1);
-        else:   
-            payload = json.loads(r.json()["settings"])
-            if "input_type" not in payload and input_type == None:
-                click.echo( {
-                                "error": 1,
-                                "input_type":input_type,
-                                "message":"The command configuration is invalid! Input type is missing. Aborting..."
-                           })
-                exit(1);
-            elif input_type == None and "input_type" in payload:
-                input_type = payload["input_type"]
-    elif input_type == None:
-        click.echo( {
-                        "error": 1,
-                        "input_type":input_type,
-                        "message":"The command configuration is invalid! Input type is not defined. Aborting..."
-                   })
-        exit(1);
-    else:
-        payload = {} 
-
-    if not input.endswith(".zip"):
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input must point to a Zip file."
-                        })
-        else:
-            click.secho('\nError: The input must point to a Zip file.', err=True, fg='red')
-        exit(1);
-
-    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag)
-
-    if batch_files == None:
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input is invalid! Zip verification failed. Aborting..."
-                        })
-        else:
-            click.secho('\nError: The input is invalid! Zip verification failed. Aborting...', err=True, fg='red')
-        exit(1);
-
-    if len(batch_files) == 0:
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input is invalid! No valid files found inside the zip package. Aborting..."
-                        })
-        else:
-            click.secho('\nError: The input is invalid! No valid files found inside the zip package. Aborting...', err=True, fg='red')
-        exit(1);
-
-    api_path = "/v3/"+group_type+"/bulks"
-    url = config.api_host + api_path
-
-    if input_type != None:
-        payload["input_type"] = input_type
-
-    if avatar_structure != None:
-        payload["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        payload["garment"] = garment
-
-    if gender != None:
-        payload["gender"] = gender
-    
-    if len(package_type) > 0:
-        payload["transfer_formats"] = package_type
-
-    if max_texture_dimension != None:
-        payload["max_texture_dimension"] = max_texture_dimension
-
-    for feature_item in feature:
-        payload[feature_item] = 'true'
-
-    depth = None
-
-    if not ignore_cost:    
-        # estimate how many points a generation will consume before they are consumed 
-        # and prompt user to confirm operation before proceeding with the bulk request
-        cost_estimation_api_path = "/v3/didimos-cost"
-        cost_estimation_url = config.api_host + cost_estimation_api_path
-        r = http_post_withphoto(cost_estimation_url, config.access_key, payload, batch_files[0], depth)
-
-        json_response = r.json()
-        is_error = r.json()['is_error'] if 'is_error' in json_response else False
-        if is_error:
-            click.echo("The requested configuration is invalid! Aborting...")
-            exit(1);
-
-        estimated_cost = r.json()['cost']
-
-        total_estimated_cost = estimated_cost * len(batch_files)
-        click.echo("The cost of each didimo generation is: "+str(estimated_cost))
-        click.echo("The total cost of this bulk operation is: "+str(total_estimated_cost))
-        
-        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
-        click.echo("Proceeding...")
-
-    r = new_aux_shared_upload_core(config, url, input, depth, input, payload, output_display_type_json_flag)
-    r_json = r
-    if r_json['error'] == 1:
-        upload_error_response = r
-        if output_display_type_json_flag:
-            click.secho("%s"%str(r_json), fg="red", err=True)
-        else:
-            click.secho('\nError %d uploading %s: \n%s' % (r.status_code, input, r.text), err=True, fg='red')
-    else:
-        if output_display_type_json_flag:
-            click.secho("%s"%str(r_json), fg="blue", err=False)
-        else:
-            click.secho('\nCreated bulk from %s: \n%s' % (input, str(r_json)), err=False, fg='blue')
-
-
-@bulk_2_5_10.command(short_help="Create a bulk request")
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
-@click.argument("input", type=click.Path(exists=True), required=True)
-@click.argument("input_type", type=click.Choice(["photo"]), required=False, metavar="TYPE")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty", "business"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--hair', multiple=False,
-              type=click.Choice(
-                  ["baseball_cap", 
-                  "hair_001","hair_002","hair_003","hair_004","hair_005","hair_006","hair_007","hair_008","hair_009","hair_010","hair_011"]),
-              help="Create didimo with hair option.")
-@click.option('--body-pose', '-bp',
-              type=click.Choice(["A", "T"]),
-              help="Specify body pose for this didimo. This option is only available for full-body didimos.", show_default=False)
-@click.option('--profile',
-              type=click.Choice(["standard", "optimized", "minimal"]),
-              help="Specify a profile to drive this didimo generation.", show_default=False)
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--ignore-cost', is_flag=True,
-              default=False,
-              help="Do not prompt user to confirm operation cost.")
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@click.option('--template', help="Didimo generation template codename.", required=False)
-@pass_api
-def new(config, group_type, input, input_type, feature, avatar_structure, garment, gender, hair, body_pose, profile, package_type, ignore_cost, output_display_type, template):
-    """
-    Create a bulk request on DGP compatible version 2.5.10
-
-    GROUP is the type of object produced. Accepted values are:
-
-    \b
-        - didimos (input must be an archive containing image files: .jpg/.jpeg/.png)
-
-    INPUT is the path to the input file (which must be a .zip containing photos, according to the didimos group type)
-
-    INPUT TYPE is the type of the files used to produce didimos (which must be a image file: .jpg/.jpeg/.png). Accepted values are:
-
-    \b
-        - photo (input must be image files: .jpg/.jpeg/.png)
-
-        For more information on this operation, visit
-        https://developer.didimo.co/docs/cli\b
-
-    TEMPLATE is the didimo generation template codename. The specified options and arguments will override the template values accordingly.\n
-
-    \b
-    Examples:
-        Create a bulk request to generate didimos from a zip of photos
-        $ didimo bulk new didimos /path/input.zip photo
-    """
-    template_codename = template
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    if output_display_type_json_flag and ignore_cost == False:
-        #click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
-        click.echo( {
-                                "error": 1,
-                                "input":input,
-                                "message":"The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting..."
-                           })
-        exit(1);
-
-    if template_codename != None:
-        #pre-validate that the user can access the didimo generation template 
-        r = get_didimo_generation_template_aux(config, template_codename, output_display_type, True)
-        if r.status_code != 200:
-            if output_display_type_json_flag:
-                click.echo( {
-                                "error": 1,
-                                "template_codename":template_codename,
-                                "message":"There was an error accessing the didimo generation template with the provided codename: "+template_codename
-                           })
-            else:
-                click.echo("There was an error accessing the didimo generation template with the provided codename: %s" % template_codename, err=True) 
-            exit(1);
-        else:   
-            payload = json.loads(r.json()["settings"])
-            if "input_type" not in payload and input_type == None:
-                click.echo( {
-                                "error": 1,
-                                "input_type":input_type,
-                                "message":"The command configuration is invalid! Input type is missing. Aborting..."
-                           })
-                exit(1);
-            elif input_type == None and "input_type" in payload:
-                input_type = payload["input_type"]
-    elif input_type == None:
-        click.echo( {
-                        "error": 1,
-                        "input_type":input_type,
-                        "message":"The command configuration is invalid! Input type is not defined. Aborting..."
-                   })
-        exit(1);
-    else:
-        payload = {} 
-
-    if not input.endswith(".zip"):
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input must point to a Zip file."
-                        })
-        else:
-            click.secho('\nError: The input must point to a Zip file.', err=True, fg='red')
-        exit(1);
-
-    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag)
-
-    if batch_files == None:
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input is invalid! Zip verification failed. Aborting..."
-                        })
-        else:
-            click.secho('\nError: The input is invalid! Zip verification failed. Aborting...', err=True, fg='red')
-        exit(1);
-
-    if len(batch_files) == 0:
-        if output_display_type_json_flag:
-            click.echo( {
-                        "error": 1,
-                        "input":input,
-                        "message":"The input is invalid! No valid files found inside the zip package. Aborting..."
-                        })
-        else:
-            click.secho('\nError: The input is invalid! No valid files found inside the zip package. Aborting...', err=True, fg='red')
-        exit(1);
-
-
-    api_path = "/v3/"+group_type+"/bulks"
-    url = config.api_host + api_path
-
-    if input_type != None:
-        payload["input_type"] = input_type
-
-    if avatar_structure != None:
-        payload["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        payload["garment"] = garment
-
-    if gender != None:
-        payload["gender"] = gender
-
-    if hair != None:
-        payload["hair"] = hair
-
-    if body_pose != None:
-        if avatar_structure == "full-body":
-            payload["body_pose"] = body_pose
-        else:
-            click.echo("The body pose feature is only available for full body didimos.", err=True)
-            exit(1);
-    
-    if profile != None:
-        payload["profile"] = profile
-
-    if len(package_type) > 0:
-        payload["transfer_formats"] = package_type
-
-    for feature_item in feature:
-        payload[feature_item] = 'true'
-
-    depth = None
-
-    if not ignore_cost:    
-        # estimate how many points a generation will consume before they are consumed 
-        # and prompt user to confirm operation before proceeding with the bulk request
-        cost_estimation_api_path = "/v3/didimos-cost"
-        cost_estimation_url = config.api_host + cost_estimation_api_path
-        r = http_post_withphoto(cost_estimation_url, config.access_key, payload, batch_files[0], depth)
-
-        json_response = r.json()
-        is_error = r.json()['is_error'] if 'is_error' in json_response else False
-        if is_error:
-            click.echo("The requested configuration is invalid! Aborting...")
-            exit(1);
-
-        estimated_cost = r.json()['cost']
-
-        total_estimated_cost = estimated_cost * len(batch_files)
-        click.echo("The cost of each didimo generation is: "+str(estimated_cost))
-        click.echo("The total cost of this bulk operation is: "+str(total_estimated_cost))
-        
-        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
-        click.echo("Proceeding...")
-
-    r = new_aux_shared_upload_core(config, url, input, depth, input, payload, output_display_type_json_flag)
-    r_json = r
-    if r_json['error'] == 1:
-        upload_error_response = r
-        if output_display_type_json_flag:
-            click.secho("%s"%str(r_json), fg="red", err=True)
-        else:
-            click.secho('\nError %d uploading %s: \n%s' % (r.status_code, input, r.text), err=True, fg='red')
-    else:
-        if output_display_type_json_flag:
-            click.secho("%s"%str(r_json), fg="blue", err=False)
-        else:
-            click.secho('\nCreated bulk from %s: \n%s' % (input, str(r_json)), err=False, fg='blue')
-
-
 #####################################
 #
 # DIDIMO: get status, inspect, delete
@@ -1435,8 +465,14 @@ def new(config, group_type, input, input_type, feature, avatar_structure, garmen
                                        show_default=False)
 @click.option("-s", "--silent", required=False, is_flag=True, default=False,
               help="Do not print anything. See help text for exit codes.")
+@click.option("--concurrency", type=click.IntRange(1, 64), default=DEFAULT_FANOUT_CONCURRENCY, show_default=True,
+              help="Didimos requested at the same time.")
+@click.option("--order", type=click.Choice(["input", "completion"]), default="input", show_default=True,
+              help="Print the didimos in the order of the IDs, or as soon as their status arrives.")
+@click.option("-r", "--refresh", is_flag=True, default=False,
+              help="Request every didimo from the API, even the ones done or in error in the local index or the didimo cache.")
 @pass_api
-def status(config, id, output_display_type, silent):
+def status(config, id, output_display_type, silent, concurrency, order, refresh):
     """
     Get status of didimos
 
@@ -1446,43 +482,69 @@ def status(config, id, output_display_type, silent):
 
     If <ID> is the character "-", read the IDs from STDIN.
 
+    Up to --concurrency didimos are requested at the same time and
+    IDs are read from STDIN as they are needed.
+
     When using the --silent flag, the following exit code rules are applied:
 
     \b
       - 0: Every didimo is in "Done" state
       - 1: At least one didimo is in "Error" state
       - 2: At least one didimo is in "Pending" or "Processing" state
+
+    The first didimo (in --order) in one of those states decides the
+    exit code, and the requests still pending are dropped.
+
+    Once the local index was synced (see `didimo index sync`), didimos done
+    or in error are answered from it, and the status of the other ones is
+    written back to it. Otherwise, didimos done or in error are answered
+    from the didimo cache. --refresh requests every didimo from the API.
     """
 
     output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
 
-    didimos = []
-
-    ids = create_set(id)
+    # make sure every request in flight can keep its own connection alive
+    configure_session(max(config.http_pool_size, concurrency))
 
-    # read didimo ids if used with a pipe
-    if "-" in ids:
-        ids = sys.stdin.readlines()
+    didimo_index = open_index(config)
 
-    try:
+    def fetch(didimo):
+        if didimo_index is not None:
+            response = didimo_index.get(didimo)
+            if not refresh and response is not None and response.get('status') in TERMINAL_STATUSES:
+                return response
 
-        for didimo in ids:
+        response = get_didimo_status(config, didimo, not refresh)
+        if didimo_index is not None:
+            didimo_index.upsert([response])
 
-            response = get_didimo_status(config, didimo.rstrip())
+        # TODO
+        # Remove this block when /status endpoint is consistent with /list
+        if response['status_message'] != "":
+            response["key"] = didimo
+            response["status"] = "error"
+        return response
 
-            # TODO
-            # Remove this block when /status endpoint is consistent with /list
-            if response['status_message'] != "":
-                response["key"] = didimo.rstrip()
-                response["status"] = "error"
+    didimos = []
+    header_printed = False
 
-            didimos.append(response)
-            if silent:
-                if response["status"] == "error":
-                    click.echo("Error on \"%s\"" % response["key"], err=True)
-                    sys.exit(1)
-                if response["status"] in ["pending", "processing"]:
-                    sys.exit(2)
+    try:
+        with FanOut(fetch, concurrency, order == "input") as fan_out:
+            for didimo, response in fan_out.map(read_ids(create_set(id))):
+                if silent:
+                    if response["status"] == "error":
+                        click.echo("Error on \"%s\"" % response["key"], err=True)
+                        sys.exit(1)
+                    if response["status"] in ["pending", "processing"]:
+                        sys.exit(2)
+                elif output_display_type_json_flag:
+                    didimos.append(response)
+                else:
+                    # rows are printed as they arrive
+                    if not header_printed:
+                        print_status_header()
+                        header_printed = True
+                    print_status_row(response)
     except DidimoNotFoundException:
         click.secho('No didimo with the requested key was found on this account.', err=True, fg='red')
         sys.exit(0)
@@ -1492,10 +554,6 @@ def status(config, id, output_display_type, silent):
 
     if output_display_type_json_flag:
         click.echo(json.dumps(didimos, indent=4))
-    else:
-        print_status_header()
-        for didimo in didimos:
-            print_status_row(didimo)
 
 
 
@@ -1507,8 +565,14 @@ def status(config, id, output_display_type, silent):
 @click.option('--output-display-type', help="Console output type.", 
                                        type=click.Choice(["human-readable", "json"]), 
                                        show_default=False)
+@click.option("--concurrency", type=click.IntRange(1, 64), default=DEFAULT_FANOUT_CONCURRENCY, show_default=True,
+              help="Didimos requested at the same time.")
+@click.option("--order", type=click.Choice(["input", "completion"]), default="input", show_default=True,
+              help="Print the didimos in the order of the IDs, or as soon as their details arrive.")
+@click.option("-r", "--refresh", is_flag=True, default=False,
+              help="Request every didimo from the API, even the ones done or in error in the didimo cache.")
 @pass_api
-def inspect(config, id, output_display_type):
+def inspect(config, id, output_display_type, concurrency, order, refresh):
     """
     Get details of didimos
 
@@ -1518,67 +582,44 @@ def inspect(config, id, output_display_type):
 
     If <ID> is the character "-", read the IDs from STDIN.
 
+    Up to --concurrency didimos are requested at the same time and
+    IDs are read from STDIN as they are needed.
+
+    The details of didimos done or in error are kept in the didimo cache
+    until they expire or their metadata is changed with `didimo metadata`,
+    use --refresh to request them anyway.
     """
 
     output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
 
-    didimos = []
-
-    ids = create_set(id)
+    # make sure every request in flight can keep its own connection alive
+    configure_session(max(config.http_pool_size, concurrency))
 
-    # read didimo ids if used with a pipe
-    if "-" in ids:
-        ids = sys.stdin.readlines()
+    def fetch(didimo):
+        response = get_didimo_status(config, didimo, not refresh)
 
-    try:
-        for didimo in ids:
-            response = get_didimo_status(config, didimo.rstrip())               
+        # TODO
+        # Remove this block when /status endpoint is consistent with /list
+        if response['status_message'] != "":
+            response["key"] = didimo
+            response["status"] = "error"
+        return response
 
-            # TODO
-            # Remove this block when /status endpoint is consistent with /list
-            if response['status_message'] != "":
-                response["key"] = didimo.rstrip()
-                response["status"] = "error"
+    didimos = []
 
-            didimos.append(response)
+    try:
+        with FanOut(fetch, concurrency, order == "input") as fan_out:
+            for didimo, response in fan_out.map(read_ids(create_set(id))):
+                if output_display_type_json_flag:
+                    didimos.append(response)
+                else:
+                    print_didimo_details(response)
     except DidimoNotFoundException:
         click.secho('No didimo with the requested key was found on this account.', err=True, fg='red')
         sys.exit(0)
 
     if output_display_type_json_flag:
         click.echo(json.dumps(didimos, indent=4))
-    else:
-        for didimo in didimos:
-            click.secho("-- didimo "+response["key"]+" --", fg="green", err=True)
-            print_key_value("Key", response["key"])
-            print_key_value("Input type", response["input_type"])
-            
-            print_key_value("Cost", response["cost"])
-            print_key_value("Created at", response["created_at"])
-            print_key_value("Expires at", response["expires_at"])
-            print_key_value("Status", response["status"])
-            if response['status'] == "processing" or response['status'] == "error":
-                print_key_value("Percent", response["percent"])
-            if response['status_message'] != "":
-                print_key_value("Status message", response["status_message"])
-            print_key_value("Is favorite", response["is_favorite"])
-
-            if "transfer_formats" in response:
-                transfer_formats = []
-                for trf in response["transfer_formats"]:
-                    transfer_formats.append(trf["name"])
-                print_key_value("Transfer formats", str(transfer_formats))
-
-            if "meta_data" in response:
-                click.secho("-- System Metadata --", fg="yellow", err=True)
-                for meta_data in response["meta_data"]:
-                    if meta_data["definer"] == "system":
-                        print_key_value(meta_data["name"], meta_data["value"])
-                click.secho("-- User-defined Metadata --", fg="blue", err=True)
-                for meta_data in response["meta_data"]:
-                    if meta_data["definer"] == "user":
-                        print_key_value(meta_data["name"], meta_data["value"])
-            click.secho("--------------------------------", fg="green", err=True)
 
 
 @cli.command()
@@ -1586,9 +627,9 @@ def inspect(config, id, output_display_type):
 @click.argument("id", required=True)
 @click.option("-o", "--output", type=click.Path(),
               help="Output path. [default: <ID>.zip]")
-@click.option('--package-type', '-p',
+@click.option('--package-type', '-p', multiple=True,
               type=click.Choice(["fbx", "gltf"]),
-              help="Specify output type for this didimo.", show_default=True)
+              help="Specify output type for this didimo. This flag can be used multiple times, all the available types are downloaded when it is not used.", show_default=True)
 @click.option('--output-display-type', help="Console output type.", 
                                        type=click.Choice(["human-readable", "json"]), 
                                        show_default=False)
@@ -1603,7 +644,7 @@ def download(config, id, output, package_type, output_display_type):
     ID from STDIN.
     """
 
-    #output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
 
     if id == "-":
         id = sys.stdin.readlines()[0].rstrip()
@@ -1617,7 +658,9 @@ def download(config, id, output, package_type, output_display_type):
     else:
         if not output.endswith('/'):
             output = output + "/"
-    download_didimo(config, id, package_type, output)
+    download_results = download_didimo(config, id, package_type, output, not output_display_type_json_flag)
+    if output_display_type_json_flag:
+        click.echo(json.dumps({"download_results":download_results}))
 
 @cli.command()
 @click.help_option(*HELP_OPTION_NAMES)
@@ -1640,6 +683,11 @@ def delete(config, id, output_display_type):
     url = config.api_host + api_path + id
 
     r = http_delete(url, auth=DidimoAuth(config, api_path))
+    DidimoCache(config).invalidate(id)
+    if r.status_code in (204, 404):
+        didimo_index = open_index(config)
+        if didimo_index is not None:
+            didimo_index.remove([id])
 
     if output_display_type_json_flag:
         click.echo(r.text)
@@ -1691,6 +739,9 @@ def hairsdeform(config, input, timeout, output_display_type):
     If the input was a zip file from which we are able to decode a didimo key, the output will be named after the original didimo key.
 
     """
+    import shutil
+    import zipfile
+    from .shared_processing import deformation_aux_shared_processing_and_download
 
     output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
 
@@ -1742,12 +793,8 @@ def hairsdeform(config, input, timeout, output_display_type):
     files = [('template_deformation', (filePath, open(
         filePath, 'rb'), 'application/octet-stream'))]
 
-    headers = {
-        'DIDIMO-API-KEY': config.access_key
-    }
-
-    r = requests.request("POST", url, headers=headers,
-                         data=payload, files=files)
+    r = http_request("POST", url, auth=DidimoAuth(config, api_path),
+                     data=payload, files=files)
 
     deformation_aux_shared_processing_and_download(config, timeout, r, api_path, outputFileSuffix, output_display_type_json_flag)
 
@@ -1776,6 +823,9 @@ def vertexdeform(config, vertex, user_asset, timeout, output_display_type):
     If the vertex input was a zip file from which we are able to decode a didimo key, the output will be named after the original didimo key.
 
     """
+    import shutil
+    import zipfile
+    from .shared_processing import deformation_aux_shared_processing_and_download
 
     output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
 
@@ -1827,12 +877,8 @@ def vertexdeform(config, vertex, user_asset, timeout, output_display_type):
         ('user_asset', (user_asset, open(user_asset, 'rb'), 'application/octet-stream'))
     ]
 
-    headers = {
-        'DIDIMO-API-KEY': config.access_key
-    }
-
-    r = requests.request("POST", url, headers=headers,
-                         data=payload, files=files)
+    r = http_request("POST", url, auth=DidimoAuth(config, api_path),
+                     data=payload, files=files)
     
     deformation_aux_shared_processing_and_download(config, timeout, r, api_path, outputFileSuffix, output_display_type_json_flag)
 
@@ -1878,6 +924,9 @@ def set(config, id, name, value, output_display_type):
     
     r = http_post_no_break(url, auth=DidimoAuth(config, api_path), json=payload) 
 
+    # the cached document of the didimo holds its metadata
+    DidimoCache(config).invalidate(id)
+
     if output_display_type_json_flag:
         click.echo(r.text)
     else:
@@ -1959,6 +1008,9 @@ def update(config, id, name, value, output_display_type):
     
     r = http_put(url, auth=DidimoAuth(config, api_path), json=payload) 
 
+    # the cached document of the didimo holds its metadata
+    DidimoCache(config).invalidate(id)
+
     if output_display_type_json_flag:
         click.echo(r.text)
     else:
@@ -2001,6 +1053,9 @@ def delete(config, id, name, output_display_type):
     
     r = http_delete(url, auth=DidimoAuth(config, api_path)) 
 
+    # the cached document of the didimo holds its metadata
+    DidimoCache(config).invalidate(id)
+
     if output_display_type_json_flag:
         click.echo(r.text)
     else:
@@ -2035,597 +1090,6 @@ def generation_template(config):
     """
     pass
 
-@cli.group()
-@click.help_option(*HELP_OPTION_NAMES)
-@pass_api
-def generation_template_2_5_7(config):
-    """
-    Perform didimo generation template management operations on DGP compatible version 2.5.7
-    """
-    pass
-
-@cli.group()
-@click.help_option(*HELP_OPTION_NAMES)
-@pass_api
-def generation_template_2_5_10(config):
-    """
-    Perform didimo generation template management operations on DGP compatible version 2.5.10
-    """
-    pass
-
-## LIST ##########
-
-@generation_template_2_5_7.command(short_help="Lists available didimo generation templates", name='list')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def list_didimo_generation_templates(config, output_display_type):
-    """
-    Lists available didimo generation templates
-    """
-    list_didimo_generation_templates_aux(config, output_display_type)
-
-@generation_template_2_5_10.command(short_help="Lists available didimo generation templates", name='list')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def list_didimo_generation_templates(config, output_display_type):
-    """
-    Lists available didimo generation templates
-    """
-    list_didimo_generation_templates_aux(config, output_display_type)
-
-
-def list_didimo_generation_templates_aux(config, output_display_type):
-    """
-    (Shared Implementation) Lists available didimo generation templates
-    """
-
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    api_path = "/v3/didimo_generation_templates?is_active=true"
-    url = config.api_host + api_path
-
-    
-    r = http_get(url, auth=DidimoAuth(config, api_path)) 
-
-    if output_display_type_json_flag:
-        click.echo(r.text)
-    else:
-        if r.status_code != 200:
-            if r.status_code == 404:
-                res = r.json()
-                click.secho('Not found.', err=True, fg='red')
-            elif r.status_code == 400:
-                click.secho('Please correct your input.', err=True, fg='red')
-            else:
-                click.secho('Error %d' % r.status_code, err=True, fg='red')
-            sys.exit(1)
-
-        while True:
-
-            json_response = r.json()
-            _DGTs = json_response['didimo_generation_templates']
-            next_page = json_response['__links']['next'] if '__links' in json_response and 'next' in json_response['__links'] else None
-
-            print_didimo_generation_template_header()
-            for _DGT in _DGTs:
-                print_didimo_generation_template_row(_DGT)
-
-            if next_page != None:
-                click.confirm('There are more results. Fetch next page?', abort=True)
-
-                api_path = next_page
-                url = api_path
-                r = http_get(url, auth=DidimoAuth(config, api_path))
-            else:
-                break
-
-## GET ##########
-
-@generation_template_2_5_7.command(short_help="Gets a didimo generation template", name='get')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def get(config, codename, output_display_type):
-    """
-    Retrieves a didimo generation template
-
-    <codename> is the didimo generation template codename
-    """
-    get_didimo_generation_template_aux(config, codename, output_display_type)
-
-@generation_template_2_5_10.command(short_help="Gets a didimo generation template", name='get')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def get(config, codename, output_display_type):
-    """
-    Retrieves a didimo generation template
-
-    <codename> is the didimo generation template codename
-    """
-    get_didimo_generation_template_aux(config, codename, output_display_type)
-
-## DELETE ##########
-
-@generation_template_2_5_7.command(short_help="Deletes a didimo generation template", name='delete')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def delete(config, codename, output_display_type):
-    """
-    Deletes a didimo generation template
-
-    <codename> is the didimo generation template codename
-    """
-    delete_didimo_generation_template_aux(config, codename, output_display_type)
-
-@generation_template_2_5_10.command(short_help="Deletes a didimo generation template", name='delete')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def delete(config, codename, output_display_type):
-    """
-    Deletes a didimo generation template
-
-    <codename> is the didimo generation template codename
-    """
-    delete_didimo_generation_template_aux(config, codename, output_display_type)
-
-
-## CREATE ##########
-
-@generation_template_2_5_7.command(short_help="Create a didimo generation template", name='create')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.argument("template_name", required=True)
-@click.argument("description", required=True)
-@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=True, metavar="TYPE")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--max-texture-dimension', '-m', multiple=False,
-              type=click.Choice(
-                  ["512", "1024", "2048"]),
-              help="Create didimo with optional max texture dimension.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def create(config, codename, template_name, description, input_type, feature, avatar_structure, garment, gender, max_texture_dimension, package_type, output_display_type):
-    """
-    Create a didimo generation template on DGP compatible version 2.5.7
-
-    CODENAME is a didimo generation template user-managed identifier.\n
-    TEMPLATE_NAME is the didimo generation template name.\n
-    DESCRIPTION is the didimo generation template description.\n
-
-    TYPE is the type of input used to create the didimo. Accepted values are:
-
-    \b
-        - photo (input must be a .jpg/.jpeg/.png)
-        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
-
-        For more information on the input types, visit
-        https://developer.didimo.co/docs/cli\b
-    \b
-    Examples:
-        Create a template named xpto that generates a didimo from a photo
-        $ didimo generation-template create xpto "simple template example based on photo input" photo
-    """
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    settings = {}
-
-    if input_type != None:
-        settings["input_type"] = input_type
-
-    if avatar_structure != None:
-        settings["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        settings["garment"] = garment
-
-    if gender != None:
-        settings["gender"] = gender
-
-    if max_texture_dimension != None:
-        settings["max_texture_dimension"] = max_texture_dimension
-
-    if len(package_type) > 0:
-        settings["transfer_formats"] = list(package_type)
-
-    for feature_item in feature:
-        settings[feature_item] = 'true'
-
-    payload = {
-        "template_codename": codename,
-        "template_name": template_name,
-        "description": description,
-        "settings": settings,
-        "scope": "user"
-    }
-    serialized_payload = str(payload)
-
-    api_path = "/v3/didimo_generation_templates"
-    url = config.api_host + api_path
-
-    r = http_request_json(url, "POST", config.access_key, serialized_payload, False)
-    generation_template_shared_response_processing(r, output_display_type_json_flag)
-
-
-@generation_template_2_5_10.command(short_help="Create a didimo generation template", name='create')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.argument("template_name", required=True)
-@click.argument("description", required=True)
-@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=True, metavar="TYPE")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty", "business"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--hair', multiple=False,
-              type=click.Choice(
-                  ["baseball_cap", 
-                  "hair_001",  
-                  "hair_002", 
-                  "hair_003", 
-                  "hair_004", 
-                  "hair_005", 
-                  "hair_006", 
-                  "hair_007", 
-                  "hair_008", 
-                  "hair_009", 
-                  "hair_010", 
-                  "hair_011"]),
-              help="Create didimo with hair option.")
-@click.option('--body-pose', '-bp',
-              type=click.Choice(["A", "T"]),
-              help="Specify body pose for this didimo. This option is only available for full-body didimos.", show_default=False)
-@click.option('--profile', 
-              type=click.Choice(["standard", "optimized", "minimal"]),
-              help="Specify a profile to drive this didimo generation.", show_default=False)
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def create(config, codename, template_name, description, input_type, feature, avatar_structure, garment, gender, hair, body_pose, profile, package_type, output_display_type):
-    """
-    Create a didimo generation template on DGP compatible version 2.5.10
-
-    CODENAME is a didimo generation template user-managed identifier.\n
-    TEMPLATE_NAME is the didimo generation template name.\n
-    DESCRIPTION is the didimo generation template description.\n
-
-    TYPE is the type of input used to create the didimo. Accepted values are:
-
-    \b
-        - photo (input must be a .jpg/.jpeg/.png)
-        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
-
-        For more information on the input types, visit
-        https://developer.didimo.co/docs/cli\b
-
-    \b
-    Examples:
-        Create a template named xpto that generates a didimo from a photo
-        $ didimo generation-template create xpto "simple template example based on photo input" photo
-    """
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    settings = {}
-
-    if input_type != None:
-        settings["input_type"] = input_type
-
-    if avatar_structure != None:
-        settings["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        settings["garment"] = garment
-
-    if gender != None:
-        settings["gender"] = gender
-
-    if hair != None:
-        settings["hair"] = hair
-
-    if body_pose != None:
-        if avatar_structure == "full-body":
-            settings["body_pose"] = body_pose
-        else:
-            click.echo("The body pose feature is only available for full body didimos.", err=True)
-            exit(1);
-    
-    if profile != None:
-        settings["profile"] = profile
-
-    if len(package_type) > 0:
-        settings["transfer_formats"] = list(package_type)
-
-    for feature_item in feature:
-        settings[feature_item] = 'true'
-    payload = {
-        "template_codename": codename,
-        "template_name": template_name,
-        "description": description,
-        "settings": settings,
-        "scope": "user"
-    }
-    serialized_payload = str(payload)
-
-    api_path = "/v3/didimo_generation_templates"
-
-    print(serialized_payload)
-    url = config.api_host + api_path
-
-    r = http_request_json(url, "POST", config.access_key, serialized_payload, False)
-    generation_template_shared_response_processing(r, output_display_type_json_flag)
-
-
-## UPDATE ##########
-
-@generation_template_2_5_7.command(short_help="Updates a didimo generation template", name='update')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.argument("template_name", required=True)
-@click.argument("description", required=True)
-@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=True, metavar="TYPE")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--max-texture-dimension', '-m', multiple=False,
-              type=click.Choice(
-                  ["512", "1024", "2048"]),
-              help="Create didimo with optional max texture dimension.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def update(config, codename, template_name, description, input_type, feature, avatar_structure, garment, gender, max_texture_dimension, package_type, output_display_type):
-    """
-    Update a didimo generation template on DGP compatible version 2.5.7
-
-    CODENAME is the didimo generation template user-managed identifier.\n
-    TEMPLATE_NAME is the didimo generation template name.\n
-    DESCRIPTION is the didimo generation template description.\n
-
-    TYPE is the type of input used to create the didimo. Accepted values are:
-
-    \b
-        - photo (input must be a .jpg/.jpeg/.png)
-        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
-
-        For more information on the input types, visit
-        https://developer.didimo.co/docs/cli\b
-    \b
-    Examples:
-        Updates a template with codename xyz, by renaming it to "simple photo template" and matching description with settings that generates a didimo from a photo
-        $ didimo generation-template update xyz "simple photo template" "simple template example based on photo input" photo /path/input.jpg
-    """
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    settings = {}
-
-    if input_type != None:
-        settings["input_type"] = input_type
-
-    if avatar_structure != None:
-        settings["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        settings["garment"] = garment
-
-    if gender != None:
-        settings["gender"] = gender
-
-    if max_texture_dimension != None:
-        settings["max_texture_dimension"] = max_texture_dimension
-
-    if len(package_type) > 0:
-        settings["transfer_formats"] = list(package_type)
-
-    for feature_item in feature:
-        settings[feature_item] = 'true'
-
-    payload = {
-        "template_name": template_name,
-        "description": description,
-        "settings": settings
-    }
-    serialized_payload = str(payload)
-
-    api_path = "/v3/didimo_generation_templates/codename/"+codename
-    url = config.api_host + api_path
-
-    r = http_request_json(url, "PUT", config.access_key, serialized_payload, False)
-    generation_template_shared_response_processing(r, output_display_type_json_flag)
-
-
-@generation_template_2_5_10.command(short_help="Updates a didimo", name='update')
-@click.help_option(*HELP_OPTION_NAMES)
-@click.argument("codename", required=True)
-@click.argument("template_name", required=True)
-@click.argument("description", required=True)
-@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=True, metavar="TYPE")
-@click.option('--feature', '-f', multiple=True,
-              type=click.Choice(
-                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
-              help="Create didimo with optional features. This flag can be used multiple times.")
-@click.option('--avatar-structure', multiple=False,
-              type=click.Choice(
-                  ["head-only", "full-body"]),
-              help="Create didimo with avatar structure option.")
-@click.option('--garment', multiple=False,
-              type=click.Choice(
-                  ["none","casual", "sporty", "business"]),
-              help="Create didimo with garment option. This option is only available for full-body didimos.")
-@click.option('--gender', multiple=False,
-              type=click.Choice(
-                  ["female", "male", "auto"]),
-              help="Create didimo with gender option. This option is only available for full-body didimos.")
-@click.option('--hair', multiple=False,
-              type=click.Choice(
-                  ["baseball_cap", 
-                  "hair_001",  
-                  "hair_002", 
-                  "hair_003", 
-                  "hair_004", 
-                  "hair_005", 
-                  "hair_006", 
-                  "hair_007", 
-                  "hair_008", 
-                  "hair_009", 
-                  "hair_010", 
-                  "hair_011"]),
-              help="Create didimo with hair option.")
-@click.option('--body-pose', '-bp',
-              type=click.Choice(["A", "T"]),
-              help="Specify body pose for this didimo. This option is only available for full-body didimos.", show_default=False)
-@click.option('--profile',
-              type=click.Choice(["standard", "optimized", "minimal"]),
-              help="Specify a profile to drive this didimo generation.", show_default=False)
-@click.option('--package-type', '-p', multiple=True,
-              type=click.Choice(["fbx", "gltf"]),
-              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
-@click.option('--output-display-type', help="Console output type.", 
-                                       type=click.Choice(["human-readable", "json"]), 
-                                       show_default=False)
-@pass_api
-def update(config, codename, template_name, description, input_type, feature, avatar_structure, garment, gender, hair, body_pose, profile, package_type, output_display_type):
-    """
-    Update a didimo generation template on DGP compatible version 2.5.10
-
-    CODENAME is a didimo generation template user-managed identifier.\n
-    TEMPLATE_NAME is the didimo generation template name.\n
-    DESCRIPTION is the didimo generation template description.\n
-
-    TYPE is the type of input used to create the didimo. Accepted values are:
-
-    \b
-        - photo (input must be a .jpg/.jpeg/.png)
-        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
-
-        For more information on the input types, visit
-        https://developer.didimo.co/docs/cli\b
-    \b
-    Examples:
-        Updates a template with codename xyz, by renaming it to "simple photo template" and matching description with settings that generates a didimo from a photo
-        $ didimo generation-template update xyz "simple photo template" "simple template example based on photo input" photo
-    """
-    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
-
-    settings = {}
-
-    if input_type != None:
-        settings["input_type"] = input_type
-
-    if avatar_structure != None:
-        settings["avatar_structure"] = avatar_structure
-    
-    if garment != None:
-        settings["garment"] = garment
-
-    if gender != None:
-        settings["gender"] = gender
-
-    if hair != None:
-        settings["hair"] = hair
-
-    if body_pose != None:
-        if avatar_structure == "full-body":
-            settings["body_pose"] = body_pose
-        else:
-            click.echo("The body pose feature is only available for full body didimos.", err=True)
-            exit(1);
-    
-    if profile != None:
-        settings["profile"] = profile
-
-    if len(package_type) > 0:
-        settings["transfer_formats"] = list(package_type)
-
-    for feature_item in feature:
-        settings[feature_item] = 'true'
-
-    payload = {
-        "template_name": template_name,
-        "description": description,
-        "settings": settings
-    }
-    serialized_payload = str(payload)
-
-    api_path = "/v3/didimo_generation_templates/codename/"+codename
-    url = config.api_host + api_path
-
-    r = http_request_json(url, "PUT", config.access_key, serialized_payload, False)
-    generation_template_shared_response_processing(r, output_display_type_json_flag)
-
-
 #####################################
 #
 # Other useful commands and functions
@@ -2723,5 +1187,5 @@ def clear_cache(config):
     """
     print("Clearing cache...")
     clear_network_cache() 
+    clear_didimo_cache()
     sys.exit(0)
-
@@ -0,0 +1,702 @@
+import click
+import json
+import os
+
+from .network import http_post_withphoto, http_request_json
+from .helpers import get_output_display_type_json_flag, batch_options
+from .paginator import DEFAULT_PREFETCH_PAGES
+from .shared_processing import new_aux_shared_preprocess_batch_files, new_aux_shared_new
+from .shared_processing import get_didimo_generation_template_aux, delete_didimo_generation_template_aux, generation_template_shared_response_processing
+from .shared_processing import new_aux_shared_upload_core, bulk_list_aux, bulk_get_aux, list_didimo_generation_templates_aux
+from .cli import pass_api, HELP_OPTION_NAMES
+
+
+@click.command(short_help="Create a didimo")
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("input", type=click.Path(exists=True), required=True)
+@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=False, metavar="TYPE")
+@click.option('--depth', '-d',
+              type=click.Path(), required=False,
+              help="Create didimo with depth.")
+@click.option('--feature', '-f', multiple=True,
+              type=click.Choice(
+                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
+              help="Create didimo with optional features. This flag can be used multiple times.")
+@click.option('--max-texture-dimension', '-m', multiple=False,
+              type=click.Choice(
+                  ["512", "1024", "2048"]),
+              help="Create didimo with optional max texture dimension.")
+@click.option('--avatar-structure', multiple=False,
+              type=click.Choice(
+                  ["head-only", "full-body"]),
+              help="Create didimo with avatar structure option.")
+@click.option('--garment', multiple=False,
+              type=click.Choice(
+                  ["none","casual", "sporty"]),
+              help="Create didimo with garment option. This option is only available for full-body didimos.")
+@click.option('--gender', multiple=False,
+              type=click.Choice(
+                  ["female", "male", "auto"]),
+              help="Create didimo with gender option. This option is only available for full-body didimos.")
+@click.option('--no-download', '-n', is_flag=True, default=False,
+              help="Do not download didimo.")
+@click.option('--no-wait', '-w', is_flag=True, default=False,
+              help="Do not wait for didimo creation and do not download.")
+@click.option("--output", "-o", type=click.Path(), required=False,
+              help="Path to download the didimo. If multiple package types "
+              "are present or if the flags --no-wait or --no-download "
+              "are present, this option is ignored. [default: <ID>.zip]")
+@click.option('--package-type', '-p', multiple=True,
+              type=click.Choice(["fbx", "gltf"]),
+              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
+@click.option('--ignore-cost', is_flag=True,
+              default=False,
+              help="Do not prompt user to confirm operation cost.")
+@batch_options
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@click.option('--template', help="Didimo generation template codename.", required=False)
+@pass_api
+def new_2_5_7(config, input_type, input, depth, feature, avatar_structure, garment, gender, max_texture_dimension, no_download, no_wait, output, package_type, ignore_cost, upload_concurrency, poll_concurrency, poll_mode, download_concurrency, resume, include, exclude, output_display_type, template):
+    """
+    Create a didimo
+
+    TYPE is the type of input used to create the didimo. Accepted values are:
+
+    \b
+        - photo (input must be a .jpg/.jpeg/.png)
+        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
+
+        For more information on the input types, visit
+        https://developer.didimo.co/docs/cli\b
+
+    INPUT is the path to the input file (which must be a .jpg/.jpeg/.png/.zip or a directory containing photos)
+
+    TEMPLATE is the didimo generation template codename. The specified options and arguments will override the template values accordingly.\n
+
+    \b
+    Examples:
+        Create a didimo from a photo
+        $ didimo new /path/input.jpg photo
+    """
+
+    template_codename = template
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    if output_display_type_json_flag and ignore_cost == False:
+        click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
+        exit(1);
+
+    if template_codename != None:
+        #get didimo generation template so that we can override values as commanded
+        r = get_didimo_generation_template_aux(config, template_codename, output_display_type, True)
+        if r.status_code != 200:
+            if output_display_type_json_flag:
+                click.echo( {
+                                "error": 1,
+                                "template_codename":template_codename,
+                                "message":"There was an error accessing the didimo generation template with the provided codename: "+template_codename
+                           })
+            else:
+                click.echo("There was an error accessing the didimo generation template with the provided codename: %s" % template_codename, err=True) 
+            exit(1);
+        else:   
+            payload = json.loads(r.json()["settings"])
+            if "input_type" not in payload and input_type == None:
+                click.echo( {
+                                "error": 1,
+                                "input_type":input_type,
+                                "message":"The command configuration is invalid! Input type is missing. Aborting..."
+                           })
+                exit(1);
+            elif input_type == None and "input_type" in payload:
+                input_type = payload["input_type"]
+    elif input_type == None:
+        click.echo( {
+                        "error": 1,
+                        "input_type":input_type,
+                        "message":"The command configuration is invalid! Input type is not defined. Aborting..."
+                   })
+        exit(1);
+    else:
+        payload = {} 
+
+    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag, include, exclude)
+
+    if batch_files is not None and batch_files.first() is None:
+        if output_display_type_json_flag:
+            click.echo( {
+                        "error": 1,
+                        "input":input,
+                        "message":"The input is invalid! No valid files found. Aborting..."
+                        })
+        else:
+            click.secho('\nError: The input is invalid! No valid files found. Aborting...', err=True, fg='red')
+        exit(1);
+
+    api_path = "/v3/didimos"
+    url = config.api_host + api_path
+
+    if input_type != None:
+        payload["input_type"] = input_type
+
+    if avatar_structure != None:
+        payload["avatar_structure"] = avatar_structure
+    
+    if garment != None:
+        payload["garment"] = garment
+
+    if gender != None:
+        payload["gender"] = gender
+
+    if len(package_type) > 0:
+        payload["transfer_formats"] = package_type
+
+    if max_texture_dimension != None:
+        payload["max_texture_dimension"] = max_texture_dimension
+
+    for feature_item in feature:
+        payload[feature_item] = 'true'
+
+    if not ignore_cost:    
+        # check how many points a generation will consume before they are consumed 
+        # and prompt user to confirm operation before proceeding with the didimo generation request
+        if batch_files != None:
+            r = http_post_withphoto(url+"-cost", config.access_key, payload, batch_files.first(), depth)
+        else:
+            r = http_post_withphoto(url+"-cost", config.access_key, payload, input, depth)
+
+        json_response = r.json()
+        is_error = r.json()['is_error'] if 'is_error' in json_response else False
+        if is_error:
+            click.echo("The requested configuration is invalid! Aborting...")
+            exit(1);
+
+        estimated_cost = r.json()['cost']
+
+        if batch_files != None:
+            click.echo("Batch processing - files count: %d" % len(batch_files))
+            total_estimated_cost = estimated_cost * len(batch_files)
+            click.echo("The cost of each didimo generation is: "+str(estimated_cost))
+            click.echo("The total cost of this batch operation is: "+str(total_estimated_cost))
+        else:
+            click.echo("The cost of this operation is: "+str(estimated_cost))
+        
+        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
+        click.echo("Proceeding...")
+
+    new_aux_shared_new(config, url, input, batch_files, depth, payload, no_wait, no_download, output, output_display_type_json_flag, upload_concurrency, poll_concurrency, poll_mode, download_concurrency, resume)
+
+
+@click.group()
+@click.help_option(*HELP_OPTION_NAMES)
+@pass_api
+def bulk_2_5_7(config):
+    """
+    Perform bulk requests related operations on DGP compatible version 2.5.7
+    """
+    pass
+
+#### LIST ########################
+
+@bulk_2_5_7.command(short_help='List bulk requests', name='list')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
+@click.option("--filter","-f", multiple=False, help="Filter by status.")
+@click.option("-a", "--all", "all_pages", is_flag=True, default=False,
+              help="List every page without prompting. With the json output display type, each page is printed as a JSON document on its own line.")
+@click.option("--prefetch", type=click.IntRange(1, 32), default=DEFAULT_PREFETCH_PAGES, show_default=True,
+              help="Pages requested ahead of the one shown, and at the same time when the pages are numbered.")
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def list_bulk_requests(config, group_type, filter, all_pages, prefetch, output_display_type):
+    """
+    List bulk requests on DGP compatible version 2.5.7
+    """
+    bulk_list_aux(config, group_type, filter, output_display_type, all_pages, prefetch)
+
+##### GET ###########################
+
+@bulk_2_5_7.command(short_help='Get bulk request details')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
+@click.argument("uuid", required=True)
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def get(config, group_type, uuid, output_display_type):
+    """
+    Get bulk request details on DGP compatible version 2.5.7
+
+    UUID is the bulk request UUID.
+    """
+    bulk_get_aux(config, group_type, uuid, output_display_type)
+
+#### CREATE NEW BULK REQUEST ########
+
+@bulk_2_5_7.command(short_help="Create a bulk request")
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("group_type", type=click.Choice(["didimos"]), required=True, metavar="GROUP")
+@click.argument("input", type=click.Path(exists=True), required=True)
+@click.argument("input_type", type=click.Choice(["photo"]), required=False, metavar="TYPE")
+@click.option('--feature', '-f', multiple=True,
+              type=click.Choice(
+                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
+              help="Create didimo with optional features. This flag can be used multiple times.")
+@click.option('--max-texture-dimension', '-m', multiple=False,
+              type=click.Choice(
+                  ["512", "1024", "2048"]),
+              help="Create didimo with optional max texture dimension.")
+@click.option('--avatar-structure', multiple=False,
+              type=click.Choice(
+                  ["head-only", "full-body"]),
+              help="Create didimo with avatar structure option.")
+@click.option('--garment', multiple=False,
+              type=click.Choice(
+                  ["none","casual", "sporty", "business"]),
+              help="Create didimo with garment option. This option is only available for full-body didimos.")
+@click.option('--gender', multiple=False,
+              type=click.Choice(
+                  ["female", "male", "auto"]),
+              help="Create didimo with gender option. This option is only available for full-body didimos.")
+
+@click.option('--package-type', '-p', multiple=True,
+              type=click.Choice(["fbx", "gltf"]),
+              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
+@click.option('--ignore-cost', is_flag=True,
+              default=False,
+              help="Do not prompt user to confirm operation cost.")
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@click.option('--template', help="Didimo generation template codename.", required=False)
+@pass_api
+def new(config, group_type, input, input_type, feature, avatar_structure, garment, gender, max_texture_dimension, package_type, ignore_cost, output_display_type, template):
+    """
+    Create a bulk request on DGP compatible version 2.5.7
+
+    GROUP is the type of object produced. Accepted values are:
+
+    \b
+        - didimos (input must be an archive containing image files: .jpg/.jpeg/.png)
+
+    INPUT is the path to the input file (which must be a .zip containing photos, according to the didimos group type)
+
+    INPUT TYPE is the type of the files used to produce didimos (which must be a image file: .jpg/.jpeg/.png). Accepted values are:
+
+    \b
+        - photo (input must be image files: .jpg/.jpeg/.png)
+
+        For more information on this operation, visit
+        https://developer.didimo.co/docs/cli\b
+
+    TEMPLATE is the didimo generation template codename. The specified options and arguments will override the template values accordingly.\n
+
+    \b
+    Examples:
+        Create a bulk request to generate didimos from a zip of photos
+        $ didimo bulk new didimos /path/input.zip photo
+    """
+    template_codename = template
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    if output_display_type_json_flag and ignore_cost == False:
+        #click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
+        click.echo( {
+                                "error": 1,
+                                "input":input,
+                                "message":"The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting..."
+                           })
+        exit(1);
+
+    if template_codename != None:
+        #pre-validate that the user can access the didimo generation template 
+        r = get_didimo_generation_template_aux(config, template_codename, output_display_type, True)
+        if r.status_code != 200:
+            if output_display_type_json_flag:
+                click.echo( {
+                                "error": 1,
+                                "template_codename":template_codename,
+                                "message":"There was an error accessing the didimo generation template with the provided codename: "+template_codename
+                           })
+            else:
+                click.echo("There was an error accessing the didimo generation template with the provided codename: %s" % template_codename, err=True) 
+            exit(1);
+        else:   
+            payload = json.loads(r.json()["settings"])
+            if "input_type" not in payload and input_type == None:
+                click.echo( {
+                                "error": 1,
+                                "input_type":input_type,
+                                "message":"The command configuration is invalid! Input type is missing. Aborting..."
+                           })
+                exit(1);
+            elif input_type == None and "input_type" in payload:
+                input_type = payload["input_type"]
+    elif input_type == None:
+        click.echo( {
+                        "error": 1,
+                        "input_type":input_type,
+                        "message":"The command configuration is invalid! Input type is not defined. Aborting..."
+                   })
+        exit(1);
+    else:
+        payload = {} 
+
+    if not input.endswith(".zip"):
+        if output_display_type_json_flag:
+            click.echo( {
+                        "error": 1,
+                        "input":input,
+                        "message":"The input must point to a Zip file."
+                        })
+        else:
+            click.secho('\nError: The input must point to a Zip file.', err=True, fg='red')
+        exit(1);
+
+    batch_files = new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag)
+
+    if batch_files == None:
+        if output_display_type_json_flag:
+            click.echo( {
+                        "error": 1,
+                        "input":input,
+                        "message":"The input is invalid! Zip verification failed. Aborting..."
+                        })
+        else:
+            click.secho('\nError: The input is invalid! Zip verification failed. Aborting...', err=True, fg='red')
+        exit(1);
+
+    if batch_files.first() is None:
+        if output_display_type_json_flag:
+            click.echo( {
+                        "error": 1,
+                        "input":input,
+                        "message":"The input is invalid! No valid files found inside the zip package. Aborting..."
+                        })
+        else:
+            click.secho('\nError: The input is invalid! No valid files found inside the zip package. Aborting...', err=True, fg='red')
+        exit(1);
+
+    api_path = "/v3/"+group_type+"/bulks"
+    url = config.api_host + api_path
+
+    if input_type != None:
+        payload["input_type"] = input_type
+
+    if avatar_structure != None:
+        payload["avatar_structure"] = avatar_structure
+    
+    if garment != None:
+        payload["garment"] = garment
+
+    if gender != None:
+        payload["gender"] = gender
+    
+    if len(package_type) > 0:
+        payload["transfer_formats"] = package_type
+
+    if max_texture_dimension != None:
+        payload["max_texture_dimension"] = max_texture_dimension
+
+    for feature_item in feature:
+        payload[feature_item] = 'true'
+
+    depth = None
+
+    if not ignore_cost:    
+        # estimate how many points a generation will consume before they are consumed 
+        # and prompt user to confirm operation before proceeding with the bulk request
+        cost_estimation_api_path = "/v3/didimos-cost"
+        cost_estimation_url = config.api_host + cost_estimation_api_path
+        r = http_post_withphoto(cost_estimation_url, config.access_key, payload, batch_files.first(), depth)
+
+        json_response = r.json()
+        is_error = r.json()['is_error'] if 'is_error' in json_response else False
+        if is_error:
+            click.echo("The requested configuration is invalid! Aborting...")
+            exit(1);
+
+        estimated_cost = r.json()['cost']
+
+        total_estimated_cost = estimated_cost * len(batch_files)
+        click.echo("The cost of each didimo generation is: "+str(estimated_cost))
+        click.echo("The total cost of this bulk operation is: "+str(total_estimated_cost))
+        
+        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
+        click.echo("Proceeding...")
+
+    if output_display_type_json_flag:
+        r = new_aux_shared_upload_core(config, url, input, depth, input, payload, output_display_type_json_flag)
+    else:
+        with click.progressbar(length=os.path.getsize(input), label='Uploading %s' % input) as bar:
+            r = new_aux_shared_upload_core(config, url, input, depth, input, payload, output_display_type_json_flag, bar.update)
+    r_json = r
+    if r_json['error'] == 1:
+        upload_error_response = r
+        if output_display_type_json_flag:
+            click.secho("%s"%str(r_json), fg="red", err=True)
+        else:
+            click.secho('\nError %d uploading %s: \n%s' % (r.status_code, input, r.text), err=True, fg='red')
+    else:
+        if output_display_type_json_flag:
+            click.secho("%s"%str(r_json), fg="blue", err=False)
+        else:
+            click.secho('\nCreated bulk from %s: \n%s' % (input, str(r_json)), err=False, fg='blue')
+
+
+@click.group()
+@click.help_option(*HELP_OPTION_NAMES)
+@pass_api
+def generation_template_2_5_7(config):
+    """
+    Perform didimo generation template management operations on DGP compatible version 2.5.7
+    """
+    pass
+
+## LIST ##########
+
+@generation_template_2_5_7.command(short_help="Lists available didimo generation templates", name='list')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.option("-a", "--all", "all_pages", is_flag=True, default=False,
+              help="List every page without prompting. With the json output display type, each page is printed as a JSON document on its own line.")
+@click.option("--prefetch", type=click.IntRange(1, 32), default=DEFAULT_PREFETCH_PAGES, show_default=True,
+              help="Pages requested ahead of the one shown, and at the same time when the pages are numbered.")
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def list_didimo_generation_templates(config, all_pages, prefetch, output_display_type):
+    """
+    Lists available didimo generation templates
+    """
+    list_didimo_generation_templates_aux(config, output_display_type, all_pages, prefetch)
+
+## GET ##########
+
+@generation_template_2_5_7.command(short_help="Gets a didimo generation template", name='get')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("codename", required=True)
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def get(config, codename, output_display_type):
+    """
+    Retrieves a didimo generation template
+
+    <codename> is the didimo generation template codename
+    """
+    get_didimo_generation_template_aux(config, codename, output_display_type)
+
+## DELETE ##########
+
+@generation_template_2_5_7.command(short_help="Deletes a didimo generation template", name='delete')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("codename", required=True)
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def delete(config, codename, output_display_type):
+    """
+    Deletes a didimo generation template
+
+    <codename> is the didimo generation template codename
+    """
+    delete_didimo_generation_template_aux(config, codename, output_display_type)
+
+## CREATE ##########
+
+@generation_template_2_5_7.command(short_help="Create a didimo generation template", name='create')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("codename", required=True)
+@click.argument("template_name", required=True)
+@click.argument("description", required=True)
+@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=True, metavar="TYPE")
+@click.option('--feature', '-f', multiple=True,
+              type=click.Choice(
+                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
+              help="Create didimo with optional features. This flag can be used multiple times.")
+@click.option('--max-texture-dimension', '-m', multiple=False,
+              type=click.Choice(
+                  ["512", "1024", "2048"]),
+              help="Create didimo with optional max texture dimension.")
+@click.option('--avatar-structure', multiple=False,
+              type=click.Choice(
+                  ["head-only", "full-body"]),
+              help="Create didimo with avatar structure option.")
+@click.option('--garment', multiple=False,
+              type=click.Choice(
+                  ["none","casual", "sporty"]),
+              help="Create didimo with garment option. This option is only available for full-body didimos.")
+@click.option('--gender', multiple=False,
+              type=click.Choice(
+                  ["female", "male", "auto"]),
+              help="Create didimo with gender option. This option is only available for full-body didimos.")
+@click.option('--package-type', '-p', multiple=True,
+              type=click.Choice(["fbx", "gltf"]),
+              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def create(config, codename, template_name, description, input_type, feature, avatar_structure, garment, gender, max_texture_dimension, package_type, output_display_type):
+    """
+    Create a didimo generation template on DGP compatible version 2.5.7
+
+    CODENAME is a didimo generation template user-managed identifier.\n
+    TEMPLATE_NAME is the didimo generation template name.\n
+    DESCRIPTION is the didimo generation template description.\n
+
+    TYPE is the type of input used to create the didimo. Accepted values are:
+
+    \b
+        - photo (input must be a .jpg/.jpeg/.png)
+        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
+
+        For more information on the input types, visit
+        https://developer.didimo.co/docs/cli\b
+    \b
+    Examples:
+        Create a template named xpto that generates a didimo from a photo
+        $ didimo generation-template create xpto "simple template example based on photo input" photo
+    """
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    settings = {}
+
+    if input_type != None:
+        settings["input_type"] = input_type
+
+    if avatar_structure != None:
+        settings["avatar_structure"] = avatar_structure
+    
+    if garment != None:
+        settings["garment"] = garment
+
+    if gender != None:
+        settings["gender"] = gender
+
+    if max_texture_dimension != None:
+        settings["max_texture_dimension"] = max_texture_dimension
+
+    if len(package_type) > 0:
+        settings["transfer_formats"] = list(package_type)
+
+    for feature_item in feature:
+        settings[feature_item] = 'true'
+
+    payload = {
+        "template_codename": codename,
+        "template_name": template_name,
+        "description": description,
+        "settings": settings,
+        "scope": "user"
+    }
+    serialized_payload = str(payload)
+
+    api_path = "/v3/didimo_generation_templates"
+    url = config.api_host + api_path
+
+    r = http_request_json(url, "POST", config.access_key, serialized_payload, False)
+    generation_template_shared_response_processing(r, output_display_type_json_flag)
+
+
+## UPDATE ##########
+
+@generation_template_2_5_7.command(short_help="Updates a didimo generation template", name='update')
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("codename", required=True)
+@click.argument("template_name", required=True)
+@click.argument("description", required=True)
+@click.argument("input_type", type=click.Choice(["photo", "rgbd"]), required=True, metavar="TYPE")
+@click.option('--feature', '-f', multiple=True,
+              type=click.Choice(
+                  ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
+              help="Create didimo with optional features. This flag can be used multiple times.")
+@click.option('--max-texture-dimension', '-m', multiple=False,
+              type=click.Choice(
+                  ["512", "1024", "2048"]),
+              help="Create didimo with optional max texture dimension.")
+@click.option('--avatar-structure', multiple=False,
+              type=click.Choice(
+                  ["head-only", "full-body"]),
+              help="Create didimo with avatar structure option.")
+@click.option('--garment', multiple=False,
+              type=click.Choice(
+                  ["none","casual", "sporty"]),
+              help="Create didimo with garment option. This option is only available for full-body didimos.")
+@click.option('--gender', multiple=False,
+              type=click.Choice(
+                  ["female", "male", "auto"]),
+              help="Create didimo with gender option. This option is only available for full-body didimos.")
+@click.option('--package-type', '-p', multiple=True,
+              type=click.Choice(["fbx", "gltf"]),
+              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def update(config, codename, template_name, description, input_type, feature, avatar_structure, garment, gender, max_texture_dimension, package_type, output_display_type):
+    """
+    Update a didimo generation template on DGP compatible version 2.5.7
+
+    CODENAME is the didimo generation template user-managed identifier.\n
+    TEMPLATE_NAME is the didimo generation template name.\n
+    DESCRIPTION is the didimo generation template description.\n
+
+    TYPE is the type of input used to create the didimo. Accepted values are:
+
+    \b
+        - photo (input must be a .jpg/.jpeg/.png)
+        - rgbd (input must be a .jpg/.jpeg/.png; use -d to provide the depth file, which must be a .png)
+
+        For more information on the input types, visit
+        https://developer.didimo.co/docs/cli\b
+    \b
+    Examples:
+        Updates a template with codename xyz, by renaming it to "simple photo template" and matching description with settings that generates a didimo from a photo
+        $ didimo generation-template update xyz "simple photo template" "simple template example based on photo input" photo /path/input.jpg
+    """
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    settings = {}
+
+    if input_type != None:
+        settings["input_type"] = input_type
+
+    if avatar_structure != None:
+        settings["avatar_structure"] = avatar_structure
+    
+    if garment != None:
+        settings["garment"] = garment
+
+    if gender != None:
+        settings["gender"] = gender
+
+    if max_texture_dimension != None:
+        settings["max_texture_dimension"] = max_texture_dimension
+
+    if len(package_type) > 0:
+        settings["transfer_formats"] = list(package_type)
+
+    for feature_item in feature:
+        settings[feature_item] = 'true'
+
+    payload = {
+        "template_name": template_name,
+        "description": description,
+        "settings": settings
+    }
+    serialized_payload = str(payload)
+
+    api_path = "/v3/didimo_generation_templates/codename/"+codename
+    url = config.api_host + api_path
+
+    r = http_request_json(url, "PUT", config.access_key, serialized_payload, False)
+    generation_template_shared_response_processing(r, output_display_type_json_flag)
@@ -0,0 +1,207 @@
+import click
+
+from .network import http_post_withphoto
+from .helpers import get_output_display_type_json_flag, list_features_aux, batch_options
+from .shared_processing import new_aux_shared_preprocess_batch_files, new_aux_shared_new
+from .cli import pass_api, HELP_OPTION_NAMES
+
+
+@click.command(short_help="Create a didimo")
+@click.help_option(*HELP_OPTION_NAMES)
+@click.argument("type", 
+            #type=click.Choice(["photo"]), 
+            required=True, metavar="TYPE")
+@click.argument("input", type=click.Path(exists=True), required=True)
+#@click.option('--depth', '-d',
+#              type=click.Path(), required=False,
+#              help="Create didimo with depth")
+@click.option('--feature', '-f', multiple=True,
+              #type=click.Choice(
+              #    ["oculus_lipsync", "simple_poses", "arkit", "aws_polly"]),
+              help="Create didimo with optional features. This flag can be used multiple times.")
+@click.option('--no-download', '-n', is_flag=True, default=False,
+              help="Do not download didimo")
+@click.option('--no-wait', '-w', is_flag=True, default=False,
+              help="Do not wait for didimo creation and do not download")
+@click.option("--output", "-o", type=click.Path(), required=False,
+              help="Path to download the didimo. If multiple package types "
+              "are present or if the flags --no-wait or --no-download "
+              "are present, this option is ignored. [default: <ID>.zip]")
+@click.option('--package-type', '-p', multiple=True,
+#              type=click.Choice(["fbx", "gltf"]),
+              help="Specify output types for this didimo. This flag can be used multiple times.", show_default=True)
+@click.option('--ignore-cost', is_flag=True,
+              default=False,
+              help="Do not prompt user to confirm operation cost")
+@batch_options
+@click.option('--output-display-type', help="Console output type.", 
+                                       type=click.Choice(["human-readable", "json"]), 
+                                       show_default=False)
+@pass_api
+def new_dynamic(config, type, input, feature, no_download, no_wait, output, package_type, ignore_cost, upload_concurrency, poll_concurrency, poll_mode, download_concurrency, resume, include, exclude, output_display_type):
+    """
+    Create a didimo
+
+    TYPE is the type of input used to create the didimo. 
+
+    INPUT is the path to the input file (which must be a .jpg/.jpeg/.png/.zip or a directory containing photos).
+
+    \b
+    Use `didimo list-features` to see the accepted values.
+
+    For more information on the input types, visit
+    https://developer.didimo.co/docs/cli\b
+
+    \b
+    Examples:
+
+        List available features, accepted input types, and output formats \b
+
+            $ didimo list-features
+
+        Create a didimo from a photo without any extra features\b
+
+            $ didimo new photo /path/input.jpg
+
+        Create a didimo with arkit feature from a photo \b
+
+            $ didimo new photo -f arkit /path/input.jpg
+
+        Create a didimo with max_texture_dimension feature from a photo \b
+
+            $ didimo new photo -f max_texture_dimension=2048 /path/input.jpg
+    """
+
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    if output_display_type_json_flag and ignore_cost == False:
+        click.secho("The command configuration is invalid! You must explicitly ignore the cost prompt by setting the ignore cost flag in order to use JSON as the output display type. Aborting...", err=True, fg='red')
+        exit(1);
+
+    batch_files = new_aux_shared_preprocess_batch_files(input, type.lower(), output_display_type_json_flag, include, exclude)
+
+    if not output_display_type_json_flag:
+        click.echo("")
+        click.echo("Obtaining params list...")
+    feature_param = []
+    feature_param_value = []
+    invalid_param_request = []
+    accepted_input_types = []
+    accepted_targets = []
+
+    if True: #feature :
+        for param in feature:
+            param_array = param.split("=", param.count(param))
+            feature_param.append(param_array[0])
+            if len(param_array) == 1:
+                feature_param_value.append("true")
+            else:
+                feature_param_value.append(param_array[1])
+        #click.echo("feature_param: "+str(feature_param))
+        #click.echo("feature_param_value: "+str(feature_param_value))
+
+        if not output_display_type_json_flag:
+            click.echo("Obtaining feature list...")
+        featureList = list_features_aux(config)
+
+        if not output_display_type_json_flag:
+            click.echo("Obtaining input types...")
+        for item in featureList:
+            if "group" in featureList[item]:
+                if featureList[item]["is_input_type"] == True: 
+                    if len(featureList[item]["options"]) > 0:
+                        for sub_item in featureList[item]["options"]:
+                            accepted_input_types.append(sub_item.lower())
+                    else:
+                        accepted_input_types.append(featureList[item]["options"].lower())
+                elif str(featureList[item]["group"]) == "targets":
+                    if len(featureList[item]["options"]) > 0:
+                        for sub_item in featureList[item]["options"]:
+                            accepted_targets.append(sub_item.lower())
+                    else:
+                        accepted_targets.append(featureList[item]["options"].lower())
+        #click.echo(accepted_input_types)
+        #click.echo(accepted_targets)
+
+        if not output_display_type_json_flag:
+            click.echo("Crosschecking requested features...")
+
+        for name in feature_param:
+            if name not in featureList:
+                invalid_param_request.append(name)
+
+        try:
+            index = accepted_input_types.index(type.lower())
+        except ValueError:
+            invalid_param_request.append(type)
+            click.echo("Error - input type not supported: "+type)
+
+        if package_type:
+            if len(package_type) > 0:
+                for item in package_type:
+                    try:
+                        index = accepted_targets.index(item.lower())
+                    except ValueError:
+                        invalid_param_request.append(item)
+                        click.echo("Error - package type not supported: "+item)
+            else:
+                try:
+                    index = accepted_targets.index(package_type.lower())
+                except ValueError:
+                    invalid_param_request.append(package_type)
+                    click.echo("Error - package type not supported: "+package_type)
+
+        if len(invalid_param_request) > 0:
+            click.echo("Error - invalid features requested: "+str(invalid_param_request))
+            return
+
+    if not output_display_type_json_flag:
+        click.echo("Proceeding...")
+
+    api_path = "/v3/didimos"
+    url = config.api_host + api_path
+
+    payload = {
+        'input_type': type.lower()
+    }
+
+    i = 0
+    for name in feature_param:
+        payload[name] = feature_param_value[i]
+        i = i + 1
+
+    if len(package_type) > 0:           
+        payload["transfer_formats"] = package_type
+    else:
+        package_type = "default" #how to get this default value?? glft
+
+    depth = None
+
+    if not ignore_cost:    
+        # check how many points a generation will consume before they are consumed 
+        # and prompt user to confirm operation before proceeding with the didimo generation request
+        if batch_files != None:
+            r = http_post_withphoto(url+"-cost", config.access_key, payload, batch_files.first(), depth, None, False)
+        else:
+            r = http_post_withphoto(url+"-cost", config.access_key, payload, input, depth, None, False)
+
+        is_error = ('status' in r.json() and r.json()['status'] != 201) or ('is_error' in r.json() and r.json()['is_error'])
+        if is_error:
+            click.echo("ERROR: "+ str(r.json()))
+            click.echo("The requested configuration is invalid! Aborting...")
+            exit(1);
+
+        estimated_cost = r.json()['cost']
+
+        if batch_files != None:
+            click.echo("Batch processing - files count: %d" % len(batch_files))
+            total_estimated_cost = estimated_cost * len(batch_files)
+            click.echo("The cost of each didimo generation is: "+str(estimated_cost))
+            click.echo("The total cost of this batch operation is: "+str(total_estimated_cost))
+        else:
+            click.echo("The cost of this operation is: "+str(estimated_cost))
+        
+        click.confirm('Are you sure you want to proceed with the didimo creation?', abort=True)
+        click.echo("Proceeding...")
+
+    new_aux_shared_new(config, url, input, batch_files, depth, payload, no_wait, no_download, output, output_display_type_json_flag, upload_concurrency, poll_concurrency, poll_mode, download_concurrency, resume)
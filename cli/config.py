@@ -5,6 +5,14 @@ import os
 
 from pathlib import Path
 
+from .network import configure_session, DEFAULT_HTTP_POOL_SIZE
+from .transfer import DEFAULT_DOWNLOAD_SEGMENTS
+from .status_store import DEFAULT_STATUS_SHARE_TTL
+from .rate_limit import configure_rate_limits
+
+# Seconds a resolved cli_signature is reused before asking the API again, see get_cli_signature
+DEFAULT_CLI_SIGNATURE_TTL = 24 * 3600
+
 
 class Config(object):
     def __init__(self):
@@ -13,6 +21,11 @@ class Config(object):
         self.configuration = ""
         self.api_host = ""
         self.output_display_type = ""
+        self.http_pool_size = DEFAULT_HTTP_POOL_SIZE
+        self.download_segments = DEFAULT_DOWNLOAD_SEGMENTS
+        self.cli_signature_ttl = DEFAULT_CLI_SIGNATURE_TTL
+        self.status_share_ttl = DEFAULT_STATUS_SHARE_TTL
+        self.rate_limits = {}
 
     def init(self, configuration, host, api_key, api_secret, output_display_type):
         config_dir = Path.home() / ".didimo"
@@ -96,6 +109,13 @@ class Config(object):
                                 configuration, err=True, fg='red')
                     sys.exit(1)
                 self.output_display_type = config.get("output_display_type", "")
+                self.http_pool_size = config.get("http_pool_size", DEFAULT_HTTP_POOL_SIZE)
+                configure_session(self.http_pool_size)
+                self.download_segments = config.get("download_segments", DEFAULT_DOWNLOAD_SEGMENTS)
+                self.cli_signature_ttl = config.get("cli_signature_ttl", DEFAULT_CLI_SIGNATURE_TTL)
+                self.status_share_ttl = config.get("status_share_ttl", DEFAULT_STATUS_SHARE_TTL)
+                self.rate_limits = config.get("rate_limits", {})
+                configure_rate_limits(self.rate_limits)
                 if log_active_configuration and (self.output_display_type != "json"):
                     output_display_type_label = self.output_display_type
                     if output_display_type_label == "":
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .helpers import download_didimo
+
+
+class DownloadPool(object):
+    """ A long-lived pool of download workers.
+    The workers are threads started once and reused for every didimo, so a
+    download costs neither a process start-up nor pickling the configuration,
+    and every worker reuses the connections of the pooled HTTP session (its
+    size should be at least the number of workers).
+    submit() returns a concurrent.futures.Future holding the list of per
+    format results produced by download_didimo. Failures are turned into a
+    download error entry, so the future never raises.
+    """
+
+    def __init__(self, config, size, output, package_type=""):
+        self.config = config
+        self.size = max(1, int(size))
+        self.output = output
+        self.package_type = package_type
+        self._executor = ThreadPoolExecutor(max_workers=self.size)
+
+    def _download(self, didimo_id):
+        try:
+            return download_didimo(self.config, didimo_id, self.package_type, self.output, False)
+        except (Exception, SystemExit) as error:
+            return [{
+                     "download_error":True,
+                     "package_type":self.package_type,
+                     "url":None,
+                     "output_filename":None,
+                     "error_message":str(error)
+                    }]
+
+    def submit(self, didimo_id):
+        return self._executor.submit(self._download, didimo_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
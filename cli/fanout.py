@@ -0,0 +1,123 @@
+import queue
+import sys
+import threading
+
+# Requests in flight when running a command on many didimo IDs
+DEFAULT_FANOUT_CONCURRENCY = 8
+
+# Marks the end of the items handed to the workers
+_END = object()
+
+
+def read_ids(ids, stream=None):
+    """
+    Yields the didimo IDs of a command: <ids> themselves, or when one of them is "-", the lines of <stream>
+    (STDIN by default), read one at a time as they are consumed. Blank lines are skipped
+    """
+    if "-" not in ids:
+        for didimo_id in ids:
+            yield didimo_id.rstrip()
+        return
+    for line in stream if stream is not None else sys.stdin:
+        didimo_id = line.strip()
+        if didimo_id != "":
+            yield didimo_id
+
+
+class FanOut(object):
+    """ Calls <function> on many items from <concurrency> worker threads.
+    map() yields (item, result) pairs, in the order of the items when
+    <ordered> is set, as the calls complete otherwise. Items are pulled from
+    their iterable lazily and at most <concurrency> * 4 of them are between
+    being read and being yielded, so neither an endless STDIN nor a slow first
+    call makes the pending results pile up. An exception raised by a call
+    (SystemExit included, as raised by the network helpers) is raised again by
+    map() on the calling thread, at the place of its item in the output.
+    The workers are daemon threads: when the caller stops iterating (or exits
+    the process), the calls that did not start are dropped and the ones in
+    flight are abandoned. Use it as a context manager, or call close().
+    """
+
+    def __init__(self, function, concurrency=DEFAULT_FANOUT_CONCURRENCY, ordered=True):
+        self.function = function
+        self.concurrency = max(1, int(concurrency))
+        self.ordered = ordered
+        self._stop = threading.Event()
+        self._window = threading.Semaphore(self.concurrency * 4)
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+
+    def _start(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _feed(self, items):
+        count = 0
+        try:
+            for item in items:
+                # blocks while the window is full, unless the fan-out is closing
+                while not self._window.acquire(timeout=0.5):
+                    if self._stop.is_set():
+                        return
+                if self._stop.is_set():
+                    return
+                self._tasks.put((count, item))
+                count = count + 1
+        except BaseException:
+            self._results.put(("failure", sys.exc_info()))
+            return
+        finally:
+            for _ in range(self.concurrency):
+                self._tasks.put(_END)
+        self._results.put(("input", count))
+
+    def _work(self):
+        while not self._stop.is_set():
+            task = self._tasks.get()
+            if task is _END:
+                return
+            index, item = task
+            try:
+                self._results.put(("result", index, item, self.function(item), None))
+            except BaseException:
+                self._results.put(("result", index, item, None, sys.exc_info()))
+
+    def map(self, items):
+        self._start(self._feed, iter(items))
+        for _ in range(self.concurrency):
+            self._start(self._work)
+
+        input_count = None
+        next_index = 0
+        completed = {}
+        while input_count is None or next_index < input_count:
+            event = self._results.get()
+            if event[0] == "failure":
+                exc_type, exc_value, exc_traceback = event[1]
+                raise exc_value.with_traceback(exc_traceback)
+            if event[0] == "input":
+                input_count = event[1]
+                continue
+
+            _, index, item, result, exc_info = event
+            if not self.ordered:
+                index = next_index # yielded as it arrives
+            completed[index] = (item, result, exc_info)
+            while next_index in completed:
+                item, result, exc_info = completed.pop(next_index)
+                next_index = next_index + 1
+                self._window.release()
+                if exc_info is not None:
+                    raise exc_info[1].with_traceback(exc_info[2])
+                yield item, result
+
+    def close(self):
+        self._stop.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,18 +1,44 @@
 from urllib import parse as urlparse
 import click
+import functools
+import json
 import sys
 import time
-import multiprocessing
-
-from .network import DidimoAuth, http_get, cache_this_call
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .network import DidimoAuth, http_get, http_get_no_error, http_request, is_throttled, retry_after_seconds, cache_this_call, RATE_LIMIT_RETRIES
+from .transfer import RangedDownload, download_file
+from .paginator import Paginator, DEFAULT_PREFETCH_PAGES, next_page_url
+from .fanout import FanOut, DEFAULT_FANOUT_CONCURRENCY
+from .cache import DidimoCache
 from .utils import print_status_header, print_status_row
 from ._version import __version__
 
 
+# Delays between two status requests of wait_for_dgp_completion
+DGP_FIRST_POLL_INTERVAL = 1.0
+DGP_MAX_POLL_INTERVAL = 10.0
+# Status requests of wait_for_dgp_completion in a row that may fail (timeout, 429 or 5xx) before it gives up
+DGP_MAX_POLL_FAILURES = 10
+
+# Didimos per page listed by sync_index
+INDEX_SYNC_PAGE_SIZE = 100
+
+
 class DidimoNotFoundException(Exception):
     pass
 
 
+class DidimoThrottledException(Exception):
+    """ A throttled status request that is left to the caller to send again, after <retry_after> seconds (None when
+    the API did not tell) """
+
+    def __init__(self, retry_after=None):
+        super().__init__("Throttled, retry after %s seconds" % retry_after)
+        self.retry_after = retry_after
+
+
 class URL(click.ParamType):
     name = "url"
 
@@ -26,13 +52,45 @@ class URL(click.ParamType):
         return value
 
 
-def get_didimo_status(config, id):
-    api_path = "/v3/didimos/" + id
-    url = config.api_host + api_path
-    r = http_get(url, auth=DidimoAuth(config, api_path))
-    if r.status_code == 404:
-        raise DidimoNotFoundException()
-    return r.json()
+def get_didimo_status(config, id, cached=True, retries=RATE_LIMIT_RETRIES):
+    """
+    The document of the didimo <id>. Didimos done or in error are answered from the didimo cache when <cached> is set,
+    and their document is stored in it when requested from the API.
+    With <cached>, a status just requested by another CLI process on this host is used as well, and when several
+    processes ask for the same didimo at the same time, only one of them sends the request (see StatusStore).
+    A throttled request is sent again up to <retries> times (see http_request). With no retries, DidimoThrottledException
+    is raised instead for the caller to send it again
+    """
+    from .status_store import shared_status_store
+
+    didimo_cache = DidimoCache(config)
+    if cached:
+        response = didimo_cache.load(id)
+        if response is not None:
+            return response
+
+    def request():
+        api_path = "/v3/didimos/" + id
+        url = config.api_host + api_path
+        r = http_get_no_error(url, retries=retries, auth=DidimoAuth(config, api_path))
+        if retries == 0 and is_throttled(r):
+            r.close()
+            raise DidimoThrottledException(retry_after_seconds(r))
+        if r.status_code != 200:
+            click.secho('Error %d' % r.status_code, err=True, fg='red')
+            click.echo(r.text)
+        if r.status_code == 404:
+            didimo_cache.invalidate(id)
+            raise DidimoNotFoundException()
+        response = r.json()
+        if r.status_code == 200:
+            didimo_cache.store(id, response)
+        return response, r.status_code == 200
+
+    status_store = shared_status_store(config) if cached else None
+    if status_store is None:
+        return request()[0]
+    return status_store.get(id, request)
 
 def get_asset_status(config, id):
     api_path = "/v3/assets/" + id
@@ -40,156 +98,183 @@ def get_asset_status(config, id):
     r = http_get(url, auth=DidimoAuth(config, api_path))
     return r.json()
 
-#Polls the API for progress update until the didimo generation pipeline is finished. Returns 0 if the process is successfull or return 1 if there is an error. 
+#Polls the API for progress update until the didimo generation pipeline is finished. Returns 0 if the process is successfull, 1 if there is an error or 3 on timeout. 
 def wait_for_dgp_completion(config, key, timeout, output_display_type_json_flag):
+    """
+    Polls in this process until <timeout> seconds have passed (no limit when None).
+    The first checks are close together and the delay then grows up to DGP_MAX_POLL_INTERVAL, unless the API asks
+    for another delay with Retry-After. Timeouts, throttled (429) and server error (5xx) responses are retried the same
+    way, up to DGP_MAX_POLL_FAILURES times in a row; other error responses end the wait with an error.
+    """
+    import requests
 
-    manager = multiprocessing.Manager()
-    return_dict = manager.dict()
-
-    if timeout is not None:
-        # Start foo as a process
-        p = multiprocessing.Process(target=wait_for_dgp_completion_aux, name="Wait_for_dgp_completion_aux", args=(config,key,output_display_type_json_flag, return_dict))
-        p.start()
-
-        # Wait 10 seconds for foo
-        p.join(float(timeout))
-
-        # If thread is active
-        if p.is_alive():
-            if not output_display_type_json_flag:
-                click.secho("Timeout!")
-
-            # Terminate foo
-            p.terminate()
-
-            # Cleanup
-            p.join()
-
-            return 3 #return timeout error
-        else:
-            return return_dict[0] #return function result
-    else:
-        wait_for_dgp_completion_aux(config, key, output_display_type_json_flag, return_dict)
-        return return_dict[0]
-
-
-def wait_for_dgp_completion_aux(config, key, output_display_type_json_flag, return_dict):
+    api_path = "/v3/assets/" + key
+    url = config.api_host + api_path
+    deadline = None if timeout is None else time.monotonic() + float(timeout)
 
+    interval = DGP_FIRST_POLL_INTERVAL
     last_status = ""
+    failures = 0
     while True:
-        response = get_asset_status(config, key) 
-        percent = response.get('percent', 100)
-        status = response.get('status', '')
+        request_timeout = None
+        if deadline is not None:
+            request_timeout = max(1.0, deadline - time.monotonic())
+        try:
+            # throttled responses are retried by this loop, which keeps to the deadline
+            r = http_request("GET", url, retries=0, deadline=deadline, auth=DidimoAuth(config, api_path),
+                             timeout=request_timeout)
+        except requests.exceptions.Timeout:
+            r = None
+        except requests.exceptions.RequestException:
+            click.echo("A Network Error Has Occured")
+            sys.exit(1)
 
-        if status != last_status:
-            last_status = status
+        if r is not None and r.status_code != 200 and r.status_code != 429 and r.status_code < 500:
             if not output_display_type_json_flag:
-                click.secho("Status: "+str(status))
+                click.secho('Error %d' % r.status_code, err=True, fg='red')
+                click.echo(r.text)
+            return 1
+
+        if r is None or r.status_code != 200:
+            failures = failures + 1
+            if failures >= DGP_MAX_POLL_FAILURES:
+                if not output_display_type_json_flag:
+                    click.secho('Error: the status could not be requested %d times in a row' % failures, err=True, fg='red')
+                return 1
+        else:
+            failures = 0
+            response = r.json()
+            percent = response.get('percent', 100)
+            status = response.get('status', '')
+
+            if status != last_status:
+                last_status = status
+                if not output_display_type_json_flag:
+                    click.secho("Status: "+str(status))
+
+            if status == "processing":
+                if not output_display_type_json_flag:
+                    click.secho("Progress: "+str(percent))
+
+            if response.get('status_message', "") != "":
+                if not output_display_type_json_flag:
+                    click.secho(err=True)
+                    click.secho('Error: %s' %
+                                response["status_message"], err=True, fg='red')
+                return 1
+            if status == 'done':
+                return 0
+
+        delay = retry_after_seconds(r) if r is not None else None
+        if delay is None:
+            delay = interval
+        interval = min(DGP_MAX_POLL_INTERVAL, interval * 1.5)
+
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if not output_display_type_json_flag:
+                    click.secho("Timeout!")
+                return 3 #return timeout error
+            delay = min(delay, remaining)
+        time.sleep(delay)
 
-        if status == "processing":
-            if not output_display_type_json_flag:
-                click.secho("Progress: "+str(percent))
-
-        if response['status_message'] != "":
-            if not output_display_type_json_flag:
-                click.secho(err=True)
-                click.secho('Error: %s' %
-                            response["status_message"], err=True, fg='red')
-            return_dict[0] = 1
-            return
-        if response['status'] == 'done':
-            return_dict[0] = 0
-            return
-        time.sleep(10)
-
-    click.secho("This statement should never be reached...")
-    return_dict[0] = 3
-    return
 
 def download_didimo(config, id, package_type, output_path, showProgressBar=True):
+    """
+    Downloads the packages of the didimo <id> to <output_path>, all the transfer formats at the same time.
+    <package_type> is a format name or a list of names, every available format is downloaded when it is empty.
+    Returns a list with the result of each downloaded format
+    """
     api_path = "/v3/didimos/" + id
-    url = config.api_host + api_path
 
-    r = http_get(url, auth=DidimoAuth(config, api_path))
-    
-    if r.status_code == 404:
+    # the document of a finished didimo usually comes from the didimo cache, stored when its status was checked
+    try:
+        didimo = get_didimo_status(config, id)
+    except DidimoNotFoundException:
         click.secho('No didimo with the requested key was found on this account.', err=True, fg='red')
         sys.exit(0)
 
-    return_json_item = None
-
-    for package_itm in r.json()['transfer_formats']:
-        s3url = ""
-        
-        output_filename = id+"_"+package_itm["name"] + ".zip"
-        output_path_full = output_path+output_filename
+    if package_type == None or isinstance(package_type, str):
+        package_types = [package_type] if package_type else []
+    else:
+        package_types = list(package_type)
 
-        if package_type == None or len(package_type) == 0:
+    downloads = []
+    for package_itm in didimo['transfer_formats']:
+        if len(package_types) == 0 or package_itm["name"] in package_types:
+            output_filename = id+"_"+package_itm["name"] + ".zip"
             s3url = package_itm["__links"]["self"]
+            downloads.append({
+                                "package_type":package_itm["name"],
+                                "url":s3url,
+                                "output_filename":output_filename,
+                                "download":RangedDownload(s3url, output_path+output_filename, DidimoAuth(config, api_path), config.download_segments),
+                                "error":None
+                             })
+    if len(downloads) == 0:
+        return []
+
+    def run(step, item, *args):
+        if item["error"] is None:
+            try:
+                return step(item["download"], *args)
+            except Exception as error:
+                item["error"] = error
+
+    with ThreadPoolExecutor(max_workers=len(downloads)) as executor:
+        # open all the transfers first, so the progress bar knows the total size
+        started = list(executor.map(lambda item: run(RangedDownload.start, item), downloads))
+        if showProgressBar:
+            total_size = sum(item["download"].size or 0 for item in downloads if item["error"] is None)
+            lock = threading.Lock()
+            with click.progressbar(length=total_size, label="Downloading %s" % id) as bar:
+                # a resumed download already has part of its bytes on disk
+                bar.update(sum(result[1] for result in started if result is not None))
+                def on_progress(size):
+                    with lock:
+                        bar.update(size)
+                list(executor.map(lambda item: run(RangedDownload.finish, item, on_progress), downloads))
         else:
-            if package_itm["name"] == package_type:
-                s3url = package_itm["__links"]["self"]
-
-        if s3url != "":
-            #print ("downloading.... "+s3url)
-            try: 
-                with http_get(s3url, auth=DidimoAuth(config, api_path)) as r:
-                    r.raise_for_status()
-                    zipsize = int(r.headers.get('content-length', 0))
-                    with click.open_file(output_path_full, 'wb') as f:
-                        if showProgressBar:
-                            label = "Downloading %s" % id
-                            with click.progressbar(length=zipsize, label=label) as bar:
-                                for chunk in r.iter_content(chunk_size=2048):
-                                    size = f.write(chunk)
-                                    bar.update(size)
-                        else:
-                            for chunk in r.iter_content(chunk_size=zipsize):
-                                size = f.write(chunk)
-                if showProgressBar:
-                    click.secho('Downloaded to %s' % output_filename, fg='blue', err=False)
-                return_json_item = {
-                                    "download_error":False,
-                                    "url":s3url,
-                                    "output_filename":output_filename,
-                                    "error_message":None
-                                   }
-            except Exception as error: 
-                return_json_item = {
-                                    "download_error":True,
-                                    "url":s3url,
-                                    "output_filename":output_filename,
-                                    "error_message":error
-                                   }
-                if showProgressBar:
-                    click.secho('Error downloading to %s: %s' % (output_filename, error), fg='red', err=True)
-
-        return return_json_item
+            list(executor.map(lambda item: run(RangedDownload.finish, item), downloads))
+
+    if any(item["error"] is not None for item in downloads):
+        # the links of a cached document may be the reason, the next attempt requests it again
+        DidimoCache(config).invalidate(id)
+
+    return_json_items = []
+    for item in downloads:
+        error = item["error"]
+        if showProgressBar:
+            if error is None:
+                click.secho('Downloaded to %s' % item["output_filename"], fg='blue', err=False)
+            else:
+                click.secho('Error downloading to %s: %s' % (item["output_filename"], error), fg='red', err=True)
+        return_json_items.append({
+                                    "download_error":error is not None,
+                                    "package_type":item["package_type"],
+                                    "url":item["url"],
+                                    "output_filename":item["output_filename"],
+                                    "error_message":None if error is None else str(error)
+                                 })
+    return return_json_items
 
 
 def download_asset(config, asset_url, api_path, output_path, output_display_type_json_flag):
 
     if asset_url != "":
-        with http_get(asset_url, auth=DidimoAuth(config, api_path)) as r:
-            r.raise_for_status()
-            zipsize = int(r.headers.get('content-length', 0))
-            with click.open_file(output_path, 'wb') as f:
-                if output_display_type_json_flag:
-                    for chunk in r.iter_content(chunk_size=2048):
-                        size = f.write(chunk)
-                else:
-                    label = "Downloading asset"
-                    click.echo(label)
-                    with click.progressbar(length=zipsize, label=label) as bar:
-                        for chunk in r.iter_content(chunk_size=2048):
-                            size = f.write(chunk)
-                            bar.update(size)
-                    click.secho('Downloaded to %s' % output_path, fg='blue', err=False)
-                return {
-                          "error": 0,
-                          "output_path": output_path,
-                          "size": zipsize
-                        }    
+        if output_display_type_json_flag:
+            zipsize = download_file(asset_url, output_path, DidimoAuth(config, api_path), config.download_segments)
+        else:
+            label = "Downloading asset"
+            click.echo(label)
+            zipsize = download_file(asset_url, output_path, DidimoAuth(config, api_path), config.download_segments, label)
+            click.secho('Downloaded to %s' % output_path, fg='blue', err=False)
+        return {
+                  "error": 0,
+                  "output_path": output_path,
+                  "size": zipsize
+                }    
     else:
         if output_display_type_json_flag:
             return {
@@ -231,6 +316,39 @@ def get_cli_version_compatibility_rules(config, output_display_type = "ignore_di
         return compatibility_json
 
 
+def batch_options(command):
+    """
+    Adds the options that tune the processing of a batch (a zip or a directory INPUT) to a version of the `new` command,
+    and rejects --resume with --no-wait, as batch uploads are only journaled while waiting for the didimos
+    """
+    from .polling import POLL_MODES
+
+    @functools.wraps(command)
+    def new_command(*args, **kwargs):
+        if kwargs.get("resume") and kwargs.get("no_wait"):
+            raise click.UsageError("--resume cannot be used with --no-wait: batch uploads are only journaled while waiting for the didimos.")
+        return command(*args, **kwargs)
+
+    options = [
+        click.option('--upload-concurrency', type=click.IntRange(1, 64), default=4, show_default=True,
+                     help="Number of files uploaded in parallel when INPUT is a zip or a directory."),
+        click.option('--poll-concurrency', type=click.IntRange(1, 64), default=4, show_default=True,
+                     help="Number of status requests sent in parallel when INPUT is a zip or a directory."),
+        click.option('--poll-mode', type=click.Choice(POLL_MODES), default="auto", show_default=True,
+                     help="How the status of a batch is checked: one request per didimo (key), from a page of the didimo list when it holds two didimos due or more (list), or when it holds many (auto)."),
+        click.option('--download-concurrency', type=click.IntRange(1, 64), default=5, show_default=True,
+                     help="Number of didimos downloaded in parallel when INPUT is a zip or a directory."),
+        click.option('--resume', is_flag=True, default=False,
+                     help="Continue an interrupted batch from where it stopped, without uploading again the files already sent. Only used when INPUT is a zip or a directory, and not with --no-wait."),
+        click.option('--include', multiple=True,
+                     help="Only process the files whose path inside INPUT matches this glob pattern, when INPUT is a zip or a directory. This flag can be used multiple times."),
+        click.option('--exclude', multiple=True,
+                     help="Skip the files whose path inside INPUT matches this glob pattern, when INPUT is a zip or a directory. This flag can be used multiple times."),
+    ]
+    for option in reversed(options):
+        new_command = option(new_command)
+    return new_command
+
 def get_output_display_type_json_flag(config, output_display_type):
     """
     Calculates the value of the output_display_type_json_flag based on the active configuration and the param value that overrides it. Default is human readable for backward compatibility.
@@ -241,9 +359,12 @@ def get_output_display_type_json_flag(config, output_display_type):
         output_display_type_json_flag = False
     return output_display_type_json_flag
 
-def list_aux(config, api_path, page_size, index, navigate, sort_by, sort_order, output_display_type):
+def list_aux(config, api_path, page_size, index, navigate, sort_by, sort_order, output_display_type, all_pages=False, prefetch=DEFAULT_PREFETCH_PAGES):
     """
     List didimos
+
+    With <all_pages>, every page from <index> on is listed without asking, as the pages arrive.
+    Otherwise <navigate> asks before showing each next page. Either way, up to <prefetch> pages are requested ahead.
     """
     output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
 
@@ -254,18 +375,7 @@ def list_aux(config, api_path, page_size, index, navigate, sort_by, sort_order,
     if page_size != None:
         url = url + "&page_size="+str(page_size)
 
-    sort_order_api = "-"
-    if sort_order != None:
-        if sort_order == "asc" or sort_order == "ascending":
-            sort_order_api = "+"
-        elif sort_order == "desc" or sort_order == "descending":
-            sort_order_api = "-"
-        else:
-            if output_display_type_json_flag:
-                click.echo(str({"error": 1,"message":"Unknown sort order! Please correct the input. "}))
-            else: 
-                click.secho("Unknown sort order! Please correct the input. ", fg='red', err=True)
-            exit(1);
+    sort_order_api = "-" if is_descending_sort_order(sort_order, output_display_type_json_flag) else "+"
 
     if sort_by != None:
         url = url + "&order_by="+sort_order_api+sort_by
@@ -282,42 +392,165 @@ def list_aux(config, api_path, page_size, index, navigate, sort_by, sort_order,
         exit(1);
 
     if output_display_type_json_flag:
-        click.echo(r.text)
+        if all_pages:
+            # one JSON document per page, on a line of its own
+            for page in Paginator(config, json_response, 'didimos', prefetch).pages():
+                click.echo(json.dumps(page))
+        else:
+            click.echo(r.text)
     else:
 
         if index < 1:
             sys.exit(0)
 
-        didimos = []
-        next_page = json_response['__links']['next'] if '__links' in json_response and 'next' in json_response['__links'] else None
-        page = index
-        didimos += r.json()['didimos']
+        for page_number, page in enumerate(Paginator(config, json_response, 'didimos', prefetch).pages()):
+            if page_number == 0 or not all_pages:
+                print_status_header()
+            for didimo in page['didimos']:
+                print_status_row(didimo)
+
+            if all_pages:
+                continue
+            if navigate and next_page_url(page) != None:
+                click.confirm('There are more results. Fetch next page?', abort=True)
+            else:
+                break
+
+def sync_index(config, full=False, concurrency=DEFAULT_FANOUT_CONCURRENCY, prefetch=DEFAULT_PREFETCH_PAGES):
+    """
+    Brings the local index of didimos (see index.DidimoIndex) up to date with the API and returns it with the counts of the sync
+
+    The didimos are listed newest first, until a page only has didimos that were indexed already and none created after
+    the newest one listed by the last completed sync (created_at only has a precision of seconds, so ties are checked
+    by key). Until a sync completes, every page is listed, so an interrupted sync is carried on by the next one.
+    The indexed didimos that were not done or in error yet are then requested one by one, <concurrency> at a time.
+    With <full>, every page is listed and the didimos that are gone from the account are removed from the index.
+    """
+    from .index import DidimoIndex
+
+    index = DidimoIndex(config)
+    newest_created_at = None if full else index.newest_created_at()
+
+    api_path = "/v3/didimos"
+    url = config.api_host + api_path + "?page=1&page_size=%d&order_by=-created_at" % INDEX_SYNC_PAGE_SIZE
+    r = http_get(url, auth=DidimoAuth(config, api_path))
+    if r.status_code != 200:
+        sys.exit(1)
+
+    added = 0
+    listed = set()
+    newest_listed = newest_created_at
+    for page in Paginator(config, r.json(), 'didimos', prefetch).pages():
+        didimos = page.get('didimos', [])
+        page_added = index.upsert(didimos)
+        added = added + page_added
+        listed.update(didimo['key'] for didimo in didimos)
+        newest_listed = max([newest_listed or ""] + [didimo.get('created_at') or "" for didimo in didimos]) or None
+        if newest_created_at is not None and page_added == 0 and \
+                all(didimo.get('created_at', "") <= newest_created_at for didimo in didimos):
+            break
+
+    removed = set()
+    if full:
+        removed = index.keys() - listed
+
+    def fetch(key):
+        try:
+            return get_didimo_status(config, key)
+        except DidimoNotFoundException:
+            return None
+
+    refreshed = 0
+    pending = [key for key in index.pending_keys() if key not in listed]
+    with FanOut(fetch, concurrency, False) as fan_out:
+        for key, didimo in fan_out.map(pending):
+            if didimo is None:
+                removed.add(key)
+            else:
+                index.upsert([didimo])
+                refreshed = refreshed + 1
+
+    index.remove(removed)
+    index.mark_synced(newest_listed)
+    return index, {"listed": len(listed), "added": added, "refreshed": refreshed, "removed": len(removed),
+                   "total_size": index.count()}
 
-        while True:
+def open_index(config, refresh=False, concurrency=DEFAULT_FANOUT_CONCURRENCY, prefetch=DEFAULT_PREFETCH_PAGES):
+    """
+    The local index of didimos when it was synced before, None otherwise. With <refresh>, the index is synced first
+    """
+    from .index import DidimoIndex
 
-            while page != index:
+    index = DidimoIndex(config)
+    if not index.exists():
+        return None
+    if refresh:
+        index, _ = sync_index(config, concurrency=concurrency, prefetch=prefetch)
+    return index
 
-                if next_page != None:
-                    api_path = next_page
-                    url = api_path
-                    r = http_get(url, auth=DidimoAuth(config, api_path))
-                    json_response = r.json()
-                    didimos += json_response['didimos']
-                    next_page = json_response['__links']['next'] if '__links' in json_response else None
-                    page += 1
-                else:
-                    break
+def list_index_aux(config, index, page_size, page, navigate, sort_by, sort_order, status, input_type, output_display_type, all_pages=False):
+    """
+    List didimos from the local <index>, optionally only the ones in <status> and of <input_type>
 
-            print_status_header()
+    Pages are shown the same way as list_aux does, from the index instead of the API.
+    """
+    from .index import INDEX_SORT_COLUMNS
+
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    descending = is_descending_sort_order(sort_order, output_display_type_json_flag)
+    if sort_by not in INDEX_SORT_COLUMNS:
+        message = "Cannot sort by %s, choose one of: %s" % (sort_by, ", ".join(INDEX_SORT_COLUMNS))
+        if output_display_type_json_flag:
+            click.echo(str({"error": 1,"message":message}))
+        else:
+            click.secho(message, fg='red', err=True)
+        exit(1);
+
+    total_size = index.count(status, input_type)
+    synced_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(index.synced_at()))
+
+    page_size = max(1, int(page_size))
+    page = int(page)
+    if page < 1:
+        sys.exit(0)
+    last_page = max(1, (total_size + page_size - 1) // page_size)
+
+    if not output_display_type_json_flag:
+        click.secho("Listing from the index synced at %s, use --refresh to sync it first." % synced_at, err=True, fg='blue')
+
+    for page_number in range(page, last_page + 1):
+        didimos = index.query(status, input_type, sort_by, descending, page_size, (page_number - 1) * page_size)
+        if output_display_type_json_flag:
+            click.echo(json.dumps({"didimos": didimos, "page": page_number, "page_size": page_size,
+                                   "total_size": total_size, "synced_at": synced_at},
+                                  indent=None if all_pages else 4))
+        else:
+            if page_number == page or not all_pages:
+                print_status_header()
             for didimo in didimos:
                 print_status_row(didimo)
 
-            if navigate and next_page != None:
-                click.confirm('There are more results. Fetch next page?', abort=True)
-                index = index + 1
-                didimos = []
-            else:
-                break
+        if all_pages:
+            continue
+        if navigate and page_number < last_page and not output_display_type_json_flag:
+            click.confirm('There are more results. Fetch next page?', abort=True)
+        else:
+            break
+
+def is_descending_sort_order(sort_order, output_display_type_json_flag):
+    """
+    Whether <sort_order> (asc, ascending, desc or descending) sorts in descending order. Unknown sort orders end the command
+    """
+    if sort_order == None or sort_order == "desc" or sort_order == "descending":
+        return True
+    if sort_order == "asc" or sort_order == "ascending":
+        return False
+    if output_display_type_json_flag:
+        click.echo(str({"error": 1,"message":"Unknown sort order! Please correct the input. "}))
+    else: 
+        click.secho("Unknown sort order! Please correct the input. ", fg='red', err=True)
+    exit(1);
 
 def list_features_aux(config):
     """
@@ -326,7 +559,7 @@ def list_features_aux(config):
     api_path = "/v3/accounts/default/status?ui=cli"
     url = config.api_host + api_path
 
-    r = http_get(url, auth=DidimoAuth(config, api_path))
+    r = cache_this_call(url, config.access_key, auth=DidimoAuth(config, api_path))
     response = r.json()
 
     output = {} #[]
@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+import time
+
+from .cache import user_cache_dir, account_cache_name, TERMINAL_STATUSES
+
+# Columns the index can be sorted by, see DidimoIndex.query
+INDEX_SORT_COLUMNS = ("key", "input_type", "status", "percent", "cost", "created_at", "expires_at")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS didimos (
+    key TEXT PRIMARY KEY,
+    input_type TEXT,
+    status TEXT,
+    percent INTEGER,
+    cost REAL,
+    created_at TEXT,
+    expires_at TEXT,
+    meta_data TEXT,
+    document TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS didimos_created_at ON didimos (created_at);
+CREATE INDEX IF NOT EXISTS didimos_status ON didimos (status);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class DidimoIndex(object):
+    """ Local SQLite mirror of the didimos of an account, one database per API
+    host and access key in the user cache dir.
+    Every row keeps the fields the CLI lists and filters by, plus the whole
+    document returned by the API, which is what lookups return. The index is
+    only written by `didimo index sync` and by the commands that get fresh
+    didimos from the API anyway. Each thread gets its own connection, and WAL
+    mode lets other CLI processes read while one of them syncs.
+    """
+
+    def __init__(self, config):
+        directory = user_cache_dir() / "index"
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / ("%s.sqlite3" % account_cache_name(config))
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def exists(self):
+        """ Whether the index was synced at least once """
+        return self.path.exists() and self.synced_at() is not None
+
+    def synced_at(self):
+        """ Time of the last completed sync, None if there was none """
+        row = self._connection().execute("SELECT value FROM sync_state WHERE name = 'synced_at'").fetchone()
+        return None if row is None else float(row[0])
+
+    def mark_synced(self, newest_created_at):
+        """ Records a completed sync, which listed every didimo created up to <newest_created_at> """
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO sync_state (name, value) VALUES ('synced_at', ?)", (str(time.time()),))
+            if newest_created_at is not None:
+                connection.execute("INSERT OR REPLACE INTO sync_state (name, value) VALUES ('newest_created_at', ?)",
+                                   (newest_created_at,))
+
+    def newest_created_at(self):
+        """ created_at of the newest didimo listed by the last completed sync, None if there was none. Didimos
+        indexed since, by an interrupted sync or another command, do not count: older ones may still be missing """
+        if self.synced_at() is None:
+            return None
+        row = self._connection().execute("SELECT value FROM sync_state WHERE name = 'newest_created_at'").fetchone()
+        return None if row is None else row[0]
+
+    def upsert(self, didimos):
+        """ Stores or replaces the API documents <didimos>. Returns the number of didimos that were not indexed yet """
+        now = time.time()
+        rows = [(didimo['key'], didimo.get('input_type'), didimo.get('status'), didimo.get('percent'), didimo.get('cost'),
+                 didimo.get('created_at'), didimo.get('expires_at'), json.dumps(didimo.get('meta_data')),
+                 json.dumps(didimo), now) for didimo in didimos]
+        if not rows:
+            return 0
+        with self._connection() as connection:
+            known = connection.execute("SELECT COUNT(*) FROM didimos WHERE key IN (%s)" % ",".join("?" * len(rows)),
+                                       [row[0] for row in rows]).fetchone()[0]
+            connection.executemany("INSERT OR REPLACE INTO didimos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows) - known
+
+    def remove(self, keys):
+        keys = list(keys)
+        with self._connection() as connection:
+            connection.executemany("DELETE FROM didimos WHERE key = ?", [(key,) for key in keys])
+
+    def keys(self):
+        return set(key for key, in self._connection().execute("SELECT key FROM didimos"))
+
+    def pending_keys(self):
+        """ Keys of the indexed didimos that may still change """
+        return [key for key, in self._connection().execute(
+            "SELECT key FROM didimos WHERE status IS NULL OR status NOT IN (%s)" % ",".join("?" * len(TERMINAL_STATUSES)),
+            TERMINAL_STATUSES)]
+
+    def get(self, key):
+        """ The indexed document of <key>, None if it is not indexed """
+        row = self._connection().execute("SELECT document FROM didimos WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _where(self, status, input_type):
+        clauses, parameters = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            parameters.append(status)
+        if input_type is not None:
+            clauses.append("input_type = ?")
+            parameters.append(input_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", parameters
+
+    def count(self, status=None, input_type=None):
+        where, parameters = self._where(status, input_type)
+        return self._connection().execute("SELECT COUNT(*) FROM didimos" + where, parameters).fetchone()[0]
+
+    def query(self, status=None, input_type=None, sort_by="created_at", descending=True, limit=None, offset=0):
+        """ Documents of the indexed didimos matching the filters, sorted by <sort_by> (one of INDEX_SORT_COLUMNS) """
+        if sort_by not in INDEX_SORT_COLUMNS:
+            raise ValueError("Cannot sort by %s" % sort_by)
+        where, parameters = self._where(status, input_type)
+        sql = "SELECT document FROM didimos%s ORDER BY %s %s, key %s LIMIT ? OFFSET ?" % (
+            where, sort_by, "DESC" if descending else "ASC", "DESC" if descending else "ASC")
+        rows = self._connection().execute(sql, parameters + [-1 if limit is None else limit, offset])
+        return [json.loads(document) for document, in rows]
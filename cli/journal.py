@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from hashlib import sha256
+from pathlib import Path
+
+
+class BatchJournal(object):
+    """ Local SQLite record of a batch run.
+    For each input file it keeps the dict returned by the upload
+    (new_aux_shared_upload_core), the didimo key, the last known status, the
+    processing result (new_aux_shared_processing / StatusPoller) and the
+    download result, so an interrupted run can be resumed without uploading
+    the same photos again.
+    The connection is shared by the pipeline threads behind a lock.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS files (
+                                input_file TEXT PRIMARY KEY,
+                                didimo_key TEXT,
+                                status TEXT,
+                                upload_result TEXT,
+                                processing_result TEXT,
+                                download_result TEXT,
+                                updated_at REAL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_didimo_key ON files (didimo_key)")
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def clear(self):
+        self._write("DELETE FROM files", ())
+
+    def _write(self, sql, args):
+        with self._lock:
+            self._db.execute(sql, args)
+            self._db.commit()
+
+    def _read(self, sql, args):
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()
+
+    def record_upload(self, input_file, result):
+        didimo_key = result.get("didimo_id") if result["error"] == 0 else None
+        row = self._read("SELECT didimo_key FROM files WHERE input_file = ?", (str(input_file),))
+        if row is not None and didimo_key is not None and row[0] == didimo_key:
+            # replayed while resuming, keep the later stages
+            return
+        status = "uploaded" if result["error"] == 0 else "upload_error"
+        self._write("""INSERT OR REPLACE INTO files (input_file, didimo_key, status, upload_result, updated_at)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (str(input_file), didimo_key, status, json.dumps(result), time.time()))
+
+    def record_processing(self, result):
+        status = "done" if result["error"] == 0 else "error"
+        self._write("UPDATE files SET status = ?, processing_result = ?, updated_at = ? WHERE didimo_key = ? AND status != 'downloaded'",
+                    (status, json.dumps(result), time.time(), result["didimo_key"]))
+
+    def record_download(self, didimo_key, results):
+        status = "download_error" if any(result["download_error"] for result in results) else "downloaded"
+        self._write("UPDATE files SET status = ?, download_result = ?, updated_at = ? WHERE didimo_key = ?",
+                    (status, json.dumps(results), time.time(), didimo_key))
+
+    def lookup(self, input_file):
+        """ Returns the last completed stage of <input_file> as (stage, results), or None to start from scratch.
+        results holds the journaled dict of every completed stage. """
+        row = self._read("""SELECT status, upload_result, processing_result, download_result
+                            FROM files WHERE input_file = ?""", (str(input_file),))
+        if row is None or row[0] == "upload_error":
+            return None
+        status, upload_result, processing_result, download_result = row
+        results = {"upload": json.loads(upload_result)}
+        if status == "uploaded":
+            return ("upload", results)
+        results["processing"] = json.loads(processing_result)
+        if status in ("done", "error", "download_error"):
+            return ("processing", results)
+        results["download"] = json.loads(download_result)
+        return ("download", results)
+
+
+def batch_journal_path(config, input):
+    """
+    Location of the journal of a batch, one per API host, API key and input path
+    """
+    journal_dir = Path.home() / ".didimo" / "journals"
+    journal_dir.mkdir(parents=True, exist_ok=True)
+    batch_id = sha256(("%s|%s|%s" % (config.api_host, config.access_key, os.path.abspath(input))).encode('utf-8')).hexdigest()
+    return journal_dir / ("%s.sqlite" % batch_id[:32])
+
+
+def open_batch_journal(config, input, resume):
+    """
+    Opens the journal of the batch made from <input>. Unless <resume> is set, any previous record is discarded
+    """
+    journal = BatchJournal(batch_journal_path(config, input))
+    if not resume:
+        journal.clear()
+    return journal
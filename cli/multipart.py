@@ -0,0 +1,162 @@
+import mmap
+import os
+import uuid
+
+from .batch_files import ZipMember, open_batch_file
+
+# Size of the pieces the file parts are read and sent in
+MULTIPART_CHUNK_SIZE = 64 * 1024
+# Memory mapped files are released from memory every time this many bytes are sent (a multiple of the page size)
+_RELEASE_SIZE = 16 * mmap.ALLOCATIONGRANULARITY
+
+
+class _FilePart(object):
+    """ The content of one file part, read in chunks only while it is being sent.
+    Regular files are memory mapped, zip members are decompressed on the fly.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._file = None
+        self._map = None
+        self._position = 0
+        self._released = 0
+
+    def size(self):
+        if isinstance(self.source, ZipMember):
+            return self.source.archive.getinfo(self.source.name).file_size
+        if hasattr(self.source, "read"):
+            return os.fstat(self.source.fileno()).st_size - self.source.tell()
+        return os.path.getsize(self.source)
+
+    def _open(self):
+        if hasattr(self.source, "read"):
+            self._file = self.source
+        else:
+            self._file = open_batch_file(self.source)
+        try:
+            if self._file.tell() == 0:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            # not a regular file (zip member, pipe) or an empty one: plain reads
+            self._map = None
+
+    def read(self, size):
+        if self._file is None:
+            self._open()
+        if self._map is not None:
+            chunk = self._map[self._position:self._position + size]
+            self._position = self._position + len(chunk)
+            self._release_sent_pages()
+            return chunk
+        return self._file.read(size)
+
+    def _release_sent_pages(self):
+        # drop the pages already sent from the resident set, so a large file does not stay mapped in memory
+        released = self._position - self._position % _RELEASE_SIZE
+        if released > self._released and hasattr(mmap, "MADV_DONTNEED"):
+            self._map.madvise(mmap.MADV_DONTNEED, self._released, released - self._released)
+            self._released = released
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MultipartEncoder(object):
+    """ A multipart/form-data body that is produced while it is sent.
+    Takes the same <data> and <files> as requests (files as (field, (filename,
+    file, content type)) where file is a path, a ZipMember or an open binary
+    file) but never holds more than <chunk_size> bytes of a file in memory,
+    whatever its size. The body length is computed upfront so the request
+    still carries a Content-Length.
+    <on_progress>, when given, is called with the number of file bytes sent
+    after every chunk. Every file is closed once sent, and all of them by
+    close(), which http_post_withphoto calls even if the request fails.
+    """
+
+    def __init__(self, data, files, chunk_size=MULTIPART_CHUNK_SIZE, on_progress=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = "multipart/form-data; boundary=%s" % self.boundary
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+
+        self._parts = []
+        for name, value in self._fields(data):
+            header = self._part_header(name)
+            self._parts.append((header + value + b"\r\n", None))
+        for name, (filename, source, content_type) in files:
+            header = self._part_header(name, os.path.basename(str(filename)), content_type)
+            self._parts.append((header, _FilePart(source)))
+        self._closing = ("--%s--\r\n" % self.boundary).encode("utf-8")
+
+        self.len = len(self._closing)
+        for header, file_part in self._parts:
+            self.len = self.len + len(header)
+            if file_part is not None:
+                self.len = self.len + file_part.size() + 2
+
+        self._chunks = self._generate()
+        self._buffer = b""
+
+    def _fields(self, data):
+        # same flattening as requests: lists and tuples become repeated fields, None values are left out
+        for name, values in (data or {}).items():
+            if isinstance(values, (str, bytes)) or not hasattr(values, "__iter__"):
+                values = [values]
+            for value in values:
+                if value is None:
+                    continue
+                if not isinstance(value, bytes):
+                    value = str(value).encode("utf-8")
+                yield name, value
+
+    def _part_header(self, name, filename=None, content_type=None):
+        header = "--%s\r\nContent-Disposition: form-data; name=\"%s\"" % (self.boundary, name)
+        if filename is not None:
+            header = header + "; filename=\"%s\"" % filename.replace("\"", "%22")
+        if content_type is not None:
+            header = header + "\r\nContent-Type: %s" % content_type
+        return (header + "\r\n\r\n").encode("utf-8")
+
+    def _generate(self):
+        for header, file_part in self._parts:
+            yield header
+            if file_part is None:
+                continue
+            try:
+                chunk = file_part.read(self.chunk_size)
+                while chunk:
+                    yield chunk
+                    if self.on_progress is not None:
+                        self.on_progress(len(chunk))
+                    chunk = file_part.read(self.chunk_size)
+            finally:
+                file_part.close()
+            yield b"\r\n"
+        yield self._closing
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        """ File-like access used by requests to stream the body. Never returns more than one chunk when <size> is not given """
+        if size is None or size < 0:
+            size = self.chunk_size
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer = self._buffer + chunk
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def close(self):
+        self._chunks.close()
+        for _, file_part in self._parts:
+            if file_part is not None:
+                file_part.close()
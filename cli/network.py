@@ -1,20 +1,89 @@
 import click
-import requests
 import hmac
 import time
 import sys
+import os
 import platform
+import threading
 from hashlib import sha256
+from urllib.parse import urlsplit
 
 from ._version import __version__
+from .cache import HTTPCache
+from .multipart import MultipartEncoder
+from . import rate_limit
 
-import pickle
-import os
-import shutil
-from datetime import datetime
+import base64
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from ._version import __version__
 
-class DidimoAuth(requests.auth.AuthBase):
+# Process-wide pooled session. Every helper below goes through it so that
+# connections (and their TLS sessions) are kept alive and reused across calls
+# instead of paying a new TCP+TLS handshake per request.
+DEFAULT_HTTP_POOL_SIZE = 10
+
+# Times a throttled request is sent again before its response is handed to the caller
+RATE_LIMIT_RETRIES = 5
+
+_session = None
+_session_lock = threading.Lock()
+_session_pool_size = DEFAULT_HTTP_POOL_SIZE
+
+
+def _create_session(pool_size):
+    # requests takes a good part of the startup time, it is only imported once a call is made
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Returns the process-wide pooled session, creating it on first use
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session(_session_pool_size)
+    return _session
+
+
+def configure_session(pool_size=None):
+    """
+    Sets the number of connections kept alive per host. An already created
+    session is replaced so the new size takes effect on the next call.
+    """
+    global _session, _session_pool_size
+    if pool_size is None or int(pool_size) == _session_pool_size:
+        return
+    with _session_lock:
+        _session_pool_size = max(1, int(pool_size))
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _reset_session_after_fork():
+    # Sockets inherited from the parent must not be shared with a forked child
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_session_after_fork)
+
+
+class DidimoAuth(object):
+    """ requests authentication hook adding the API key and client headers to every request """
+
     def __init__(self, config, path):
         self.config = config
         self.path = path
@@ -32,7 +101,7 @@ class DidimoAuth(requests.auth.AuthBase):
 
 def http_get(url, **kwargs):
     try:
-        r = requests.get(url, **kwargs)
+        r = http_request("GET", url, **kwargs)
         if r.status_code == 200:
             return r
         else:
@@ -45,7 +114,7 @@ def http_get(url, **kwargs):
 
 def http_get_no_error(url, **kwargs):
     try:
-        r = requests.get(url, **kwargs)
+        r = http_request("GET", url, **kwargs)
         return r
     except:
         click.echo("A Network Error Has Occured")
@@ -53,7 +122,7 @@ def http_get_no_error(url, **kwargs):
 
 def http_delete(url, **kwargs):
     try:
-        r = requests.delete(url, **kwargs)
+        r = http_request("DELETE", url, **kwargs)
         if r.status_code == 204:
             return r
         else:
@@ -66,7 +135,7 @@ def http_delete(url, **kwargs):
         sys.exit(1)
 
 def http_put(url, **kwargs):
-    r = requests.put(url, **kwargs)
+    r = http_request("PUT", url, **kwargs)
     if r.status_code == 200:
         return r
     else:
@@ -75,7 +144,7 @@ def http_put(url, **kwargs):
         return r
 
 def http_post(url, **kwargs):
-    r = requests.post(url, **kwargs)
+    r = http_request("POST", url, **kwargs)
     if r.status_code == 200:
         return r
     else:
@@ -84,7 +153,7 @@ def http_post(url, **kwargs):
         sys.exit(1)
 
 def http_post_no_break(url, **kwargs): 
-    r = requests.post(url, **kwargs)
+    r = http_request("POST", url, **kwargs)
     if r.status_code == 200 or r.status_code == 201:
         return r
     else:
@@ -92,17 +161,21 @@ def http_post_no_break(url, **kwargs):
         click.echo(r.text)
         return r
 
-def http_post_withphoto(url, access_key, payload, photo, photo_depth, photos_archive = None, check_status_code = True):
+def http_post_withphoto(url, access_key, payload, photo, photo_depth, photos_archive = None, check_status_code = True, on_progress = None):
+    """
+    Posts <payload> with the photo, depth or archive files as a multipart request. The files are streamed
+    in chunks (see MultipartEncoder) and <on_progress> is called with the number of file bytes sent
+    """
 
     if photos_archive != None:
-        files = [('photos', (photos_archive, open(photos_archive, 'rb'), 'image/jpeg'))]
+        files = [('photos', (photos_archive, photos_archive, 'image/jpeg'))]
     elif photo_depth != None:
         files = [
-            ('photo', (photo, open(photo, 'rb'), 'image/jpeg')),
-            ('depth', (photo_depth, open(photo_depth, 'rb'), 'image/png'))
+            ('photo', (str(photo), photo, 'image/jpeg')),
+            ('depth', (photo_depth, photo_depth, 'image/png'))
         ]
     else:
-        files = [('photo', (photo, open(photo, 'rb'), 'image/jpeg'))]
+        files = [('photo', (str(photo), photo, 'image/jpeg'))]
 
     headers = {
         'DIDIMO-API-KEY': access_key,
@@ -113,8 +186,20 @@ def http_post_withphoto(url, access_key, payload, photo, photo_depth, photos_arc
                                                               platform.system())
     }
 
-    r = requests.request("POST", url, headers=headers,
-                         data=payload, files=files)
+    # the body is streamed and cannot be sent twice, a throttled upload is sent again with a new one
+    attempt = 0
+    while True:
+        body = MultipartEncoder(payload, files, on_progress=on_progress)
+        headers['Content-Type'] = body.content_type
+        try:
+            r = http_request("POST", url, endpoint_class="upload", headers=headers, data=body)
+        finally:
+            body.close()
+        if not is_throttled(r) or attempt >= RATE_LIMIT_RETRIES:
+            break
+        # gives the connection back to the pool
+        r.close()
+        attempt = attempt + 1
 
     if check_status_code:
         if r.status_code == 200 or r.status_code == 201:
@@ -142,8 +227,7 @@ def http_request_json(url, method, access_key, payload, check_status_code = True
     if method != "POST" and method != "PUT" and method != "PATCH":
         raise Exception("unknown method")
 
-    r = requests.request(method, url, headers=headers,
-                         data=payload)
+    r = http_request(method, url, headers=headers, data=payload)
 
     if check_status_code:
         if r.status_code == 200 or r.status_code == 201:
@@ -156,56 +240,164 @@ def http_request_json(url, method, access_key, payload, check_status_code = True
     else:
         return r
 
-#cache calls in the same day, and only if the call returns a 200 http status
-def cache_this_call(url, access_key, **kwargs):
-    curr_date = datetime.today().strftime('%Y-%m-%d')
+def is_throttled(response):
+    """
+    Whether the API refused <response> to slow the client down: a 429, or a 503 with Retry-After
+    """
+    return response.status_code == 429 or (response.status_code == 503 and "Retry-After" in response.headers)
+
+def http_request(method, url, endpoint_class=None, retries=RATE_LIMIT_RETRIES, deadline=None, **kwargs):
+    """
+    Sends a request through the pooled session, within the budget of its endpoint class (see rate_limit.RateLimiter,
+    the class is told from the request when <endpoint_class> is None). A throttled request slows its class down and is
+    sent again, after the Retry-After delay, up to <retries> times unless its body is a stream that was already read
+    (the file objects of <files> are rewound, the request is not sent again when one cannot be).
+    The last response is returned either way.
+    With a <deadline> (a time.monotonic() value), nothing waits past it: the throttled response is returned when it
+    could only be sent again later, and requests.exceptions.Timeout is raised when the request could not be sent at all
+    """
+    if endpoint_class is None:
+        endpoint_class = rate_limit.endpoint_class(method, url, kwargs.get("files"))
+    bucket = rate_limit.get_rate_limiter().bucket(endpoint_class)
+    file_positions = stream_positions(kwargs.get("files"))
+    attempt = 0
+    throttled_response = None
+    while True:
+        if not bucket.acquire(deadline):
+            if throttled_response is not None:
+                return throttled_response
+            import requests
+            raise requests.exceptions.Timeout("The request could not be sent before its deadline")
+        if throttled_response is not None:
+            # gives the connection back to the pool
+            throttled_response.close()
+            for stream, position in file_positions:
+                stream.seek(position)
+        r = get_session().request(method, url, **kwargs)
+        if not is_throttled(r):
+            bucket.succeeded()
+            return r
+        bucket.throttled(retry_after_seconds(r))
+        if attempt >= retries or hasattr(kwargs.get("data"), "read") or file_positions is None:
+            return r
+        throttled_response = r
+        attempt = attempt + 1
+
+def stream_positions(files):
+    """
+    The file objects in <files> (as passed to requests) with their current position, to send them again from there.
+    None when one of them cannot be rewound
+    """
+    if not files:
+        return []
+    values = files.values() if isinstance(files, dict) else [value for _, value in files]
+    positions = []
+    for value in values:
+        stream = value[1] if isinstance(value, (tuple, list)) else value
+        if not hasattr(stream, "read"):
+            continue
+        try:
+            if not stream.seekable():
+                return None
+            positions.append((stream, stream.tell()))
+        except (AttributeError, OSError, ValueError):
+            return None
+    return positions
 
-    root_temp_dir_path = "temp/"
-    root_cache_dir_path = root_temp_dir_path+"simple_cache/"
+def retry_after_seconds(response):
+    """
+    Delay requested by the Retry-After header of <response> in seconds, None when there is none
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
     try:
-        directories = [(f.name, f.path)  for f in os.scandir(root_cache_dir_path) if f.is_dir()]
-        for (directory_name,directory_path) in directories:
-            if not directory_name == curr_date:
-                #print("deleting "+directory_name + " at "+directory_path)
-                shutil.rmtree(directory_path)
-    except OSError as e:
-        #print("Error: %s : %s" % (root_cache_dir_path, e.strerror))
+        return max(0.0, float(value))
+    except ValueError:
         pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
-    try: 
-        os.mkdir(root_temp_dir_path)
-    except OSError as error: 
-        pass
+# Seconds a cached GET is used without contacting the API, by path prefix. Once expired, the response is revalidated
+# with If-None-Match/If-Modified-Since. Paths not listed here are always revalidated.
+HTTP_CACHE_TTLS = [
+    ("/v3/platforms/cli", 24 * 3600),
+    ("/v3/accounts/default/applications", 3600),
+    ("/v3/accounts/default/status?ui=cli", 900),
+]
 
-    try: 
-        os.mkdir(root_cache_dir_path)
-    except OSError as error: 
-        pass
 
-    try: 
-        os.mkdir(root_cache_dir_path+curr_date)
-    except OSError as error: 
-        pass
+def http_cache_ttl(url):
+    parts = urlsplit(url)
+    path = parts.path + "?" + parts.query if parts.query else parts.path
+    for prefix, ttl in HTTP_CACHE_TTLS:
+        if path.startswith(prefix):
+            return ttl
+    return 0
 
-    filename = root_cache_dir_path+curr_date+"/"+str(sha256((url+"/"+access_key).encode('utf-8')).hexdigest()) 
 
-    if not os.path.exists(filename):
-        #print("no cache")
-        data = http_get(url, **kwargs)
-        if data.status_code == 200:
-            with open(filename, 'wb') as f:
-                pickle.dump(data, f)
-    else:
-        #print("fetching from cache")
-        with open(filename, 'rb') as f:
-            data = pickle.load(f)
-    return data
+def _cached_response(url, entry):
+    import requests
 
+    r = requests.models.Response()
+    r.url = url
+    r.status_code = entry["status_code"]
+    r.reason = entry.get("reason")
+    r.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    r._content = base64.b64decode(entry["body"])
+    return r
+
+
+#cache successful GETs in the user cache dir (see HTTPCache), only if the call returns a 200 http status
+def cache_this_call(url, access_key, ttl=None, **kwargs):
+    """
+    GET <url> through the HTTP cache. Fresh entries (younger than <ttl> seconds, by default from HTTP_CACHE_TTLS) are
+    returned without any request, stale ones are revalidated with their ETag or Last-Modified date
+    """
+    if ttl is None:
+        ttl = http_cache_ttl(url)
+    cache = HTTPCache()
+    key = sha256((url+"/"+access_key).encode('utf-8')).hexdigest()
+    entry = cache.load(key)
+
+    if entry is not None and time.time() - entry["stored_at"] < ttl:
+        return _cached_response(url, entry)
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
 
-def clear_network_cache():
-    root_cache_dir_path = "temp/simple_cache/"
     try:
-        shutil.rmtree(root_cache_dir_path)
-    except OSError as e:
-        print("Error: %s : %s" % (root_cache_dir_path, e.strerror))
+        r = http_request("GET", url, headers=headers, **kwargs)
+    except:
+        click.echo("A Network Error Has Occured")
+        sys.exit(1)
+
+    if r.status_code == 304 and entry is not None:
+        entry["stored_at"] = time.time()
+        cache.store(key, entry)
+        return _cached_response(url, entry)
+    if r.status_code == 200:
+        cache.store(key, {
+                            "status_code": r.status_code,
+                            "reason": r.reason,
+                            "headers": dict(r.headers),
+                            "body": base64.b64encode(r.content).decode('ascii'),
+                            "etag": r.headers.get("ETag"),
+                            "last_modified": r.headers.get("Last-Modified"),
+                            "stored_at": time.time()
+                         })
+    else:
+        click.secho('Error %d' % r.status_code, err=True, fg='red')
+        click.echo(r.text)
+    return r
 
+
+def clear_network_cache():
+    HTTPCache().clear()
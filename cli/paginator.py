@@ -0,0 +1,99 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .network import DidimoAuth, http_get
+
+# Pages requested ahead of the one being shown
+DEFAULT_PREFETCH_PAGES = 4
+
+
+def next_page_url(json_response):
+    """
+    URL of the page after <json_response>, None on the last page
+    """
+    if '__links' in json_response and 'next' in json_response['__links']:
+        return json_response['__links']['next']
+    return None
+
+
+def numbered_page_url(url, page):
+    """
+    <url> asking for page number <page>, None when <url> does not carry a page number
+    """
+    if re.search(r"[?&]page=\d+", url) is None:
+        return None
+    return re.sub(r"([?&])page=\d+", r"\g<1>page=%d" % page, url)
+
+
+class Paginator(object):
+    """ Walks the pages of a list endpoint of the API, starting from a page
+    already fetched by the caller (<first_page>, its decoded response, and
+    <items_key>, the key of the list of items in every page).
+    pages() yields the decoded pages in order while up to <prefetch> of the
+    following ones are requested in the background, so the next page is
+    usually there by the time the current one has been shown (or the user has
+    confirmed to go on). When the pages are numbered (?page= in their links)
+    and the first page tells the number of items ("total_size"), all the
+    remaining pages are known upfront and requested <prefetch> at a time;
+    otherwise the __links.next of each page is followed, one page ahead.
+    A page that cannot be fetched ends the command, as the error was already
+    printed by http_get.
+    """
+
+    def __init__(self, config, first_page, items_key, prefetch=DEFAULT_PREFETCH_PAGES):
+        self.config = config
+        self.first_page = first_page
+        self.items_key = items_key
+        self.prefetch = max(1, int(prefetch))
+
+    def _fetch(self, url):
+        r = http_get(url, auth=DidimoAuth(self.config, url))
+        if r.status_code != 200:
+            sys.exit(1)
+        return r.json()
+
+    def _numbered_urls(self):
+        # the URLs of all the pages after the first one, None when they cannot be told upfront
+        next_url = next_page_url(self.first_page)
+        total_size = self.first_page.get('total_size')
+        if next_url is None or total_size is None:
+            return None
+        next_page = re.search(r"[?&]page=(\d+)", next_url)
+        page_size = re.search(r"[?&]page_size=(\d+)", next_url)
+        page_size = int(page_size.group(1)) if page_size is not None else len(self.first_page.get(self.items_key, []))
+        if next_page is None or page_size == 0:
+            return None
+        last_page = (int(total_size) + page_size - 1) // page_size
+        return [numbered_page_url(next_url, page) for page in range(int(next_page.group(1)), last_page + 1)]
+
+    def pages(self):
+        yield self.first_page
+
+        executor = ThreadPoolExecutor(max_workers=self.prefetch)
+        pending = []
+        try:
+            last_page = self.first_page
+            urls = self._numbered_urls() or []
+            urls.reverse()
+            while urls or pending:
+                while urls and len(pending) < self.prefetch:
+                    pending.append(executor.submit(self._fetch, urls.pop()))
+                last_page = pending.pop(0).result()
+                yield last_page
+
+            # without page numbers, or past them when items were added while paging, the links are followed
+            next_url = next_page_url(last_page)
+            if next_url is not None:
+                pending.append(executor.submit(self._fetch, next_url))
+            while pending:
+                page = pending.pop(0).result()
+                next_url = next_page_url(page)
+                if next_url is not None:
+                    # the next page is fetched while this one is shown
+                    pending.append(executor.submit(self._fetch, next_url))
+                yield page
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
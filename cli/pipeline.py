@@ -0,0 +1,207 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .polling import StatusPoller, LIST_POLL_MIN_KEYS, LIST_POLL_MIN_PAGE_KEYS
+
+# Marks the end of the items flowing into a stage
+_END = object()
+
+
+class BatchPipeline(object):
+    """ Streams the files of a batch through three concurrent stages:
+    upload -> status polling -> download.
+    A file moves on to polling as soon as its upload returns a didimo key, and
+    to the download stage as soon as the didimo is done, so no stage waits for
+    the previous one to finish the whole batch. The stages are connected by
+    bounded queues and each one has its own concurrency limit.
+
+    <upload> is called with an input file and returns the dict produced by
+    new_aux_shared_upload_core. Finished didimos are handed to
+    <download_pool>, a DownloadPool, with at most <download_concurrency> of
+    them in flight; when it is None the pipeline stops after the polling stage.
+    <resume>, when given, is called with each input file and returns None to
+    process it from scratch, or (stage, results) to pick it up after <stage>,
+    results holding the already known result of each completed stage (see
+    BatchJournal.lookup). Those results are replayed through on_event.
+    <poll_mode> is one of polling.POLL_MODES: the status of the didimos due
+    for a check is requested one by one ("key"), or read from the pages of
+    the didimo list ("list", or "auto" when enough of them are due at once).
+    All the results are handed back to the calling thread through on_event,
+    called as on_event(stage, index, result, finished) where stage is "upload",
+    "processing" or "download", index is the position of the file in the
+    batch and finished tells whether that file went through its last stage.
+    """
+
+    def __init__(self, config, upload, download_pool=None, upload_concurrency=1, poll_concurrency=1, download_concurrency=1, resume=None, poll_mode="key"):
+        self.config = config
+        self.upload = upload
+        self.resume = resume
+        self.poll_mode = poll_mode
+        self.download_pool = download_pool
+        self.upload_concurrency = max(1, int(upload_concurrency))
+        self.poll_concurrency = max(1, int(poll_concurrency))
+        self.download_concurrency = max(1, int(download_concurrency))
+
+        self._upload_queue = queue.Queue(maxsize=self.upload_concurrency * 2)
+        self._poll_queue = queue.Queue(maxsize=self.poll_concurrency * 16)
+        self._download_slots = threading.Semaphore(self.download_concurrency)
+        self._events = queue.Queue()
+        self._stop = threading.Event()
+
+    def _run_stage(self, target, *args):
+        try:
+            target(*args)
+        except BaseException:
+            self._events.put(("failure", sys.exc_info()))
+
+    def _start(self, target, *args):
+        thread = threading.Thread(target=self._run_stage, args=(target,) + args)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _put(self, stage_queue, item):
+        # blocks while the next stage is saturated, unless the pipeline is stopping
+        while not self._stop.is_set():
+            try:
+                stage_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def _feed(self, batch_files):
+        count = 0
+        for idx, input_file in enumerate(batch_files):
+            if self._stop.is_set():
+                return
+            count = count + 1
+            resumed = self.resume(input_file) if self.resume is not None else None
+            if resumed is None:
+                self._put(self._upload_queue, (idx, input_file))
+            else:
+                self._resume(idx, *resumed)
+        for _ in range(self.upload_concurrency):
+            self._put(self._upload_queue, _END)
+        self._events.put(("input", count))
+
+    def _resume(self, idx, stage, results):
+        upload_result = results["upload"]
+        if stage == "upload":
+            self._events.put(("upload", idx, upload_result, False))
+            self._put(self._poll_queue, (idx, upload_result['didimo_id']))
+            return
+
+        processing_result = results["processing"]
+        moves_on = stage == "processing" and processing_result["error"] == 0 and self.download_pool is not None
+        self._events.put(("upload", idx, upload_result, False))
+        self._events.put(("processing", idx, processing_result, not moves_on and stage == "processing"))
+        if stage == "download":
+            self._events.put(("download", idx, results["download"], True))
+        elif moves_on:
+            self._download(idx, upload_result['didimo_id'])
+
+    def _upload_worker(self):
+        while not self._stop.is_set():
+            item = self._upload_queue.get()
+            if item is _END:
+                self._put(self._poll_queue, _END)
+                return
+            idx, input_file = item
+            result = self.upload(input_file)
+            # the events are handled in order, so the upload is recorded before any later stage of the file
+            self._events.put(("upload", idx, result, result['error'] == 1))
+            if result['error'] == 0:
+                self._put(self._poll_queue, (idx, result['didimo_id']))
+
+    def _poll_stage(self):
+        poller = StatusPoller(self.config)
+        indexes = {}
+        running_uploaders = self.upload_concurrency
+        with ThreadPoolExecutor(max_workers=self.poll_concurrency) as executor:
+            while not self._stop.is_set():
+                if running_uploaders == 0 and len(poller) == 0:
+                    break
+
+                # pick up keys from the upload stage, waiting at most until the next key is due
+                timeout = poller.seconds_until_due()
+                if running_uploaders == 0:
+                    item = None
+                else:
+                    try:
+                        item = self._poll_queue.get(timeout=0.5 if timeout is None else min(timeout, 0.5))
+                    except queue.Empty:
+                        item = None
+                while item is not None:
+                    if item is _END:
+                        running_uploaders = running_uploaders - 1
+                    else:
+                        idx, didimo_id = item
+                        indexes[didimo_id] = idx
+                        poller.add(didimo_id, delay=1)
+                    try:
+                        item = self._poll_queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+
+                if self.poll_mode == "key":
+                    due_ids = poller.pop_due(self.poll_concurrency)
+                else:
+                    due_ids = poller.pop_due(len(poller))
+                if not due_ids:
+                    if running_uploaders == 0:
+                        self._stop.wait(poller.seconds_until_due() or 0)
+                    continue
+
+                if self.poll_mode == "key":
+                    responses = executor.map(poller.fetch, due_ids)
+                else:
+                    min_keys = LIST_POLL_MIN_PAGE_KEYS if self.poll_mode == "list" else LIST_POLL_MIN_KEYS
+                    responses = poller.fetch_many(due_ids, executor.map, min_keys)
+                for didimo_id, response in zip(due_ids, responses):
+                    result = poller.update(didimo_id, response)
+                    if result is None:
+                        continue
+                    idx = indexes.pop(didimo_id)
+                    moves_on = result["error"] == 0 and self.download_pool is not None
+                    self._events.put(("processing", idx, result, not moves_on))
+                    if moves_on:
+                        self._download(idx, didimo_id)
+
+    def _download(self, idx, didimo_id):
+        # blocks while <download_concurrency> downloads are in flight, unless the pipeline is stopping
+        while not self._download_slots.acquire(timeout=0.5):
+            if self._stop.is_set():
+                return
+
+        def on_done(future):
+            self._download_slots.release()
+            self._events.put(("download", idx, future.result(), True))
+
+        self.download_pool.submit(didimo_id).add_done_callback(on_done)
+
+    def run(self, batch_files, on_event):
+        """ Pushes every file of <batch_files> through the stages and returns once all of them are finished """
+        self._start(self._feed, batch_files)
+        for _ in range(self.upload_concurrency):
+            self._start(self._upload_worker)
+        self._start(self._poll_stage)
+
+        input_count = None
+        finished_count = 0
+        try:
+            while input_count is None or finished_count < input_count:
+                event = self._events.get()
+                if event[0] == "failure":
+                    exc_type, exc_value, exc_traceback = event[1]
+                    raise exc_value.with_traceback(exc_traceback)
+                if event[0] == "input":
+                    input_count = event[1]
+                    continue
+
+                on_event(*event)
+                if event[3]:
+                    finished_count = finished_count + 1
+        finally:
+            self._stop.set()
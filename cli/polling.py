@@ -0,0 +1,238 @@
+import heapq
+import time
+
+from .cache import DidimoCache, is_didimo_document, TERMINAL_STATUSES
+from .helpers import DidimoNotFoundException, DidimoThrottledException, get_didimo_status
+from .status_store import shared_status_store
+from .network import DidimoAuth, http_get_no_error
+
+# Bounds for the delay between two status requests for the same didimo
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 15.0
+FIRST_POLL_INTERVAL = 2.0
+
+# A didimo is reported as a processing error once its status could not be requested (network error, or an error
+# response such as a 5xx or 401) MAX_POLL_FAILURES times in a row, or when it is not finished after POLL_TIMEOUT seconds
+MAX_POLL_FAILURES = 10
+POLL_TIMEOUT = 3600.0
+
+# Status polling modes: "key" requests each didimo, "list" reads a page of the didimo list once at least
+# LIST_POLL_MIN_PAGE_KEYS due didimos are expected on it, "auto" once at least LIST_POLL_MIN_KEYS are
+POLL_MODES = ["auto", "key", "list"]
+LIST_POLL_MIN_PAGE_KEYS = 2
+LIST_POLL_MIN_KEYS = 20
+# Didimos per page of the didimo list
+LIST_POLL_PAGE_SIZE = 100
+
+
+class ThrottledStatus(object):
+    """ Returned by StatusPoller.fetch in place of a status when the API throttled the request, which is sent again
+    after <retry_after> seconds (None when the API did not tell) """
+
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after
+
+
+class StatusPoller(object):
+    """ Schedules the status requests of many didimos from a single loop.
+    Every tracked key has its own due time. After each request the next one is
+    scheduled from the progress rate reported through "percent": didimos that
+    are about to finish are checked often, didimos that are not moving are
+    checked less and less. A didimo whose status cannot be requested
+    <max_failures> times in a row, or that is not finished <timeout> seconds
+    after it was added, is given up on as an error.
+    fetch() and fetch_page() only do the network request and can run on worker
+    threads; fetch_many() and the scheduling methods (add, pop_due, update)
+    must be called from one thread.
+    """
+
+    def __init__(self, config, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL, page_size=LIST_POLL_PAGE_SIZE,
+                 max_failures=MAX_POLL_FAILURES, timeout=POLL_TIMEOUT):
+        self.config = config
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.page_size = page_size
+        self.max_failures = max_failures
+        self.timeout = timeout
+        self._schedule = []
+        self._sequence = 0
+        self._progress = {}
+        self._added = 0
+        self._positions = {}
+        self._failures = {}
+        self._deadlines = {}
+        self._didimo_cache = DidimoCache(config)
+        self._status_store = shared_status_store(config)
+
+    def __len__(self):
+        return len(self._progress)
+
+    def add(self, didimo_id, delay=0):
+        """ Start tracking <didimo_id>, first checked after <delay> seconds """
+        if didimo_id in self._progress:
+            return
+        now = time.monotonic()
+        # (first seen at, first percent, last percent, last interval)
+        self._progress[didimo_id] = (now, None, 0, FIRST_POLL_INTERVAL)
+        self._deadlines[didimo_id] = now + delay + self.timeout
+        # the list is newest first: a didimo is added at its top, see list_page
+        self._added = self._added + 1
+        self._positions[didimo_id] = (0, self._added)
+        self._push(now + delay, didimo_id)
+
+    def _push(self, due, didimo_id):
+        self._sequence = self._sequence + 1
+        heapq.heappush(self._schedule, (due, self._sequence, didimo_id))
+
+    def seconds_until_due(self):
+        """ Time until the next key is due, None when nothing is tracked """
+        if not self._schedule:
+            return None
+        return max(0, self._schedule[0][0] - time.monotonic())
+
+    def pop_due(self, limit, horizon=0):
+        """ Removes and returns up to <limit> keys whose status should be requested now, or within <horizon> seconds """
+        now = time.monotonic() + horizon
+        due_ids = []
+        while self._schedule and len(due_ids) < limit and self._schedule[0][0] <= now:
+            due_ids.append(heapq.heappop(self._schedule)[2])
+        return due_ids
+
+    def next_interval(self, didimo_id, percent):
+        """ Delay until the next status request, based on the progress rate """
+        now = time.monotonic()
+        first_seen, first_percent, last_percent, last_interval = self._progress[didimo_id]
+        if first_percent is None:
+            first_seen, first_percent = now, percent
+
+        if percent > first_percent and now > first_seen:
+            rate = (percent - first_percent) / (now - first_seen)
+            interval = (100 - percent) / rate / 2
+        elif percent > last_percent:
+            interval = FIRST_POLL_INTERVAL
+        else:
+            interval = last_interval * 1.5
+        interval = min(self.max_interval, max(self.min_interval, interval))
+
+        self._progress[didimo_id] = (first_seen, first_percent, percent, interval)
+        return interval
+
+    def fetch(self, didimo_id):
+        """ Requests the status of <didimo_id>. Returns None if the request failed and should be retried, a
+        ThrottledStatus when the API throttled it """
+        try:
+            # a throttled request is not sent again here, update() schedules the next one
+            return get_didimo_status(self.config, didimo_id, retries=0)
+        except DidimoThrottledException as e:
+            return ThrottledStatus(e.retry_after)
+        except DidimoNotFoundException:
+            return {
+                    "status": "error",
+                    "percent": None,
+                    "status_message": "No didimo with the requested key was found on this account."
+                   }
+        except (Exception, SystemExit):
+            return None
+
+    def fetch_page(self, page):
+        """ Requests a page of the didimo list, newest first. Returns None if the request failed """
+        api_path = "/v3/didimos"
+        url = "%s%s?page=%d&page_size=%d&order_by=-created_at" % (self.config.api_host, api_path, page, self.page_size)
+        try:
+            r = http_get_no_error(url, retries=0, auth=DidimoAuth(self.config, api_path))
+            if r.status_code != 200:
+                return None
+            didimos = r.json()['didimos']
+            if self._status_store is not None:
+                # other CLI processes polling these didimos use them as well. Only the finished ones: the others are
+                # out of date by the time the keys of the page that were not due are polled
+                self._status_store.share([didimo for didimo in didimos if didimo.get('status') in TERMINAL_STATUSES])
+            return didimos
+        except (Exception, SystemExit):
+            return None
+
+    def list_page(self, didimo_id):
+        """ The page of the didimo list expected to hold <didimo_id>, None when it is not known. The didimo is pushed
+        down the list by every didimo added after it was last seen there. A didimo missing from the page it was
+        expected on (pushed further by the didimos of other clients, or created before this poller) is not looked
+        for in the list anymore """
+        position = self._positions.get(didimo_id)
+        if position is None:
+            return None
+        index, added = position
+        return (index + self._added - added) // self.page_size + 1
+
+    def fetch_many(self, didimo_ids, map_function=map, min_keys=LIST_POLL_MIN_PAGE_KEYS):
+        """ Requests the status of <didimo_ids>: the pages of the didimo list on which at least <min_keys> of them are
+        expected are read, so that a page always replaces several requests, and the didimos that are not on those
+        pages are requested one by one. <map_function> runs the requests (e.g. the map of an executor).
+        Returns the responses in the order of <didimo_ids> """
+        keys_by_page = {}
+        for didimo_id in didimo_ids:
+            keys_by_page.setdefault(self.list_page(didimo_id), []).append(didimo_id)
+        pages = sorted(page for page, keys in keys_by_page.items() if page is not None and len(keys) >= max(2, min_keys))
+
+        missing = set(didimo_ids)
+        responses = {}
+        for page, page_items in zip(pages, map_function(self.fetch_page, pages)):
+            if page_items is None:
+                continue # failed, the per-didimo requests cover it
+            for index, item in enumerate(page_items):
+                if item.get('key') in missing:
+                    missing.discard(item['key'])
+                    responses[item['key']] = item
+                    self._positions[item['key']] = ((page - 1) * self.page_size + index, self._added)
+                    if is_didimo_document(item):
+                        # spares the request of download_didimo once the didimo is done
+                        self._didimo_cache.store(item['key'], item)
+            for didimo_id in keys_by_page[page]:
+                if didimo_id in missing:
+                    self._positions[didimo_id] = None
+
+        missing = [didimo_id for didimo_id in didimo_ids if didimo_id in missing]
+        for didimo_id, response in zip(missing, map_function(self.fetch, missing)):
+            responses[didimo_id] = response
+        return [responses[didimo_id] for didimo_id in didimo_ids]
+
+    def update(self, didimo_id, response):
+        """ Applies a fetched status. Returns a result dict once the didimo is finished or given up on, None otherwise """
+        percent = self._progress[didimo_id][2]
+        delay = None
+        if isinstance(response, ThrottledStatus):
+            # not a failure, the API asks to slow down: the didimo is checked again once the delay is over
+            delay = response.retry_after if response.retry_after is not None else self._progress[didimo_id][3]
+            delay = max(self.min_interval, delay)
+        elif response is None or 'status' not in response:
+            # the request failed, or the API answered with an error instead of a status
+            failures = self._failures.get(didimo_id, 0) + 1
+            self._failures[didimo_id] = failures
+            if failures >= self.max_failures:
+                return self._finish(didimo_id, 1, percent,
+                                    "The status of the didimo could not be requested %d times in a row" % failures)
+        else:
+            self._failures.pop(didimo_id, None)
+            percent = response.get('percent', 100)
+            status_msg = response.get('status_message', "")
+            if response.get('status') in ('done', 'error') or status_msg != "":
+                return self._finish(didimo_id, 0 if response.get('status') == 'done' else 1, percent, status_msg)
+
+        if time.monotonic() >= self._deadlines[didimo_id]:
+            return self._finish(didimo_id, 1, percent, "The didimo was not finished after %d seconds" % self.timeout)
+
+        if delay is None:
+            delay = self.next_interval(didimo_id, percent)
+        self._push(time.monotonic() + delay, didimo_id)
+        return None
+
+    def _finish(self, didimo_id, error, percent, message):
+        # stops tracking <didimo_id> and returns its result
+        del self._progress[didimo_id]
+        self._positions.pop(didimo_id, None)
+        self._failures.pop(didimo_id, None)
+        del self._deadlines[didimo_id]
+        return {
+                "error": error,
+                "didimo_key":didimo_id,
+                "percent": percent,
+                "message":message
+               }
@@ -0,0 +1,134 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Classes of endpoints with a request budget of their own
+ENDPOINT_CLASSES = ("upload", "status", "download", "other")
+
+# Requests per second of each class while the API does not throttle, see "rate_limits" in the configuration
+DEFAULT_RATE_LIMITS = {"upload": 20.0, "status": 50.0, "download": 50.0, "other": 20.0}
+
+# On a throttled response the rate of its class is multiplied by RATE_DECREASE, at most once per
+# RATE_DECREASE_INTERVAL seconds and never below MIN_RATE; every request that goes through adds
+# RATE_RECOVERY_STEP of the configured rate back
+RATE_DECREASE = 0.5
+RATE_DECREASE_INTERVAL = 1.0
+MIN_RATE = 0.2
+RATE_RECOVERY_STEP = 0.05
+
+# Paths whose GETs are status polls
+STATUS_PATH_PREFIXES = ("/v3/didimos", "/v3/assets", "/v3/bulks")
+
+
+def endpoint_class(method, url, files=None):
+    """
+    The class of a request, deciding which budget it takes from. Downloads of packages are told by the caller
+    """
+    if files is not None:
+        return "upload"
+    if method == "GET" and urlsplit(url).path.startswith(STATUS_PATH_PREFIXES):
+        return "status"
+    return "other"
+
+
+class TokenBucket(object):
+    """ Lets requests through at <rate> per second on average, in bursts of up
+    to a second worth of them. acquire() blocks until the caller may send its
+    request: tokens are reserved in order, so concurrent callers are spread
+    over time instead of waking up together.
+    The rate adapts to the API: throttled() halves it (once per
+    RATE_DECREASE_INTERVAL, as a burst of throttled requests is one signal) and
+    holds every request until the Retry-After delay is over, and succeeded()
+    brings it back to <max_rate> a step at a time.
+    """
+
+    def __init__(self, max_rate):
+        self.max_rate = max(MIN_RATE, float(max_rate))
+        self.rate = self.max_rate
+        self._tokens = self.rate
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._decreased_at = None
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        since = max(self._updated, self._paused_until)
+        if now > since:
+            self._tokens = min(max(1.0, self.rate), self._tokens + (now - since) * self.rate)
+        self._updated = max(self._updated, now)
+
+    def acquire(self, deadline=None):
+        """ Waits for a token. Gives up and returns False, without waiting past it, when the request could only be
+        sent after <deadline> (a time.monotonic() value); returns True otherwise """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            due = max(now, self._paused_until)
+            if self._tokens < 1:
+                due = due + (1 - self._tokens) / self.rate
+            if deadline is not None and due > deadline:
+                return False
+            self._tokens = self._tokens - 1
+        while True:
+            time.sleep(max(0.0, due - time.monotonic()))
+            with self._lock:
+                # the API may have asked to wait longer meanwhile
+                if self._paused_until <= time.monotonic():
+                    return True
+                due = self._paused_until
+                if deadline is not None and due > deadline:
+                    # the token is given back to the requests that can still wait
+                    self._tokens = min(max(1.0, self.rate), self._tokens + 1)
+                    return False
+
+    def throttled(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._decreased_at is None or now - self._decreased_at >= RATE_DECREASE_INTERVAL:
+                self.rate = max(MIN_RATE, self.rate * RATE_DECREASE)
+                self._decreased_at = now
+            self._tokens = min(self._tokens, 0.0)
+            delay = retry_after if retry_after is not None else 1.0 / self.rate
+            self._paused_until = max(self._paused_until, now + delay)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_RECOVERY_STEP)
+
+
+class RateLimiter(object):
+    """ One TokenBucket per endpoint class, with the rates of <rate_limits> (requests per second by class) """
+
+    def __init__(self, rate_limits=None):
+        rates = dict(DEFAULT_RATE_LIMITS)
+        rates.update(rate_limits or {})
+        self.buckets = dict((name, TokenBucket(rates.get(name, DEFAULT_RATE_LIMITS["other"]))) for name in ENDPOINT_CLASSES)
+
+    def bucket(self, name):
+        return self.buckets.get(name, self.buckets["other"])
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Returns the process-wide rate limiter, creating it with the default rates on first use
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+def configure_rate_limits(rate_limits=None):
+    """
+    Sets the requests per second of the endpoint classes named in <rate_limits>, the others keep their default rate
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(rate_limits)
@@ -7,26 +7,24 @@ import zipfile
 import os
 import fnmatch
 import re
-import shutil
-import multiprocessing
-from multiprocessing import current_process 
-from multiprocessing import Process
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 
-from .shared_queue import MyQueue, SharedCounter
 from .helpers import DidimoNotFoundException, wait_for_dgp_completion, download_asset, download_didimo, get_didimo_status, get_asset_status, get_output_display_type_json_flag
-from .network import DidimoAuth, http_post_withphoto, http_get_no_error, http_get, http_delete#, http_post, http_post_no_break, http_put, cache_this_call, clear_network_cache
-from .utils import print_didimo_generation_template_header, print_didimo_generation_template_row, print_bulk_requests_header, print_bulk_requests_row, print_bulk_request_item_header, print_bulk_request_item_row
-
-def new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag):
+from .network import DidimoAuth, configure_session, http_post_withphoto, http_get_no_error, http_get, http_delete#, http_post, http_post_no_break, http_put, cache_this_call, clear_network_cache
+from .pipeline import BatchPipeline
+from .batch_files import BatchFiles
+from .journal import open_batch_journal
+from .download_pool import DownloadPool
+from .paginator import Paginator, DEFAULT_PREFETCH_PAGES, next_page_url
+from .utils import RunningCountLine, print_didimo_generation_template_header, print_didimo_generation_template_row, print_bulk_requests_header, print_bulk_requests_row, print_bulk_request_item_header, print_bulk_request_item_row
+
+def new_aux_shared_preprocess_batch_files(input, input_type, output_display_type_json_flag, include=(), exclude=()):
     """
     Shared code that handles preprocessing batch files (zip or directory) from the provided input
-    """
-    batch_flag = False
-    batch_processing_path = None
-    batch_total_files = 0
-    temp_batch_files = None
-    batch_files = []
 
+    The files are not listed here: the returned BatchFiles discovers them lazily, as they are uploaded.
+    <include> and <exclude> are glob patterns matched against the path of each file relative to the input.
+    """
     #if (input end with zip or /):
     if input.endswith('.zip') or os.path.isdir(input):
         if input_type != "photo":
@@ -36,66 +34,31 @@ def new_aux_shared_preprocess_batch_files(input, input_type, output_display_type
         #    echo("Batch processing does not support didimo cost verification. Please use the --ignore-cost option and try again.")
         #    return
         else:
-            batch_flag = True
-            separator = "/"
-            if platform.system() == "Windows":
-                separator = "\\"
-            #TODO: uncompress zip to temp and read directory, or read directory, according to given input being zip or folder
-            if input.endswith('.zip'):
-                temp_directory_to_extract_to = "temp"
-                path_prefix = temp_directory_to_extract_to
-  
-                directory = os.getcwd()
-                if not directory.endswith(separator):
-                    directory = directory + separator
-                batch_processing_path = directory+temp_directory_to_extract_to 
-                shutil.rmtree(temp_directory_to_extract_to, ignore_errors=True)
-                with zipfile.ZipFile(input, 'r') as zip_ref:
-                    zip_ref.extractall(temp_directory_to_extract_to)
-                    zip_ref.close()
-            elif os.path.isdir(input):
-                batch_processing_path = input
-                path_prefix = input
-            else:
-                if output_display_type_json_flag:
-                    return {
-                                "error": 1,
-                                "input":input,
-                                "message":"file not supported"
-                           }
-                else:
-                    click.echo("file not supported")
-                    return None
-            temp_batch_files=os.listdir(batch_processing_path)
-            #batch_total_files = len(fnmatch.filter(batch_files, '*.*'))
-            #click.echo("Batch processing - path: " + batch_processing_path)
-            #click.echo("Batch processing - files count: " + str(batch_total_files))
-
-            if not path_prefix.endswith(separator):
-                path_prefix = path_prefix + separator
-            for idx, input_file in enumerate(temp_batch_files):
-                #print(input_file)
-                if input_file != ".DS_Store" and not os.path.isdir(path_prefix + input_file):
-                    batch_files.append(path_prefix + input_file)
-                    if not output_display_type_json_flag:
-                        print(path_prefix + input_file)
-
-            if not output_display_type_json_flag:
-                batch_total_files = len(fnmatch.filter(batch_files, '*.*'))
-                click.echo("Batch processing - files count: " + str(batch_total_files))
-
-            return batch_files
+            # zip members are streamed from the archive when uploaded, nothing is extracted
+            return BatchFiles(input, include, exclude)
     else:
         return None
 
-def new_aux_shared_upload_core(config, url, input_file, depth, input_archive, payload, output_display_type_json_flag):
+def batch_files_found(batch_files):
+    """
+    Number of batch files discovered so far
+    """
+    if isinstance(batch_files, BatchFiles):
+        return batch_files.found
+    return len(batch_files)
+
+def new_aux_shared_upload_core(config, url, input_file, depth, input_archive, payload, output_display_type_json_flag, on_progress=None):
     """
     Shared code that handles a single upload request
+
+    <on_progress> is called with the number of bytes uploaded as the files are sent
     """
-    r = http_post_withphoto(url, config.access_key, payload, input_file, depth, input_archive, False)
+    r = http_post_withphoto(url, config.access_key, payload, input_file, depth, input_archive, False, on_progress)
 
     if input_archive != None:
         input_file = input_archive
+    else:
+        input_file = str(input_file)
 
     if r.status_code != 200 and r.status_code != 201:
         if not output_display_type_json_flag:
@@ -187,56 +150,175 @@ def new_aux_shared_processing(config, didimo_id, output_display_type_json_flag):
                }
 
 
-def new_aux_shared_upload(config, url, batch_files, depth, payload, output_display_type_json_flag):
+def new_aux_shared_upload_worker(config, url, input_file, depth, payload, output_display_type_json_flag):
+    """
+    Runs a single upload on a worker thread, turning network failures into a per-file error
+    """
+    try:
+        return new_aux_shared_upload_core(config, url, input_file, depth, None, payload, output_display_type_json_flag)
+    except Exception as error:
+        if not output_display_type_json_flag:
+            click.secho('\nError uploading %s: %s' % (input_file, error), err=True, fg='red')
+        return {
+                "error": 1,
+                "input_file":str(input_file),
+                "status_code":None,
+                "message":str(error)
+               }
+
+
+def new_aux_shared_upload(config, url, batch_files, depth, payload, output_display_type_json_flag, upload_concurrency=1):
     """
     Shared code that handles the whole upload process
+
+    Up to <upload_concurrency> files are uploaded at the same time. The returned
+    batch_didimo_ids keep the order of <batch_files>, whatever the completion order.
     """
-    all_upload_error_responses = []
+    upload_concurrency = max(1, int(upload_concurrency))
+    # make sure every worker can keep its own connection alive
+    configure_session(max(config.http_pool_size, upload_concurrency))
+    upload_responses = {}
     batch_didimo_ids = []
 
+    def upload_all(on_complete):
+        with ThreadPoolExecutor(max_workers=upload_concurrency) as executor:
+            pending = {}
+            for idx, input_file in enumerate(batch_files):
+                # keep the number of queued uploads bounded
+                if len(pending) >= upload_concurrency * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        upload_responses[pending.pop(future)] = future.result()
+                        on_complete()
+                future = executor.submit(new_aux_shared_upload_worker, config, url, input_file, depth, payload, output_display_type_json_flag)
+                pending[future] = idx
+            for future in as_completed(pending):
+                upload_responses[pending[future]] = future.result()
+                on_complete()
+
     if output_display_type_json_flag:
-        for input_file in batch_files:
+        upload_all(lambda: None)
+    else:
+        # the batch is discovered while it is uploaded, so only running counts are shown
+        line = RunningCountLine()
+        upload_all(lambda: line.update('Found %d | Uploaded %d' % (batch_files_found(batch_files), len(upload_responses))))
+        line.update('Found %d | Uploaded %d' % (len(upload_responses), len(upload_responses)), True)
 
-            r = new_aux_shared_upload_core(config, url, input_file, depth, None, payload, output_display_type_json_flag)
-            r_json = r#.json()
-            if r_json['error'] == 1:
-                all_upload_error_responses.append(r)
-                didimo_id = None
-            else:
-                didimo_id = r_json['didimo_id']
-            batch_didimo_ids.append(didimo_id)
+    all_upload_error_responses = []
+    for idx in range(len(upload_responses)):
+        r = upload_responses[idx]
+        if r['error'] == 1:
+            all_upload_error_responses.append(r)
+            batch_didimo_ids.append(None)
+        else:
+            batch_didimo_ids.append(r['didimo_id'])
 
-    else:
-        with click.progressbar(length=len(batch_files), label='Uploading files...', show_eta=False) as bar:
-            last_value = 0
-            i = 0
-            
-            for input_file in batch_files:
-
-                r = new_aux_shared_upload_core(config, url, input_file, depth, None, payload, output_display_type_json_flag)
-                r_json = r#.json()
-                if r_json['error'] == 1:
-                    all_upload_error_responses.append(r)
-                    didimo_id = None
-                    click.secho('\nError %d uploading %s: %s' % (r.status_code, input_file, r.text), err=True, fg='red')
-                else:
-                    didimo_id = r_json['didimo_id']
-                batch_didimo_ids.append(didimo_id)
+    return {
+            "upload_error_responses":all_upload_error_responses,
+            "batch_didimo_ids":batch_didimo_ids
+           }
+
+
+def new_aux_shared_pipeline(config, url, batch_files, depth, payload, no_download, output, output_display_type_json_flag, upload_concurrency, poll_concurrency, download_concurrency, journal=None, poll_mode="key"):
+    """
+    Shared code that streams a batch through the upload, processing and download stages at the same time
+
+    When a BatchJournal is given, every result is recorded in it and the files it already knows about
+    resume from their last completed stage.
+    """
+    upload_responses = {}
+    all_processing_error_responses = []
+    all_download_responses = []
+    counts = {"upload": 0, "processing": 0, "download": 0}
+
+    # make sure every worker of every stage can keep its own connection alive
+    configure_session(max(config.http_pool_size, upload_concurrency + poll_concurrency + download_concurrency))
+
+    def upload(input_file):
+        return new_aux_shared_upload_worker(config, url, input_file, depth, payload, output_display_type_json_flag)
+
+    download_pool = None if no_download else DownloadPool(config, download_concurrency, output)
+    pipeline = BatchPipeline(config, upload, download_pool,
+                             upload_concurrency, poll_concurrency, download_concurrency,
+                             None if journal is None else journal.lookup, poll_mode)
+
+    def on_event(stage, idx, result, finished):
+        counts[stage] = counts[stage] + 1
+        if journal is not None:
+            if stage == "upload":
+                journal.record_upload(result["input_file"], result)
+            elif stage == "processing":
+                journal.record_processing(result)
+            else:
+                journal.record_download(upload_responses[idx]['didimo_id'], result)
+        if stage == "upload":
+            upload_responses[idx] = result
+        elif stage == "processing":
+            if result["error"] == 1:
+                all_processing_error_responses.append(result)
+                if not output_display_type_json_flag:
+                    click.secho('\nError generating didimo %s: %s' % (result["didimo_key"], result["message"]), err=True, fg='red')
+        else:
+            all_download_responses.extend(result)
 
-                i = i + 1
-                update = i - last_value
-                last_value = i
-                bar.update(update)
+    try:
+        if output_display_type_json_flag:
+            pipeline.run(batch_files, on_event)
+        else:
+            # the batch is discovered while it goes through the stages, so only running counts are shown
+            line = RunningCountLine()
+            def progress_message():
+                return 'Found %d | Uploaded %d | Processed %d | Downloaded %d' % (batch_files_found(batch_files),
+                                                                                 counts["upload"], counts["processing"], counts["download"])
+            def on_event_with_progress(stage, idx, result, finished):
+                on_event(stage, idx, result, finished)
+                line.update(progress_message())
+            pipeline.run(batch_files, on_event_with_progress)
+            line.update(progress_message(), True)
+    finally:
+        if download_pool is not None:
+            download_pool.shutdown()
 
-                #click.echo(""+str(i)+"/"+str(len(batch_files)))
+    all_upload_error_responses = []
+    batch_didimo_ids = []
+    for idx in range(len(upload_responses)):
+        r = upload_responses[idx]
+        if r['error'] == 1:
+            all_upload_error_responses.append(r)
+            batch_didimo_ids.append(None)
+        else:
+            batch_didimo_ids.append(r['didimo_id'])
 
     return {
             "upload_error_responses":all_upload_error_responses,
-            "batch_didimo_ids":batch_didimo_ids
+            "batch_didimo_ids":batch_didimo_ids,
+            "processing_error_responses":all_processing_error_responses,
+            "download_responses":all_download_responses
            }
 
 
-def new_aux_shared_upload_processing_and_download(config, url, batch_files, depth, payload, no_wait, no_download, output, batch_flag, output_display_type_json_flag):
+def new_aux_shared_new(config, url, input, batch_files, depth, payload, no_wait, no_download, output, output_display_type_json_flag, upload_concurrency, poll_concurrency, poll_mode, download_concurrency, resume):
+    """
+    Runs the didimo creation of every version of the `new` command, once its payload is ready
+
+    <batch_files> are the files of a zip or directory <input>, None when <input> is a single file.
+    A batch is recorded in its journal (see open_batch_journal), which <resume> continues.
+    """
+    batch_flag = True
+    if batch_files == None:
+        batch_files = [input]
+        batch_flag = False
+
+    journal = open_batch_journal(config, input, resume) if batch_flag else None
+    try:
+        new_aux_shared_upload_processing_and_download(config, url, batch_files, depth, payload, no_wait, no_download, output, batch_flag, output_display_type_json_flag, upload_concurrency, poll_concurrency, download_concurrency, journal, poll_mode)
+    finally:
+        if journal is not None:
+            journal.close()
+        if batch_flag:
+            batch_files.close()
+
+def new_aux_shared_upload_processing_and_download(config, url, batch_files, depth, payload, no_wait, no_download, output, batch_flag, output_display_type_json_flag, upload_concurrency=1, poll_concurrency=1, download_concurrency=5, journal=None, poll_mode="key"):
     """
     Shared code that handles polling status and managing download
     """
@@ -245,9 +327,22 @@ def new_aux_shared_upload_processing_and_download(config, url, batch_files, dept
     all_download_responses = []
     
     batch_didimo_ids = []
-    #click.echo("Uploading files...")
+    valid_download_count = 0
 
-    r = new_aux_shared_upload(config, url, batch_files, depth, payload, output_display_type_json_flag)
+    if output is None:
+        output = ""
+    elif output != "":
+        if not output.endswith('/'):
+            output = output + "/"
+
+    if batch_flag and not no_wait:
+        # uploads, status polling and downloads overlap
+        r = new_aux_shared_pipeline(config, url, batch_files, depth, payload, no_download, output, output_display_type_json_flag,
+                                    upload_concurrency, poll_concurrency, download_concurrency, journal, poll_mode)
+        all_processing_error_responses = r['processing_error_responses']
+        all_download_responses = r['download_responses']
+    else:
+        r = new_aux_shared_upload(config, url, batch_files, depth, payload, output_display_type_json_flag, upload_concurrency)
     all_upload_error_responses = r['upload_error_responses']
     batch_didimo_ids = r['batch_didimo_ids']
 
@@ -257,67 +352,21 @@ def new_aux_shared_upload_processing_and_download(config, url, batch_files, dept
                        }))
         return
 
-    if not output_display_type_json_flag:
-        click.echo("Checking progress...")
-
-    complete_tasks = MyQueue()
-    jobs = []
-    i = 0
-    valid_processing_count = 0
-    valid_download_count = 0
-    for input_file in batch_files:
-
-        if not no_wait:
-
-            didimo_id = batch_didimo_ids[i]
-            i = i + 1
+    if not no_wait and not batch_flag:
+        if not output_display_type_json_flag:
+            click.echo("Checking progress...")
 
+        for didimo_id in batch_didimo_ids:
             if didimo_id == None:
                 continue
 
-            if batch_flag: #fork and don't output progress bars
-
-                no_error = None
-
-                r = new_aux_shared_processing(config, didimo_id, output_display_type_json_flag)
-                if r["error"] == 1:
-                    all_processing_error_responses.append(r)
-                else:
-                    valid_processing_count = valid_processing_count + 1
-       
-                    if not no_download:
-                        #click.echo("Downloading didimo "+didimo_id+"...")
-
-                        if output is None:
-                            output = ""
-                        elif output != "":
-                            if not output.endswith('/'):
-                                output = output + "/"
-
-                        while True:
-                            active_child_count = len(jobs)-complete_tasks.qsize()
-                            if active_child_count < 5:
-                                p = multiprocessing.Process(target=download_didimo_subprocess, args=(config, didimo_id, "", output, False,complete_tasks,))
-                                jobs.append(p)
-                                p.start()
-                                break
-                            else:
-                                #click.echo("Waiting to download | Jobs:"+str(len(jobs))+" | Active processes:"+str(active_child_count)+" | Completed:"+str(complete_tasks.qsize()))
-                                time.sleep(1)
-            else:
-                r = new_aux_shared_processing(config, didimo_id, output_display_type_json_flag)
-                if r["error"] == 1:
-                    all_processing_error_responses.append(r)
-                elif not no_download:
-                    if output is None:
-                        output = ""
-                    else:
-                        if not output.endswith('/'):
-                            output = output + "/"
-                    download_response = download_didimo(config, didimo_id, "", output)
-                    all_download_responses = all_download_responses + [download_response]
-                    #if download_response["error"] == 0:
-                    #    valid_download_count = valid_download_count + 1
+            r = new_aux_shared_processing(config, didimo_id, output_display_type_json_flag)
+            if r["error"] == 1:
+                all_processing_error_responses.append(r)
+            elif not no_download:
+                all_download_responses = all_download_responses + download_didimo(config, didimo_id, "", output)
+                #if download_response["error"] == 0:
+                #    valid_download_count = valid_download_count + 1
 
     if no_download:
         if output_display_type_json_flag:
@@ -327,16 +376,6 @@ def new_aux_shared_upload_processing_and_download(config, url, batch_files, dept
                                 "processing_errors":all_processing_error_responses
                             }))
     else:
-        #check if child processes are still running and wait for them to finish
-        if batch_flag and valid_processing_count > 0:
-            if not output_display_type_json_flag:
-                click.echo("Please wait while the remaining files are finished downloading...")
-            for job in jobs:
-                job.join()
-
-        if batch_flag:
-            all_download_responses = complete_tasks.as_array()
-
         if output_display_type_json_flag:
             click.echo(json.dumps( {
                                 "upload_errors":all_upload_error_responses,
@@ -356,11 +395,6 @@ def new_aux_shared_upload_processing_and_download(config, url, batch_files, dept
             click.echo("All downloads failed!")
 
 
-def download_didimo_subprocess(config, didimo_id, package_type, output, showProgressBar, complete_tasks):
-    download_response = download_didimo(config, didimo_id, package_type, output, showProgressBar)
-    complete_tasks.put(download_response) #complete_tasks.put(didimo_id + ' is done by ' + current_process().name)
-
-
 def deformation_aux_shared_processing_and_download(config, timeout, request, api_path, outputFileSuffix, output_display_type_json_flag):
     """
     Shared code that handles polling status and managing download of deformed assets
@@ -501,9 +535,11 @@ def generation_template_shared_response_processing(response, output_display_type
         print_didimo_generation_template_header()
         print_didimo_generation_template_row(json_response)
 
-def bulk_list_aux(config, group_type, status_filter, output_display_type):
+def bulk_list_aux(config, group_type, status_filter, output_display_type, all_pages=False, prefetch=DEFAULT_PREFETCH_PAGES):
     """
     (Shared Implementation) Lists bulk requests
+
+    With <all_pages>, every page is listed without asking, as the pages arrive. Up to <prefetch> pages are requested ahead.
     """
     output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
     
@@ -513,7 +549,12 @@ def bulk_list_aux(config, group_type, status_filter, output_display_type):
     r = http_get(url, auth=DidimoAuth(config, api_path)) 
 
     if output_display_type_json_flag:
-        click.echo(r.text)
+        if all_pages and r.status_code == 200:
+            # one JSON document per page, on a line of its own
+            for json_response in Paginator(config, r.json(), 'bulk_requests', prefetch).pages():
+                click.echo(json.dumps(json_response))
+        else:
+            click.echo(r.text)
     else:
         if r.status_code != 200:
             if r.status_code == 404:
@@ -525,27 +566,19 @@ def bulk_list_aux(config, group_type, status_filter, output_display_type):
                 click.secho('Error %d' % r.status_code, err=True, fg='red')
             sys.exit(1)
 
-        while True:
-
-            json_response = r.json()
+        for page_number, json_response in enumerate(Paginator(config, r.json(), 'bulk_requests', prefetch).pages()):
 
             _bulks = json_response['bulk_requests']
-            next_page = json_response['__links']['next'] if '__links' in json_response and 'next' in json_response['__links'] else None
 
-            print_bulk_requests_header()
+            if page_number == 0 or not all_pages:
+                print_bulk_requests_header()
             for _bulk in _bulks:
                 if not status_filter or _bulk["status"] == status_filter:
                     print_bulk_requests_row(_bulk)
 
-            if next_page != None:
+            if not all_pages and next_page_url(json_response) != None:
                 click.confirm('There are more results. Fetch next page?', abort=True)
 
-                api_path = next_page
-                url = api_path
-                r = http_get(url, auth=DidimoAuth(config, api_path))
-            else:
-                break
-
 def bulk_get_aux(config, group_type, uuid, output_display_type):
     """
     (Shared Implementation) Get bulk request details
@@ -578,3 +611,48 @@ def bulk_get_aux(config, group_type, uuid, output_display_type):
         print_bulk_request_item_header()
         for _item in json_response['items']:
             print_bulk_request_item_row(_item)
+
+def list_didimo_generation_templates_aux(config, output_display_type, all_pages=False, prefetch=DEFAULT_PREFETCH_PAGES):
+    """
+    (Shared Implementation) Lists available didimo generation templates
+
+    With <all_pages>, every page is listed without asking, as the pages arrive. Up to <prefetch> pages are requested ahead.
+    """
+
+    output_display_type_json_flag = get_output_display_type_json_flag(config, output_display_type)
+
+    api_path = "/v3/didimo_generation_templates?is_active=true"
+    url = config.api_host + api_path
+
+    
+    r = http_get(url, auth=DidimoAuth(config, api_path)) 
+
+    if output_display_type_json_flag:
+        if all_pages and r.status_code == 200:
+            # one JSON document per page, on a line of its own
+            for json_response in Paginator(config, r.json(), 'didimo_generation_templates', prefetch).pages():
+                click.echo(json.dumps(json_response))
+        else:
+            click.echo(r.text)
+    else:
+        if r.status_code != 200:
+            if r.status_code == 404:
+                res = r.json()
+                click.secho('Not found.', err=True, fg='red')
+            elif r.status_code == 400:
+                click.secho('Please correct your input.', err=True, fg='red')
+            else:
+                click.secho('Error %d' % r.status_code, err=True, fg='red')
+            sys.exit(1)
+
+        for page_number, json_response in enumerate(Paginator(config, r.json(), 'didimo_generation_templates', prefetch).pages()):
+
+            _DGTs = json_response['didimo_generation_templates']
+
+            if page_number == 0 or not all_pages:
+                print_didimo_generation_template_header()
+            for _DGT in _DGTs:
+                print_didimo_generation_template_row(_DGT)
+
+            if not all_pages and next_page_url(json_response) != None:
+                click.confirm('There are more results. Fetch next page?', abort=True)
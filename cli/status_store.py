@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from .cache import user_cache_dir, account_cache_name, is_didimo_document
+
+# Seconds a status fetched by any CLI process on this host is used by the others, 0 turns the store off
+DEFAULT_STATUS_SHARE_TTL = 1.0
+
+# Seconds a process may hold the request of a status before another one takes over, in case it died meanwhile
+STATUS_LEASE_TIME = 30.0
+
+# Delay between two lookups while another process requests a status
+STATUS_WAIT_INTERVAL = 0.05
+
+# Statuses older than this are removed from the store
+STATUS_MAX_AGE = 3600.0
+
+# One store per account and process, so that the connections of its threads are reused across requests
+_stores = {}
+_stores_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS statuses (
+    key TEXT PRIMARY KEY,
+    document TEXT,
+    fetched_at REAL,
+    lease_owner TEXT,
+    lease_until REAL
+);
+"""
+
+
+class StatusStore(object):
+    """ Status documents of didimos shared by the CLI processes of a host, in a
+    SQLite database per API host and access key in the user cache dir.
+    get() answers a key from a status fetched less than <ttl> seconds ago by
+    any process. Otherwise the first process to ask takes a lease on the key
+    and requests it, while the others wait for its result instead of sending
+    the same request: SQLite locks the database file, so only one process at a
+    time can check and take a lease. A lease is given back when its request
+    ends, even on failure, and expires after STATUS_LEASE_TIME seconds if its
+    process died.
+    """
+
+    def __init__(self, config, ttl=DEFAULT_STATUS_SHARE_TTL):
+        directory = user_cache_dir() / "status"
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / ("%s.sqlite3" % account_cache_name(config))
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            # autocommit, transactions are started explicitly
+            connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            connection.execute("DELETE FROM statuses WHERE fetched_at < ? AND (lease_until IS NULL OR lease_until < ?)",
+                               (time.time() - STATUS_MAX_AGE, time.time()))
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self, function, *args):
+        # runs <function> on the connection holding the write lock of the database
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = function(connection, *args)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    def _lookup_or_lease(self, connection, key, owner):
+        # the fresh document of <key>, or the lease on it is taken; (None, False) while another process holds it
+        now = time.time()
+        row = connection.execute("SELECT document, fetched_at, lease_until FROM statuses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            document, fetched_at, lease_until = row
+            if document is not None and fetched_at is not None and now - fetched_at < self.ttl:
+                return json.loads(document), False
+            if lease_until is not None and lease_until > now:
+                return None, False
+        connection.execute("INSERT OR IGNORE INTO statuses (key) VALUES (?)", (key,))
+        connection.execute("UPDATE statuses SET lease_owner = ?, lease_until = ? WHERE key = ?",
+                           (owner, now + STATUS_LEASE_TIME, key))
+        return None, True
+
+    def _release(self, key, owner, document):
+        connection = self._connection()
+        if document is None:
+            connection.execute("UPDATE statuses SET lease_owner = NULL, lease_until = NULL WHERE key = ? AND lease_owner = ?",
+                               (key, owner))
+        else:
+            connection.execute("UPDATE statuses SET document = ?, fetched_at = ?, lease_owner = NULL, lease_until = NULL "
+                               "WHERE key = ? AND lease_owner = ?", (json.dumps(document), time.time(), key, owner))
+
+    def get(self, key, fetch):
+        """ The status document of <key>. When no process fetched it within the TTL, and none is fetching it,
+        fetch() is called and returns (document, shared): the document to return, and whether the other processes
+        can use it. Exceptions raised by fetch() are raised by get() """
+        owner = uuid.uuid4().hex
+        while True:
+            document, leased = self._transaction(self._lookup_or_lease, key, owner)
+            if document is not None:
+                return document
+            if leased:
+                break
+            time.sleep(STATUS_WAIT_INTERVAL)
+
+        shared_document = None
+        try:
+            document, shared = fetch()
+            if shared:
+                shared_document = document
+            return document
+        finally:
+            self._release(key, owner, shared_document)
+
+    def share(self, documents):
+        """ Stores status documents fetched by other means, e.g. from the didimo list. As get() returns them in place
+        of /v3/didimos/{key}, the ones missing some of its fields are left out """
+        now = time.time()
+        rows = [(didimo['key'], json.dumps(didimo), now) for didimo in documents if is_didimo_document(didimo)]
+        if not rows:
+            return
+        self._transaction(self._share, rows)
+
+    def _share(self, connection, rows):
+        connection.executemany("INSERT OR IGNORE INTO statuses (key) VALUES (?)", [(row[0],) for row in rows])
+        connection.executemany("UPDATE statuses SET document = ?, fetched_at = ? WHERE key = ?",
+                               [(document, fetched_at, key) for key, document, fetched_at in rows])
+
+
+def shared_status_store(config):
+    """
+    The StatusStore of the account of <config> in this process, None when "status_share_ttl" turns it off
+    """
+    ttl = getattr(config, "status_share_ttl", DEFAULT_STATUS_SHARE_TTL)
+    if not ttl or ttl <= 0:
+        return None
+    name = account_cache_name(config)
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None or store.ttl != ttl:
+            store = StatusStore(config, ttl)
+            _stores[name] = store
+    return store
+
+
+def _reset_stores_after_fork():
+    # SQLite connections inherited from the parent must not be used by a forked child
+    global _stores_lock
+    _stores.clear()
+    _stores_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_stores_after_fork)
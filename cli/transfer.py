@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from .network import http_request
+
+# Size of the pieces a download is written to disk in
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Attempts made for each byte range before giving up, waiting DOWNLOAD_RETRY_DELAY * 2^attempt in between
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_RETRY_DELAY = 1.0
+# Packages are only split into parallel segments from this size on
+SEGMENTED_DOWNLOAD_MIN_SIZE = 16 * 1024 * 1024
+DEFAULT_DOWNLOAD_SEGMENTS = 1
+
+
+class _Restart(Exception):
+    """ The file changed on the server since the partial download started """
+
+
+class RangedDownload(object):
+    """ Downloads <url> to <output_path> through a "<output_path>.part" file.
+    The body is written in DOWNLOAD_CHUNK_SIZE chunks, never held in memory.
+    When a transfer fails it is resumed from the last byte written with a
+    Range request, guarded by If-Range so a file changed on the server is
+    downloaded again from the start instead of being corrupted. The progress
+    is kept in "<output_path>.part.json", so a download interrupted in a
+    previous run is resumed as well.
+    Files of at least SEGMENTED_DOWNLOAD_MIN_SIZE bytes are split into
+    <segments> byte ranges downloaded in parallel, when the server accepts
+    ranges.
+    start() opens the transfer and returns (size, bytes already on disk),
+    finish() completes it and moves the file in place.
+    """
+
+    def __init__(self, url, output_path, auth=None, segments=DEFAULT_DOWNLOAD_SEGMENTS):
+        self.url = url
+        self.output_path = output_path
+        self.part_path = output_path + ".part"
+        self.state_path = output_path + ".part.json"
+        self.auth = auth
+        self.segments = max(1, int(segments))
+
+        self.size = None
+        self.validator = None
+        # [start, next byte to write, end (exclusive, None when the size is unknown)]
+        self.ranges = []
+        self._response = None
+        self._restarts = 0
+        self._lock = threading.Lock()
+        self._on_progress = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not os.path.exists(self.part_path) or not state.get("validator"):
+            return False
+        self.size = state["size"]
+        self.validator = state["validator"]
+        self.ranges = state["ranges"]
+        if len(self.ranges) == 1:
+            # a single range is written sequentially, what is on disk is what was received
+            self.ranges[0][1] = min(os.path.getsize(self.part_path), self.ranges[0][2] or float("inf"))
+        return True
+
+    def _save_state(self):
+        if self.validator is None:
+            return
+        with self._lock:
+            state = {"size": self.size, "validator": self.validator, "ranges": self.ranges}
+        with open(self.state_path, "w") as f:
+            json.dump(state, f)
+
+    def _discard(self):
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _request(self, headers=None):
+        r = http_request("GET", self.url, endpoint_class="download", auth=self.auth, headers=headers, stream=True)
+        if r.status_code == 416:
+            r.close()
+            raise _Restart()
+        if r.status_code >= 400:
+            r.close()
+            r.raise_for_status()
+        return r
+
+    def start(self):
+        if not self._load_state():
+            self._discard()
+            self._open()
+        return self.size, sum(rng[1] - rng[0] for rng in self.ranges)
+
+    def _open(self):
+        r = self._request()
+        length = r.headers.get("Content-Length")
+        encoding = r.headers.get("Content-Encoding", "identity")
+        self.size = int(length) if length is not None and encoding == "identity" else None
+        self.validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+
+        if self.segments > 1 and self.size is not None and self.size >= SEGMENTED_DOWNLOAD_MIN_SIZE \
+           and self.validator is not None and r.headers.get("Accept-Ranges") == "bytes":
+            r.close()
+            step = -(-self.size // self.segments)
+            self.ranges = [[start, start, min(start + step, self.size)] for start in range(0, self.size, step)]
+            with open(self.part_path, "wb") as f:
+                f.truncate(self.size)
+        else:
+            self._response = r
+            self.ranges = [[0, 0, self.size]]
+            open(self.part_path, "wb").close()
+        self._save_state()
+
+    def _fetch(self, rng):
+        r, self._response = self._response, None
+        if r is None:
+            end = "" if rng[2] is None else str(rng[2] - 1)
+            headers = {"Range": "bytes=%d-%s" % (rng[1], end)}
+            if self.validator is not None:
+                headers["If-Range"] = self.validator
+            r = self._request(headers)
+            if r.status_code != 206 and not (rng[1] == 0 and len(self.ranges) == 1):
+                r.close()
+                # the range was ignored: the file changed on the server, or ranges are not supported
+                raise _Restart()
+
+        with r, open(self.part_path, "r+b") as f:
+            f.seek(rng[1])
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                with self._lock:
+                    rng[1] = rng[1] + len(chunk)
+                    if self._on_progress is not None:
+                        self._on_progress(len(chunk))
+        if rng[2] is not None and rng[1] < rng[2]:
+            from requests.exceptions import ChunkedEncodingError
+            raise ChunkedEncodingError("Connection closed after %d of %d bytes" % (rng[1], rng[2]))
+
+    def _fetch_with_retries(self, rng):
+        from requests.exceptions import ConnectionError, ChunkedEncodingError, Timeout
+
+        attempt = 0
+        while True:
+            try:
+                return self._fetch(rng)
+            except (ConnectionError, ChunkedEncodingError, Timeout):
+                attempt = attempt + 1
+                if attempt >= DOWNLOAD_RETRIES:
+                    raise
+                time.sleep(DOWNLOAD_RETRY_DELAY * 2 ** (attempt - 1))
+
+    def finish(self, on_progress=None):
+        self._on_progress = on_progress
+        try:
+            pending = [rng for rng in self.ranges if rng[2] is None or rng[1] < rng[2]]
+            if len(pending) == 1:
+                self._fetch_with_retries(pending[0])
+            elif pending:
+                with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                    for future in [executor.submit(self._fetch_with_retries, rng) for rng in pending]:
+                        future.result()
+        except _Restart:
+            self._restarts = self._restarts + 1
+            if self._restarts > DOWNLOAD_RETRIES:
+                self._discard()
+                raise IOError("%s keeps changing or does not support resuming, giving up" % self.url)
+            self._discard()
+            self._open()
+            return self.finish(on_progress)
+        except BaseException:
+            if self._response is not None:
+                self._response.close()
+            self._save_state()
+            raise
+
+        os.replace(self.part_path, self.output_path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.ranges[-1][1] if self.size is None else self.size
+
+
+def download_file(url, output_path, auth=None, segments=DEFAULT_DOWNLOAD_SEGMENTS, progress_label=None):
+    """
+    Downloads <url> to <output_path> with a RangedDownload, showing a progress bar when <progress_label> is given.
+    Returns the size of the file
+    """
+    download = RangedDownload(url, output_path, auth, segments)
+    size, done = download.start()
+    if progress_label is None:
+        return download.finish()
+    with click.progressbar(length=size or 0, label=progress_label) as bar:
+        bar.update(done)
+        return download.finish(bar.update)
@@ -1,4 +1,5 @@
 import click
+import time
 from datetime import datetime
 
 
@@ -7,6 +8,22 @@ def print_key_value(key, value, fg="white"):
     click.secho(str(value), err=True)
 
 
+class RunningCountLine(object):
+    """ A console line rewritten in place with the running counts of a batch.
+    Redraws are limited to one every <interval> seconds, except the last one.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self._last_printed = 0
+
+    def update(self, message, final=False):
+        now = time.monotonic()
+        if final or now - self._last_printed >= self.interval:
+            self._last_printed = now
+            click.echo("\r" + message, nl=final)
+
+
 def print_status_header():
     click.secho("{:<18} │ {:<10} │ {:<7} │ {:^4} │ {:^4}  "
                 .format(
@@ -51,8 +68,43 @@ def print_status_row(didimo):
                     didimo['created_at']),
                 fg=color)
 
+
+def print_didimo_details(didimo):
+    click.secho("-- didimo "+didimo["key"]+" --", fg="green", err=True)
+    print_key_value("Key", didimo["key"])
+    print_key_value("Input type", didimo["input_type"])
+    
+    print_key_value("Cost", didimo["cost"])
+    print_key_value("Created at", didimo["created_at"])
+    print_key_value("Expires at", didimo["expires_at"])
+    print_key_value("Status", didimo["status"])
+    if didimo['status'] == "processing" or didimo['status'] == "error":
+        print_key_value("Percent", didimo["percent"])
+    if didimo['status_message'] != "":
+        print_key_value("Status message", didimo["status_message"])
+    print_key_value("Is favorite", didimo["is_favorite"])
+
+    if "transfer_formats" in didimo:
+        transfer_formats = []
+        for trf in didimo["transfer_formats"]:
+            transfer_formats.append(trf["name"])
+        print_key_value("Transfer formats", str(transfer_formats))
+
+    if "meta_data" in didimo:
+        click.secho("-- System Metadata --", fg="yellow", err=True)
+        for meta_data in didimo["meta_data"]:
+            if meta_data["definer"] == "system":
+                print_key_value(meta_data["name"], meta_data["value"])
+        click.secho("-- User-defined Metadata --", fg="blue", err=True)
+        for meta_data in didimo["meta_data"]:
+            if meta_data["definer"] == "user":
+                print_key_value(meta_data["name"], meta_data["value"])
+    click.secho("--------------------------------", fg="green", err=True)
+
+
 def create_set(ids):
-    return set(ids)
+    # drops repeated IDs, keeping the order they were given in
+    return list(dict.fromkeys(ids))
 
 #Didimo Generation Templates
 def print_didimo_generation_template_header():